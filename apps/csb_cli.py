@@ -38,13 +38,19 @@ class Command(object):
                 'default' : False,
                 'help'    : 'if enabled, bodies have to be fully contained by the given domain',
                 'dest'    : 'strict'
+            }),
+            ('--precision', {
+                'type'    : int,
+                'default' : None,
+                'help'    : 'number of significant digits of saved values, default is lossless',
+                'dest'    : 'precision'
             })
         ]
 
         self.domain = None
 
     def load_bodies(self, args):
-        bodies = Storage(solids=csb.load(args.path, args.delimiter))
+        bodies = Storage(solids=csb.load_files(args.path, jobs=args.jobs, delimiter=args.delimiter))
         num_bodies = len(bodies)
         if not num_bodies:
             self.log.error('No bodies to edit! Aborting ...'.format(args.path))
@@ -152,7 +158,7 @@ class Slice(Command):
             slice_bodies = bodies.clipped(slice, args.strict)
             bodies -= slice_bodies
             filename = slice_file.format(axis=axes[axis], slice_min=slice.min[axis], slice_max=slice.max[axis])
-            csb.save(filename, slice_bodies)
+            csb.save(filename, slice_bodies, precision=args.precision)
             self.log.info('Saved {:d} bodies to file {}'.format(len(slice_bodies), filename))
 
         return True
@@ -217,10 +223,10 @@ class Edit(Command):
             bodies.translate(offset)
 
         if self.log.getEffectiveLevel() <= logging.DEBUG:
-            self.log.debug('Body space is {}'.format(bodies.aabb()))
+            self.log.debug('Body space is {}'.format(bodies.aabb))
 
         # save
-        csb.save(args.out, bodies)
+        csb.save(args.out, bodies, precision=args.precision)
         self.log.info('Saved {:d} bodies to file {}'.format(len(bodies), args.out))
 
 
@@ -255,6 +261,7 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('path', help='Path to input csb file(s). May contain wildcards')
     parser.add_argument('--delimiter', default=',', help='character that delimits csv file columns. Default: ","',)
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='number of processes used to load the csb files')
     parser.add_argument('--verbose', '-v', default=False, action='store_true')
 
     cmd_parsers = parser.add_subparsers(title='commands', dest='cmd_name')
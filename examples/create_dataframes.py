@@ -14,14 +14,13 @@ results_path: str
 """
 
 import os
-import tarfile
 
 import numpy as np
 import pandas as pd
 from scipy.optimize import curve_fit
 
-from paralyze.core.solids import CSBFile
 from paralyze.core.stats import gm, gsd
+from paralyze.solids.io import SnapshotArchive, csb
 
 DEPTH_SHIFT = {
     1.0: -2.062500,
@@ -79,10 +78,10 @@ def load_case(case_id, fit_bounds=(-np.inf, np.inf), data_path='/Users/tobs/scie
     frame = frame[frame['depth'] <= fit_bounds[1]]
 
     num_t = len(frame.columns[2:])
-    with tarfile.open(f_csb_path) as tar:
-        num_csb = sum([1 for member in tar.getmembers() if member.isfile()])
-        if num_csb != num_t:
-            raise ValueError('Number of fine csb files {:d} does not match number of volume distribution files {:d}'.format(num_csb, num_t))
+    archive = SnapshotArchive(f_csb_path)
+    num_csb = len(archive)
+    if num_csb != num_t:
+        raise ValueError('Number of fine csb files {:d} does not match number of volume distribution files {:d}'.format(num_csb, num_t))
 
     print('## starting to process {} time steps for case {} ##'.format(num_t, case_id))
     case_df = pd.DataFrame(np.full((num_t, len(columns)), np.nan), columns=columns)
@@ -108,42 +107,34 @@ def load_case(case_id, fit_bounds=(-np.inf, np.inf), data_path='/Users/tobs/scie
     ############################################################################
     print('determine coarse sediment parameters ...')
 
-    solids = CSBFile.load(c_csb_path)
-    s = np.array(list(map(lambda solid: solid.equivalent_mesh_size, solids)))
-    v = np.array(list(map(lambda solid: solid.volume, solids)))
+    solids = csb.load(c_csb_path)
+    s = solids.equivalent_mesh_sizes()
+    v = solids.volumes()
 
     case_df['c_n'] = len(solids)
     case_df['c_psd_gm'] = gm(s)
     case_df['c_psd_gsd'] = gsd(s)
-    case_df['c_v'] = sum(v)
+    case_df['c_v'] = v.sum()
     case_df['c_gm'] = gm(s, v)
     case_df['c_gsd'] = gsd(s, v)
 
     ############################################################################
     print('determine fine sediment parameters ...')
 
-    i = 0
-    with tarfile.open(f_csb_path) as tar:
-        for member in tar.getmembers():
-            if not member.isfile():
-                continue
+    with archive:
+        for i, name in enumerate(archive.names):
+            print(' processing member {} ({:d} of {:d})'.format(name, i+1, num_csb))
 
-            print(' processing member {} ({:d} of {:d})'.format(member.name, i+1, num_csb))
-
-            f = tar.extractfile(member)
-            solids = CSBFile.load(f)
-            f.close()
-
-            s = np.array(list(map(lambda solid: solid.equivalent_mesh_size, solids)))
-            v = np.array(list(map(lambda solid: solid.volume, solids)))
+            solids = archive.load(name)
+            s = solids.equivalent_mesh_sizes()
+            v = solids.volumes()
 
             case_df['f_n'][i] = len(solids)
             case_df['f_psd_gm'][i] = gm(s)
             case_df['f_psd_gsd'][i] = gsd(s)
-            case_df['f_v'][i] = sum(v)
+            case_df['f_v'][i] = v.sum()
             case_df['f_gm'][i] = gm(s, v)
             case_df['f_gsd'][i] = gsd(s, v)
-            i += 1
 
     case_df['q_f'] = float(q_f)
     case_df['g'] = float(g)
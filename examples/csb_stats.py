@@ -12,13 +12,11 @@ Date:
 import argparse
 import os
 import sys
-import tarfile
 
 import numpy as np
-import pandas as pd
 from paralyze.util.distribution import SizeDistribution
 
-from paralyze.solids import CSBFile
+from paralyze.solids.io import csb
 
 
 def main():
@@ -26,6 +24,7 @@ def main():
     parser.add_argument('tarball', type=str)
     parser.add_argument('--n_sieves', type=float, default=10)
     parser.add_argument('--precision', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=None)
     args = parser.parse_args()
 
     TARFILE = args.tarball
@@ -48,27 +47,18 @@ def main():
 
         print('{0:^10}\t{1:^{pp}} {2:^{pp}}'.format("Member", "GM", "GSD", pp=pp))
 
-        tar = tarfile.open(TARFILE)
-        df = pd.DataFrame(np.full((len(tar.getnames()), 4), np.nan), columns=['case', 'time', 'gm', 'gsd'])
-
-        for member in tar.getmembers():
-            if not member.isfile():
-                continue
-
-            f = tar.extractfile(member)
-            bodies = CSBFile.load(f)
-            f.close()
-
-            sizes = list(map(lambda body: 2.0 * body.radius, bodies))
+        for name, bodies in csb.iter_files(TARFILE, jobs=args.jobs):
+            member = name[len(TARFILE) + 1:]
+            sizes = bodies.equivalent_mesh_sizes()
             sieves = np.linspace(min(sizes), max(sizes) + SizeDistribution.EPSILON, args.n_sieves)
             s = SizeDistribution(sieves, sizes=sizes, volume_func=lambda size: 4/3. * np.pi * (size/2.)**3)
-            if len(member.name) > 50:
-                text = '[...]'+member.name[-45:]
+            if len(member) > 50:
+                text = '[...]'+member[-45:]
             else:
-                text = member.name
+                text = member
             print('{0:<50}\t{1:^{pp}.{p}f} {2:^{pp}.{p}f}'.format(text, s.gm, s.gsd, p=p, pp=pp))
 
-            csv.write(str(member.name) + '\n')
+            csv.write(str(member) + '\n')
             csv.write('gm,gsd,' + ','.join(map(str, sieves)) + '\n')
             csv.write('{0:.{p}f},{1:.{p}f},'.format(s.gm, s.gsd, p=p) + ','.join(map(str, s.fc)) + '\n')
 
@@ -2,6 +2,8 @@ import cProfile
 import os
 import pstats
 
+from paralyze.solids.io import csb, load_spheres, save_spheres
+
 here = os.path.abspath(os.path.dirname(__file__))
 
 CSB = os.path.join(here, '../data/uniform-8.csv')
@@ -25,7 +27,7 @@ def cprofile(func):
 
 @cprofile
 def load_csb():
-    return CSBFile.load(CSB)
+    return csb.load(CSB)
 
 
 @cprofile
@@ -33,11 +35,17 @@ def load_npy():
     return load_spheres(NPY)
 
 
+@cprofile
+def load_npy_mmap():
+    return load_spheres(NPY, mmap_mode='r')
+
+
 def main():
     bodies = load_csb()
     if not os.path.exists(NPY):
         save_spheres(bodies, NPY)
     load_npy()
+    load_npy_mmap()
 
 
 if __name__ == '__main__':
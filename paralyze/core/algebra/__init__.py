@@ -6,6 +6,7 @@ from .interval import Interval
 from .polygon import Polygon
 from .primes import prime_factors, primes, is_prime
 from .quaternion import Quaternion
+from .quaternion_array import QuaternionArray, rotation_matrices
 from .ray import Ray
 from .stencil import D2Q4, D3Q6
 from .triangle import Triangle
@@ -20,7 +21,7 @@ __all__ = [
     'Interval',
     'Polygon',
     'prime_factors', 'primes', 'is_prime',
-    'Quaternion',
+    'Quaternion', 'QuaternionArray', 'rotation_matrices',
     'Ray',
     'D2Q4', 'D3Q6',
     'Triangle',
@@ -0,0 +1,327 @@
+"""Vectorized operations on arrays of quaternions.
+
+All functions operate on (N, 4) arrays of quaternions in (w, x, y, z) order,
+i.e. the same component order as :class:`Quaternion`.
+"""
+import numpy as np
+
+
+def rotation_matrices(quaternions):
+    """Returns the rotation matrices of many quaternions.
+
+    Parameters
+    ----------
+    quaternions: array-like
+        The (N, 4) quaternions. Quaternions do not have to be normalised.
+
+    Returns
+    -------
+    numpy.ndarray:
+        The (N, 3, 3) rotation matrices. ``result[i]`` equals
+        ``Quaternion(quaternions[i]).rotation_matrix``.
+    """
+    q = np.asarray(quaternions).reshape((-1, 4))
+    norm = np.sqrt(np.einsum('ij,ij->i', q, q))
+    norm[norm == 0] = 1
+    w, x, y, z = (q / norm[:, np.newaxis]).T
+
+    r = np.empty((len(q), 3, 3), dtype=np.result_type(q.dtype, np.float32))
+    r[:, 0, 0] = 1 - 2 * (y*y + z*z)
+    r[:, 0, 1] = 2 * (x*y - w*z)
+    r[:, 0, 2] = 2 * (x*z + w*y)
+    r[:, 1, 0] = 2 * (x*y + w*z)
+    r[:, 1, 1] = 1 - 2 * (x*x + z*z)
+    r[:, 1, 2] = 2 * (y*z - w*x)
+    r[:, 2, 0] = 2 * (x*z - w*y)
+    r[:, 2, 1] = 2 * (y*z + w*x)
+    r[:, 2, 2] = 1 - 2 * (x*x + y*y)
+    return r
+
+
+def multiply(a, b):
+    """Returns the Hamilton products ``a[i] * b[i]`` of two (N, 4) quaternion
+    arrays.
+    """
+    a = np.asarray(a)
+    b = np.asarray(b)
+    w0, x0, y0, z0 = np.moveaxis(a, -1, 0)
+    w1, x1, y1, z1 = np.moveaxis(b, -1, 0)
+    return np.stack((
+        w0*w1 - x0*x1 - y0*y1 - z0*z1,
+        w0*x1 + x0*w1 + y0*z1 - z0*y1,
+        w0*y1 - x0*z1 + y0*w1 + z0*x1,
+        w0*z1 + x0*y1 - y0*x1 + z0*w1
+    ), axis=-1)
+
+
+def integrate(quaternions, rates, timestep):
+    """Advances many quaternions by constant angular rates.
+
+    Parameters
+    ----------
+    quaternions: array-like
+        The (N, 4) (unit) quaternions.
+    rates: array-like
+        The (N, 3) rotation rates (angular velocities) about the global x, y,
+        and z axes.
+    timestep: float or array-like
+        The interval over which to integrate.
+
+    Returns
+    -------
+    numpy.ndarray:
+        The (N, 4) normalised quaternions at time ``timestep``, i.e. the
+        rotation ``rates * timestep`` applied (in the global frame) after the
+        rotations ``quaternions``.
+    """
+    q = np.asarray(quaternions).reshape((-1, 4))
+    rotation = np.asarray(rates).reshape((-1, 3)) * np.reshape(timestep, (-1, 1))
+    angle = np.sqrt(np.einsum('ij,ij->i', rotation, rotation))
+    scale = np.divide(np.sin(.5 * angle), angle, out=np.full_like(angle, .5), where=angle > 0)
+
+    dq = np.empty((len(rotation), 4), dtype=rotation.dtype)
+    dq[:, 0] = np.cos(.5 * angle)
+    dq[:, 1:] = rotation * scale[:, np.newaxis]
+
+    q = multiply(dq, q)
+    return q / np.sqrt(np.einsum('ij,ij->i', q, q))[:, np.newaxis]
+
+
+class QuaternionArray(np.ndarray):
+    """An (N, 4) array of quaternions in (w, x, y, z) order.
+
+    QuaternionArray provides the vectorized counterparts of the most important
+    :class:`Quaternion` operations. Arithmetic operators keep their numpy
+    (element-wise) meaning, the quaternion product is available through
+    :func:`multiply`.
+
+    Examples
+    --------
+    >>> q = QuaternionArray.from_axis_angle([(0, 0, 1), (1, 0, 0)], np.pi / 2)
+    >>> q.rotate([(1, 0, 0), (1, 0, 0)]).round(6)
+    array([[0., 1., 0.],
+           [1., 0., 0.]])
+    """
+
+    def __new__(cls, quaternions=(1, 0, 0, 0), dtype=None):
+        return np.array(quaternions, dtype=dtype).reshape((-1, 4)).view(cls)
+
+    @classmethod
+    def identity(cls, n, dtype=np.float64):
+        """Returns ``n`` identity quaternions.
+        """
+        q = np.zeros((n, 4), dtype=dtype)
+        q[:, 0] = 1
+        return q.view(cls)
+
+    @classmethod
+    def from_axis_angle(cls, axes, angles):
+        """Creates quaternions from rotation axes and angles.
+
+        Parameters
+        ----------
+        axes: array-like
+            The (N, 3) or (3,) rotation axes, need not be normalised.
+        angles: float or array-like
+            The rotation angles in radians.
+        """
+        axes = np.asarray(axes, dtype=np.float64).reshape((-1, 3))
+        angles = np.ravel(angles)
+        norm = np.sqrt(np.einsum('ij,ij->i', axes, axes))
+        if np.any(norm == 0):
+            raise ZeroDivisionError("Provided rotation axis has no length")
+        n = max(len(axes), len(angles))
+        q = np.empty((n, 4))
+        q[:, 0] = np.cos(.5 * angles)
+        q[:, 1:] = axes / norm[:, np.newaxis] * np.sin(.5 * angles)[:, np.newaxis]
+        return q.view(cls)
+
+    @classmethod
+    def between(cls, u, v):
+        """Returns the shortest-arc rotations that rotate the directions ``u``
+        onto the directions ``v``.
+
+        Parameters
+        ----------
+        u, v: array-like
+            The (N, 3) or (3,) source and target directions, need not be
+            normalised.
+        """
+        u = np.asarray(u, dtype=np.float64).reshape((-1, 3))
+        v = np.asarray(v, dtype=np.float64).reshape((-1, 3))
+        u = u / np.sqrt(np.einsum('ij,ij->i', u, u))[:, np.newaxis]
+        v = v / np.sqrt(np.einsum('ij,ij->i', v, v))[:, np.newaxis]
+        u, v = np.broadcast_arrays(u, v)
+
+        q = np.empty((len(u), 4))
+        q[:, 0] = 1 + np.einsum('ij,ij->i', u, v)
+        q[:, 1:] = np.cross(u, v)
+
+        # opposite directions: rotate by pi about any axis perpendicular to u
+        opposite = q[:, 0] < 1e-12
+        if np.any(opposite):
+            uo = u[opposite]
+            axis = np.cross(uo, (1, 0, 0))
+            small = np.einsum('ij,ij->i', axis, axis) < 1e-12
+            axis[small] = np.cross(uo[small], (0, 1, 0))
+            q[opposite, 0] = 0
+            q[opposite, 1:] = axis
+        q = q.view(cls)
+        q.normalise()
+        return q
+
+    @classmethod
+    def random(cls, n):
+        """Returns ``n`` random unit quaternions uniformly distributed across
+        the rotation space, see :func:`Quaternion.random`.
+        """
+        r1, r2, r3 = np.random.random((3, n))
+        q = np.stack((
+            np.sqrt(1.0 - r1) * np.sin(2 * np.pi * r2),
+            np.sqrt(1.0 - r1) * np.cos(2 * np.pi * r2),
+            np.sqrt(r1) * np.sin(2 * np.pi * r3),
+            np.sqrt(r1) * np.cos(2 * np.pi * r3)
+        ), axis=-1)
+        return q.view(cls)
+
+    @classmethod
+    def slerp(cls, q0, q1, amount=0.5):
+        """Spherical linear interpolation between the quaternions ``q0`` and
+        ``q1`` (along the shortest arc).
+
+        Parameters
+        ----------
+        q0, q1: array-like
+            The (N, 4) start and end rotations, normalised implicitly.
+        amount: float or array-like
+            The interpolation parameter(s) in [0, 1].
+
+        Returns
+        -------
+        QuaternionArray:
+            The interpolated unit quaternions.
+        """
+        q0 = QuaternionArray(q0).normalised
+        q1 = QuaternionArray(q1).normalised
+        t = np.clip(np.reshape(amount, (-1, 1)), 0, 1)
+
+        dot = np.einsum('ij,ij->i', q0, q1)
+        # take the shortest path
+        q1 = np.where(dot[:, np.newaxis] < 0, -q1, q1)
+        dot = np.clip(np.abs(dot), -1, 1)[:, np.newaxis]
+
+        theta = np.arccos(dot)
+        sin_theta = np.sin(theta)
+        close = sin_theta < 1e-8
+        safe = np.where(close, 1, sin_theta)
+        w0 = np.where(close, 1 - t, np.sin((1 - t) * theta) / safe)
+        w1 = np.where(close, t, np.sin(t * theta) / safe)
+        return np.asarray(w0 * q0 + w1 * q1).view(cls).normalised
+
+    @property
+    def scalar(self):
+        """Returns the (N,) real parts.
+        """
+        return np.asarray(self)[:, 0]
+
+    @property
+    def vector(self):
+        """Returns the (N, 3) imaginary parts.
+        """
+        return np.asarray(self)[:, 1:]
+
+    @property
+    def norm(self):
+        """Returns the (N,) L2 norms of the quaternions.
+        """
+        q = np.asarray(self)
+        return np.sqrt(np.einsum('ij,ij->i', q, q))
+
+    @property
+    def normalised(self):
+        """Returns a normalised copy, zero quaternions are left unchanged.
+        """
+        q = self.copy()
+        q.normalise()
+        return q
+
+    def normalise(self):
+        """Normalises all (non-zero) quaternions in place.
+        """
+        norm = self.norm
+        norm[norm == 0] = 1
+        np.divide(self, norm[:, np.newaxis], out=np.asarray(self), casting='unsafe')
+
+    def conjugate(self):
+        """Returns the quaternion conjugates, i.e. the vector parts negated.
+        """
+        q = np.array(self)
+        q[:, 1:] *= -1
+        return q.view(QuaternionArray)
+
+    @property
+    def inverse(self):
+        """Returns the quaternion inverses.
+        """
+        q = np.asarray(self)
+        ss = np.einsum('ij,ij->i', q, q)
+        if np.any(ss == 0):
+            raise ZeroDivisionError("a zero quaternion (0 + 0i + 0j + 0k) cannot be inverted")
+        return (self.conjugate() / ss[:, np.newaxis]).view(QuaternionArray)
+
+    def multiply(self, other):
+        """Returns the quaternion products ``self[i] * other[i]``.
+        """
+        return multiply(np.asarray(self), np.asarray(other)).view(QuaternionArray)
+
+    def rotate(self, vectors):
+        """Rotates (N, 3) vectors by the corresponding (normalised) quaternions.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The (N, 3) rotated vectors.
+        """
+        q = np.asarray(self.normalised)
+        w = q[:, :1]
+        u = q[:, 1:]
+        v = np.asarray(vectors)
+        t = 2 * np.cross(u, v)
+        return v + w * t + np.cross(u, t)
+
+    @property
+    def rotation_matrix(self):
+        """Returns the (N, 3, 3) rotation matrices.
+        """
+        return rotation_matrices(np.asarray(self))
+
+    def integrate(self, rates, timestep):
+        """Advances all quaternions in place by constant angular ``rates``
+        (about the global axes) over ``timestep``, see :func:`integrate`.
+        """
+        self[...] = integrate(np.asarray(self), rates, timestep)
+
+    @property
+    def axis(self):
+        """Returns the (N, 3) unit rotation axes, null rotations have an axis
+        of (0, 0, 0).
+        """
+        v = self.normalised.vector
+        norm = np.sqrt(np.einsum('ij,ij->i', v, v))
+        return np.divide(v, norm[:, np.newaxis], out=np.zeros_like(v), where=norm[:, np.newaxis] > 1e-17)
+
+    @property
+    def angle(self):
+        """Returns the (N,) rotation angles in radians within (-pi, pi].
+        """
+        q = self.normalised
+        v = q.vector
+        theta = 2.0 * np.arctan2(np.sqrt(np.einsum('ij,ij->i', v, v)), q.scalar)
+        theta = ((theta + np.pi) % (2 * np.pi)) - np.pi
+        theta[theta == -np.pi] = np.pi
+        return theta
+
+    def to_axis_angle(self):
+        """Returns the (N, 3) rotation axes and (N,) angles.
+        """
+        return self.axis, self.angle
@@ -5,6 +5,7 @@ from functools import partial
 from .block import Block
 from ..algebra import AABB, Vector
 from ..fields import Cell, CellInterval, Field, update_operations
+from ..solids import SolidArray
 
 
 class BlockStorage(object):
@@ -107,10 +108,7 @@ class BlockStorage(object):
             raise ValueError('Data with identifier %s already exist!' % identifier)
 
         if self._periodic.any():
-            mapped = set()
-            for body in bodies:
-                mapped = mapped.union(self.map_to_periodic_domain(body))
-            bodies = bodies.union(mapped)
+            bodies = bodies.union(self.map_to_periodic_domain(bodies))
 
         for block in self._blocks:
             bodies = block.add_bodies(identifier, bodies)
@@ -155,40 +153,16 @@ class BlockStorage(object):
             return type(item)([self.map_global_to_block_local(i, block_id) for i in item])
         raise TypeError('Not implemented for type %s' % type(item))
 
-    def map_to_periodic_domain(self, body):
-        if not self._periodic.any():
-            if body.position() in self._domain:
-                return BodyStorage([body, ])
-            return BodyStorage()
+    def map_to_periodic_domain(self, solids):
+        """Returns the periodic images of all ``solids`` that cross a face
+        of the periodic domain, see :func:`SolidArray.periodic_images`.
 
-        result = BodyStorage()
-        result.add(body)
-
-        domain = self._domain
-
-        if not np.less_equal(body.domain().size, domain.size).all():
-            raise ValueError('Body bounding box must not be bigger than domain')
-
-        for axis in [0, 1, 2]:
-            bodies = result.copy()
-            for body in bodies:
-                if self._periodic[axis]:
-
-                    bb = body.domain()
-                    delta = np.array([0, 0, 0])
-                    if bb.min[axis] < domain.min[axis]:
-                        delta[axis] = domain.size[axis]
-                    elif bb.max[axis] > domain.max[axis]:
-                        delta[axis] = -domain.size[axis]
-
-                    if delta.any():
-                        assert not domain.contains(body.center() + delta)
-                        mapped = body.create_shadow_copy()
-                        mapped.set_center(body.center() + delta)
-                        result.add(mapped)
-
-        result.remove(body)
-        return result
+        :param solids: A SolidArray or an iterable of solid objects.
+        :return: A SolidArray with the images (shadow copies).
+        """
+        if not isinstance(solids, SolidArray):
+            solids = SolidArray.from_solids(solids)
+        return solids.periodic_images(self._domain, self._periodic)
 
     def exec(self, func, join_func=None, **kwargs):
         if mp.current_process().name != 'MainProcess':
@@ -1,11 +1,18 @@
+from .array import SolidArray
 from .capsule import Capsule, StaticCapsule, DynamicCapsule, create_capsule
 from .cylinder import Cylinder, StaticCylinder, DynamicCylinder, create_cylinder
+from .ids import IdAllocator
+from .shared import SharedSolidArray
+from .spatial_hash import SpatialHash
 from .sphere import Sphere, StaticSphere, DynamicSphere, create_sphere
-from .storage import Storage
+from .storage import Solids, Storage
 
 __all__ = [
     "Sphere", "StaticSphere", "DynamicSphere", "create_sphere",
     "Capsule", "StaticCapsule", "DynamicCapsule", "create_capsule",
     "Cylinder", "StaticCylinder", "DynamicCylinder", "create_cylinder",
-    "Storage"
+    "IdAllocator",
+    "SolidArray", "SharedSolidArray",
+    "SpatialHash",
+    "Solids", "Storage"
 ]
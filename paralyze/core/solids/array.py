@@ -0,0 +1,989 @@
+"""Columnar (structure-of-arrays) storage of many solids.
+
+A :class:`SolidArray` keeps the state of all solids in one contiguous numpy
+array per attribute (center, quaternion, aabb, radius, ...) instead of one
+small buffer per solid object. Solid objects (:class:`Sphere`,
+:class:`Capsule`, :class:`Cylinder`) are only created on request and are
+lightweight views onto a single row of the array.
+"""
+from ..algebra import QuaternionArray, rotation_matrices
+from .capsule import Capsule, StaticCapsule, DynamicCapsule
+from .cylinder import Cylinder, StaticCylinder, DynamicCylinder
+from .bvh import BVH
+from .contacts import contact_pairs
+from .grid import PointGrid, bin_into_domains
+from .periodic import periodic_images
+from .precision import as_dtype, promote
+from .solid import IDynamicSolid, DynamicPSolid
+from .sphere import Sphere, StaticSphere, DynamicSphere
+from . import ids
+
+import numpy as np
+
+
+def _key(item):
+    """Converts a layout slice or index into a hashable key.
+    """
+    if isinstance(item, slice):
+        return item.start, item.stop
+    return item
+
+
+def _ray_box_intervals(origins, directions, bounds):
+    """Returns the distances along each ray at which it enters and leaves the
+    box ``bounds``. Rays that miss the box leave it before they enter it.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1. / directions
+        t0 = (bounds[:3] - origins) * inverse
+        t1 = (bounds[3:] - origins) * inverse
+        enter = np.nanmax(np.minimum(t0, t1), axis=1)
+        leave = np.nanmin(np.maximum(t0, t1), axis=1)
+    # hits on the box surface must not be cut off by rounding
+    padding = 1e-9 * (np.max(np.abs(origins), axis=1) + float(np.max(np.abs(bounds))) + 1.)
+    return enter - padding, leave + padding
+
+
+class _Row(object):
+    """Maps the flat buffer layout of a :class:`PSolid` onto a row of a
+    :class:`SolidArray`, i.e. ``row[PSolid.CenterSlice]`` returns a view of
+    ``array['center'][index]``.
+    """
+
+    __slots__ = ('_array', '_index', '_layout')
+
+    def __init__(self, array, index, layout):
+        self._array = array
+        self._index = index
+        self._layout = layout
+
+    def __getitem__(self, item):
+        return self._array._columns[self._layout[_key(item)]][self._index]
+
+    def __setitem__(self, item, value):
+        self._array._columns[self._layout[_key(item)]][self._index] = value
+
+    def __len__(self):
+        return len(self._layout)
+
+    @property
+    def dtype(self):
+        return self._array.dtype
+
+
+class SolidArray(object):
+    """Stores the state of many solids in a structure-of-arrays layout.
+
+    Each solid attribute is stored in its own numpy array (column) with one
+    row per solid. Columns are accessed by name, e.g. ``solids['center']``
+    returns an (N, 3) array. Indexing with an int returns a solid object that
+    is a view onto the corresponding row, i.e. changes to the solid are
+    written directly into the columns.
+
+    Parameters
+    ----------
+    size: int
+        The initial number of (default initialized) solids.
+    dynamic: bool
+        If ``True``, the array additionally stores the dynamic state of the
+        solids (density, force, torque, velocities, and inertia) and row views
+        are instances of :class:`IDynamicSolid`.
+    dtype: str or numpy.dtype
+        The floating point type of all float columns, defaults to
+        :data:`paralyze.core.solids.precision.DEFAULT_DTYPE`.
+
+    Notes
+    -----
+    Row views stay valid as long as no rows are removed from or reordered in
+    the array. Appending solids does not invalidate existing views.
+
+    Data written into the array is cast to its dtype, see
+    :mod:`paralyze.core.solids.precision` for the conversion rules.
+
+    Examples
+    --------
+    >>> solids = SolidArray.spheres(centers=[(0, 0, 0), (2, 0, 0)], radii=1)
+    >>> solids['radius']
+    array([1., 1.], dtype=float32)
+    >>> s = solids[1]
+    >>> s.radius = 2
+    >>> solids['radius']
+    array([1., 2.], dtype=float32)
+    """
+
+    SphereType = 1
+    CapsuleType = 2
+    CylinderType = 3
+
+    # column name, dtype (None: dtype of the array), row shape, default value
+    StaticColumns = (
+        ('id'        , np.int64, ()  , None),
+        ('type'      , np.int8 , ()  , SphereType),
+        ('aabb'      , None    , (6,), 0),
+        ('center'    , None    , (3,), 0),
+        ('quaternion', None    , (4,), (1, 0, 0, 0)),
+        ('radius'    , None    , ()  , 1),
+        ('length'    , None    , ()  , 0),
+        ('shadow_of' , np.int64, ()  , -1)
+    )
+    DynamicColumns = (
+        ('density'         , None, () , 1),
+        ('force'           , None, (3,), 0),
+        ('torque'          , None, (3,), 0),
+        ('linear_velocity' , None, (3,), 0),
+        ('angular_velocity', None, (3,), 0),
+        ('inertia'         , None, (9,), 0)
+    )
+
+    ViewTypes = {
+        SphereType  : (StaticSphere  , DynamicSphere  ),
+        CapsuleType : (StaticCapsule , DynamicCapsule ),
+        CylinderType: (StaticCylinder, DynamicCylinder)
+    }
+
+    _layouts = {}
+
+    def __init__(self, size=0, dynamic=False, dtype=None):
+        self._dtype = as_dtype(dtype)
+        self._dynamic = bool(dynamic)
+        self._size = 0
+        self._columns = {}
+        for name, col_dtype, shape, default in self.column_specs():
+            self._columns[name] = np.empty((0,) + shape, dtype=col_dtype or self._dtype)
+        self.resize(size)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, (int, np.integer)):
+            return self.view(key)
+        return self.take(key)
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, str):
+            raise TypeError('SolidArray only supports column assignment, got key %r' % (key, ))
+        self.column(key)[...] = value
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self.view(i)
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return 'SolidArray(size={:d}, dynamic={!r}, dtype={!r})'.format(self._size, self._dynamic, self._dtype)
+
+    @property
+    def capacity(self):
+        """Returns the number of solids the array can hold without reallocating
+        its columns.
+        """
+        return len(self._columns['type'])
+
+    def column(self, name):
+        """Returns a view of the column ``name`` with one row per solid.
+        """
+        try:
+            return self._columns[name][:self._size]
+        except KeyError:
+            raise KeyError('SolidArray has no column {!r}'.format(name))
+
+    def column_specs(self):
+        """Returns the (name, dtype, shape, default) tuples of all columns.
+        """
+        if self._dynamic:
+            return self.StaticColumns + self.DynamicColumns
+        return self.StaticColumns
+
+    @property
+    def columns(self):
+        """Returns the names of all columns.
+        """
+        return tuple(spec[0] for spec in self.column_specs())
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def dynamic(self):
+        return self._dynamic
+
+    def append(self, solid):
+        """Appends a single solid object to the array.
+        """
+        self.extend((solid, ))
+
+    def extend(self, solids):
+        """Appends all ``solids`` to the array.
+
+        Parameters
+        ----------
+        solids: SolidArray or iterable
+            Either another SolidArray or an iterable of solid objects.
+        """
+        if not isinstance(solids, SolidArray):
+            solids = SolidArray.from_solids(solids, dynamic=self._dynamic, dtype=self._dtype)
+        n = len(solids)
+        if n == 0:
+            return
+        start = self._size
+        self.reserve(start + n)
+        self._size = start + n
+        for name, col_dtype, shape, default in self.column_specs():
+            if name in solids._columns:
+                self._columns[name][start:self._size] = solids.column(name)
+            else:
+                self._columns[name][start:self._size] = default
+
+    def reserve(self, capacity):
+        """Grows the columns such that at least ``capacity`` solids fit into the
+        array. Capacity grows geometrically, so that appending solids one by
+        one is amortized constant time.
+        """
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        for name, col_dtype, shape, default in self.column_specs():
+            old = self._columns[name]
+            new = np.empty((capacity, ) + shape, dtype=old.dtype)
+            new[:len(old)] = old
+            self._columns[name] = new
+
+    def resize(self, size):
+        """Changes the number of solids to ``size``. New solids are default
+        initialized.
+        """
+        old_size = self._size
+        self.reserve(size)
+        self._size = size
+        if size > old_size:
+            for name, col_dtype, shape, default in self.column_specs():
+                if name == 'id':
+                    self._columns['id'][old_size:size] = ids.allocate(size - old_size)
+                else:
+                    self._columns[name][old_size:size] = default
+
+    def memory_report(self):
+        """Returns the number of bytes allocated by each column (including the
+        reserved capacity) and their ``'total'``.
+
+        Examples
+        --------
+        >>> SolidArray(1000, dtype='float64').memory_report()['center']
+        24000
+        """
+        report = dict((name, self._columns[name].nbytes) for name in self.columns)
+        report['total'] = sum(report.values())
+        return report
+
+    @staticmethod
+    def estimate_memory(size, dynamic=False, dtype=None):
+        """Returns the number of bytes per column (and the ``'total'``) that a
+        SolidArray of ``size`` solids requires, e.g. to size jobs before
+        loading large beds.
+
+        Examples
+        --------
+        >>> SolidArray.estimate_memory(10**6, dtype='float32')['total']
+        77000000
+        """
+        dtype = as_dtype(dtype)
+        columns = SolidArray.StaticColumns
+        if dynamic:
+            columns = columns + SolidArray.DynamicColumns
+        report = dict(
+            (name, size * int(np.prod(shape, dtype=np.int64)) * np.dtype(col_dtype or dtype).itemsize)
+            for name, col_dtype, shape, default in columns
+        )
+        report['total'] = sum(report.values())
+        return report
+
+    def quaternions(self):
+        """Returns the quaternion column as :class:`QuaternionArray` that shares
+        memory with the array.
+        """
+        return self.column('quaternion').view(QuaternionArray)
+
+    def reassign_ids(self):
+        """Replaces the ids of all solids by new ids of the current process'
+        id allocator, see :mod:`paralyze.core.solids.ids`.
+        """
+        self.column('id')[...] = ids.allocate(self._size)
+
+    def take(self, indices):
+        """Returns a new SolidArray containing copies of the selected rows.
+
+        Parameters
+        ----------
+        indices: array-like
+            An int index array, a bool mask or a slice.
+        """
+        if isinstance(indices, slice):
+            indices = np.arange(self._size)[indices]
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        result = SolidArray(dynamic=self._dynamic, dtype=self._dtype)
+        result.reserve(len(indices))
+        result._size = len(indices)
+        for name in self.columns:
+            result._columns[name][:len(indices)] = self.column(name)[indices]
+        return result
+
+    def astype(self, dtype):
+        """Returns a copy of the array with all float columns converted to
+        ``dtype``.
+        """
+        result = SolidArray(dynamic=self._dynamic, dtype=dtype)
+        result.extend(self)
+        return result
+
+    def axes(self):
+        """Returns the (N, 3) unit vectors of the solids' center lines, i.e. the
+        body x-axis rotated into the global frame.
+        """
+        return rotation_matrices(self.column('quaternion'))[:, :, 0]
+
+    def orientation_tensor(self):
+        """Returns the 3x3 orientation (order) tensor ``<a a^T>`` of the
+        solids' axes ``a``.
+
+        The eigenvalues of the tensor characterise the orientation distribution,
+        e.g. they are all 1/3 for an isotropic rod packing.
+        """
+        a = self.axes().astype(np.float64)
+        if not len(a):
+            return np.zeros((3, 3))
+        return np.einsum('ni,nj->ij', a, a) / len(a)
+
+    def contains_points(self, points, which=False):
+        """Tests many points against all solids at once.
+
+        Parameters
+        ----------
+        points: array-like
+            The (M, 3) points.
+        which: bool
+            If ``True``, the index of a solid that contains the point is returned
+            instead of a bool.
+
+        Returns
+        -------
+        numpy.ndarray:
+            Either a bool array indicating for each point whether it is inside
+            any of the solids, or (if ``which`` is ``True``) an int array with
+            the index of a containing solid or -1 if the point is not inside any
+            solid.
+
+        Notes
+        -----
+        Candidate (point, solid) pairs are generated by sorting the points into
+        a uniform grid with a cell size of half the median solid size, such
+        that each solid is only tested against the points in its vicinity.
+        """
+        points = np.asarray(points).reshape((-1, 3))
+        if which:
+            result = np.full(len(points), -1, dtype=np.int64)
+        else:
+            result = np.zeros(len(points), dtype=bool)
+        if self._size == 0 or len(points) == 0:
+            return result
+
+        aabbs = self.column('aabb')
+        grid = PointGrid(points, .5 * np.median(np.max(aabbs[:, 3:] - aabbs[:, :3], axis=1)))
+        axes = None
+        if np.any(self.column('type') != self.SphereType):
+            axes = self.axes()
+
+        for solid, point in grid.iter_candidates(aabbs[:, :3], aabbs[:, 3:]):
+            inside = self._contains(solid, points[point], axes)
+            if which:
+                result[point[inside]] = solid[inside]
+            else:
+                result[point[inside]] = True
+        return result
+
+    def _contains(self, rows, points, axes):
+        """Tests each point against the solid in the corresponding row.
+        """
+        types = self.column('type')[rows]
+        centers = self.column('center')[rows]
+        radii = self.column('radius')[rows]
+        inside = np.zeros(len(rows), dtype=bool)
+
+        spheres = types == self.SphereType
+        inside[spheres] = Sphere.calc_contains(points[spheres], centers[spheres], radii[spheres])
+        for solid_type, cls in ((self.CapsuleType, Capsule), (self.CylinderType, Cylinder)):
+            m = types == solid_type
+            if m.any():
+                inside[m] = cls.calc_contains(points[m], centers[m], axes[rows[m]], radii[m],
+                                              self.column('length')[rows[m]])
+        return inside
+
+    def bvh(self, leaf_size=4):
+        """Returns a :class:`paralyze.core.solids.bvh.BVH` over the bounding
+        boxes of all solids. The hierarchy has to be rebuilt when solids move.
+        """
+        return BVH(self.column('aabb'), leaf_size)
+
+    def cast_rays(self, origins, directions, max_distance=np.inf, bvh=None, chunk_size=4096):
+        """Returns the first solid hit by each ray.
+
+        Parameters
+        ----------
+        origins: array-like
+            The (M, 3) ray origins.
+        directions: array-like
+            The (M, 3) or (3,) ray directions, need not be normalised.
+        max_distance: float or array-like
+            The maximum distance along each ray.
+        bvh: BVH
+            A hierarchy over the current bounding boxes (see :func:`bvh`) to
+            reuse between calls, built on the fly if ``None``.
+        chunk_size: int
+            The number of rays that are traced at once.
+
+        Returns
+        -------
+        index: numpy.ndarray
+            The index of the first solid hit by each ray or -1.
+        distance: numpy.ndarray
+            The distance along each ray to the hit or ``inf``. Rays that start
+            inside a solid hit it at distance 0.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape((-1, 3))
+        directions = np.asarray(directions, dtype=np.float64).reshape((-1, 3))
+        directions = np.broadcast_to(directions / np.linalg.norm(directions, axis=1)[:, np.newaxis], origins.shape)
+        max_distance = np.broadcast_to(np.asarray(max_distance, dtype=np.float64), (len(origins), ))
+
+        index = np.full(len(origins), -1, dtype=np.int64)
+        distance = np.full(len(origins), np.inf)
+        if self._size == 0:
+            return index, distance
+        if bvh is None:
+            bvh = self.bvh()
+        axes = self.axes() if np.any(self.column('type') != self.SphereType) else None
+
+        # rays are traced in windows of growing length, so that nodes behind the
+        # first hit are not traversed
+        aabbs = self.column('aabb')
+        bounds = np.concatenate((aabbs[:, :3].min(axis=0), aabbs[:, 3:].max(axis=0))).astype(np.float64)
+        window = 2. * float(np.median(np.max(aabbs[:, 3:] - aabbs[:, :3], axis=1)))
+        if not window > 0:
+            window = max(float(np.max(bounds[3:] - bounds[:3])), 1.0)
+        # no solid is hit behind the point where a ray leaves the bounds of all solids
+        enter, leave = _ray_box_intervals(origins, directions, bounds)
+        limit = np.where(leave >= np.maximum(enter, 0), np.minimum(max_distance, leave), -1.)
+        for start in range(0, len(origins), chunk_size):
+            active = np.arange(start, min(start + chunk_size, len(origins)))
+            active = active[limit[active] >= 0]
+            lo = np.maximum(enter[active], 0)
+            hi = np.minimum(lo + window, limit[active])
+            step = window
+            while len(active):
+                ray, solid, _ = bvh.ray_candidates(origins[active], directions[active], hi, lo)
+                t = self._intersect_rays(solid, origins[active[ray]], directions[active[ray]], axes)
+                hit = t <= hi[ray]
+                ray, solid, t = ray[hit], solid[hit], t[hit]
+                # keep the closest hit per ray
+                order = np.lexsort((t, ray))
+                ray, solid, t = ray[order], solid[order], t[order]
+                first = np.ones(len(ray), dtype=bool)
+                first[1:] = ray[1:] != ray[:-1]
+                index[active[ray[first]]] = solid[first]
+                distance[active[ray[first]]] = t[first]
+
+                pending = (index[active] < 0) & (hi < limit[active])
+                step *= 2
+                active, lo, hi = active[pending], hi[pending], np.minimum(hi[pending] + step, limit[active[pending]])
+        return index, distance
+
+    def _intersect_rays(self, rows, origins, directions, axes):
+        """Returns the distance along each ray to the solid in the
+        corresponding row.
+        """
+        types = self.column('type')[rows]
+        centers = self.column('center')[rows]
+        radii = self.column('radius')[rows]
+        t = np.full(len(rows), np.inf)
+
+        spheres = types == self.SphereType
+        t[spheres] = Sphere.calc_ray_intersections(origins[spheres], directions[spheres], centers[spheres],
+                                                   radii[spheres])
+        for solid_type, cls in ((self.CapsuleType, Capsule), (self.CylinderType, Cylinder)):
+            m = types == solid_type
+            if m.any():
+                t[m] = cls.calc_ray_intersections(origins[m], directions[m], centers[m], axes[rows[m]], radii[m],
+                                                  self.column('length')[rows[m]])
+        return t
+
+    def contacts(self, tolerance=0.0, domain=None, periodicity=(False, False, False)):
+        """Returns all pairs of solids that touch or overlap, see
+        :func:`paralyze.core.solids.contacts.contact_pairs`.
+
+        Contact detection is currently only supported for spheres.
+
+        Returns
+        -------
+        first, second: numpy.ndarray
+            The row indices of the solids of each contact pair.
+        gap: numpy.ndarray
+            The surface distance of each pair (negative for overlaps).
+        """
+        if np.any(self.column('type') != self.SphereType):
+            raise TypeError('contact detection is only supported for spheres')
+        return contact_pairs(self.column('center'), self.column('radius'), tolerance, domain, periodicity)
+
+    def periodic_images(self, domain, periodicity):
+        """Returns the periodic images (shadow copies) of all solids whose
+        bounding box crosses a face of the periodic ``domain``.
+
+        Images get new ids, their ``shadow_of`` column holds the id of the
+        solid they are a copy of (it is -1 for all other solids).
+
+        Parameters
+        ----------
+        domain: AABB
+            The periodic domain.
+        periodicity: array-like
+            Whether the domain is periodic along the x, y, and z axis.
+
+        Returns
+        -------
+        SolidArray:
+            The images, use :func:`concatenate` to add them to the solids.
+        """
+        source, shift = periodic_images(self.column('aabb'), domain, periodicity)
+        images = self.take(source)
+        images['shadow_of'] = np.where(self.column('shadow_of')[source] >= 0,
+                                       self.column('shadow_of')[source], self.column('id')[source])
+        images['center'] += shift
+        images['aabb'][:, :3] += shift
+        images['aabb'][:, 3:] += shift
+        images.reassign_ids()
+        return images
+
+    def shadows(self):
+        """Returns the bool mask of all rows that are shadow copies.
+        """
+        return self.column('shadow_of') >= 0
+
+    def split_indices(self, domains, mode='center'):
+        """Bins all solids into the given domains in one pass, see
+        :func:`paralyze.core.solids.grid.bin_into_domains`.
+
+        Parameters
+        ----------
+        domains: list
+            The domains (AABBs).
+        mode: str
+            ``'center'`` assigns each solid to the domains that contain its
+            center, ``'intersects'`` to all domains its bounding box
+            intersects, e.g. to include the shadow copies of solids that
+            cross the domain boundaries.
+
+        Returns
+        -------
+        list:
+            The row indices of the solids of each domain, use :func:`take`
+            to extract them.
+        """
+        if mode == 'center':
+            return bin_into_domains(domains, self.column('center'))
+        if mode == 'intersects':
+            aabbs = self.column('aabb')
+            return bin_into_domains(domains, aabbs[:, :3], aabbs[:, 3:])
+        raise ValueError('unknown split mode {!r}'.format(mode))
+
+    def copy(self):
+        """Returns a deep copy of the array. Solid ids are preserved.
+        """
+        return self.take(slice(None))
+
+    def view(self, index):
+        """Returns a solid object that is a view onto row ``index``.
+        """
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('index {:d} out of range for SolidArray of size {:d}'.format(index, self._size))
+        cls = self.ViewTypes[self._columns['type'][index]][self._dynamic]
+        return cls.view(_Row(self, index, self._layout(cls)), int(self._columns['id'][index]))
+
+    def update(self):
+        """Updates the bounding boxes and, for dynamic arrays, the inertia of
+        all solids.
+        """
+        self.update_aabbs()
+        if self._dynamic:
+            self.update_inertia()
+
+    def update_inertia(self):
+        """Recalculates the body frame inertia of all solids.
+        """
+        if not self._dynamic:
+            raise TypeError('update_inertia requires a dynamic SolidArray')
+        column = self.column('inertia')
+        column[...] = 0
+        column[:, 0::4] = self.principal_moments()
+
+    def densities(self, density=None):
+        """Returns the densities of all solids.
+
+        Parameters
+        ----------
+        density: float or array-like
+            Overrides the solid densities. If ``None``, the ``density`` column
+            is used for dynamic arrays and a unit density for static arrays.
+        """
+        if density is None:
+            if self._dynamic:
+                return self.column('density')
+            density = 1
+        return np.broadcast_to(np.asarray(density, dtype=self._dtype), (self._size,))
+
+    def masses(self, density=None):
+        """Returns the masses of all solids, see :func:`densities` for the
+        ``density`` parameter.
+        """
+        return self.volumes() * self.densities(density)
+
+    def principal_moments(self, density=None):
+        """Returns the (N, 3) principal moments of inertia of all solids, i.e.
+        the diagonals of the body frame inertia tensors.
+
+        The moments are computed from the solid geometries (grouped by solid
+        type), see :func:`densities` for the ``density`` parameter.
+        """
+        types = self.column('type')
+        radii = self.column('radius')
+        lengths = self.column('length')
+        densities = self.densities(density)
+        moments = np.zeros((self._size, 3), dtype=self._dtype)
+
+        rows = types == self.SphereType
+        moments[rows] = DynamicSphere.calc_inertia(radii[rows], densities[rows])
+        for solid_type, cls in ((self.CapsuleType, DynamicCapsule), (self.CylinderType, DynamicCylinder)):
+            rows = types == solid_type
+            moments[rows] = cls.calc_inertia(radii[rows], lengths[rows], densities[rows])
+        return moments
+
+    def inertia_tensors(self, density=None, frame='global'):
+        """Returns the (N, 3, 3) inertia tensors of all solids.
+
+        Parameters
+        ----------
+        density: float or array-like
+            See :func:`densities`.
+        frame: str
+            Either ``'global'`` for the inertia tensors in the global frame,
+            i.e. ``R I R^T``, or ``'body'`` for the (diagonal) body frame
+            tensors.
+        """
+        moments = self.principal_moments(density)
+        if frame == 'body':
+            tensors = np.zeros((self._size, 3, 3), dtype=self._dtype)
+            tensors[:, (0, 1, 2), (0, 1, 2)] = moments
+            return tensors
+        if frame != 'global':
+            raise ValueError("frame must be either 'global' or 'body'")
+        return self._rotate_moments(moments)
+
+    def mass_properties(self, density=None):
+        """Returns the masses, the principal moments of inertia, and the global
+        frame inertia tensors of all solids.
+
+        Returns
+        -------
+        masses: numpy.ndarray
+            The (N,) masses.
+        moments: numpy.ndarray
+            The (N, 3) body frame principal moments of inertia.
+        tensors: numpy.ndarray
+            The (N, 3, 3) global frame inertia tensors.
+        """
+        moments = self.principal_moments(density)
+        return self.masses(density), moments, self._rotate_moments(moments)
+
+    def _rotate_moments(self, moments):
+        # R diag(moments) R^T for all solids
+        r = rotation_matrices(self.column('quaternion'))
+        return (r * moments[:, np.newaxis, :]) @ r.transpose((0, 2, 1))
+
+    def center_of_mass(self, density=None):
+        """Returns the center of mass of all solids (accumulated in double
+        precision).
+        """
+        masses = self.masses(density).astype(np.float64)
+        total = masses.sum()
+        if total == 0:
+            raise ZeroDivisionError('solids have no mass')
+        return masses.dot(self.column('center')) / total
+
+    def equivalent_mesh_sizes(self):
+        """Returns the mesh sizes at which the solids would not pass a sieve
+        anymore, i.e. the diameters for all supported solid types.
+        """
+        return 2 * self.column('radius')
+
+    def volumes(self):
+        """Returns the volumes of all solids.
+        """
+        types = self.column('type')
+        radii = self.column('radius')
+        lengths = self.column('length')
+        volumes = np.empty(self._size, dtype=self._dtype)
+
+        rows = types == self.SphereType
+        volumes[rows] = Sphere.calc_volumes(radii[rows])
+        for solid_type, cls in ((self.CapsuleType, Capsule), (self.CylinderType, Cylinder)):
+            rows = types == solid_type
+            volumes[rows] = cls.calc_volumes(radii[rows], lengths[rows])
+        return volumes
+
+    def update_aabbs(self):
+        """Recalculates the axis-aligned bounding boxes of all solids.
+        """
+        types = self.column('type')
+        aabbs = self.column('aabb')
+
+        spheres = types == self.SphereType
+        centers = self.column('center')[spheres]
+        radii = self.column('radius')[spheres, np.newaxis]
+        aabbs[spheres, :3] = centers - radii
+        aabbs[spheres, 3:] = centers + radii
+
+        for solid_type, cls in ((self.CapsuleType, Capsule), (self.CylinderType, Cylinder)):
+            rows = types == solid_type
+            if rows.any():
+                aabbs[rows] = cls.calc_aabbs(
+                    self.column('center')[rows], self.column('quaternion')[rows],
+                    self.column('radius')[rows], self.column('length')[rows]
+                )
+
+    @classmethod
+    def _layout(cls, solid_type):
+        """Returns the mapping of the flat buffer layout of ``solid_type`` to
+        column names.
+        """
+        layout = cls._layouts.get(solid_type)
+        if layout is None:
+            layout = {
+                _key(solid_type.AABBSlice): 'aabb',
+                _key(solid_type.CenterSlice): 'center',
+                _key(solid_type.QuaternionSlice): 'quaternion',
+                solid_type.RadiusIndex: 'radius'
+            }
+            if hasattr(solid_type, 'LengthIndex'):
+                layout[solid_type.LengthIndex] = 'length'
+            if issubclass(solid_type, DynamicPSolid):
+                layout.update({
+                    solid_type.DensityIndex: 'density',
+                    _key(solid_type.ForceSlice): 'force',
+                    _key(solid_type.TorqueSlice): 'torque',
+                    _key(solid_type.LinVelSlice): 'linear_velocity',
+                    _key(solid_type.AngVelSlice): 'angular_velocity',
+                    _key(solid_type.InertiaSlice): 'inertia'
+                })
+            cls._layouts[solid_type] = layout
+        return layout
+
+    @staticmethod
+    def type_of(solid):
+        """Returns the type code of a solid object.
+        """
+        if isinstance(solid, Sphere):
+            return SolidArray.SphereType
+        if isinstance(solid, Capsule):
+            return SolidArray.CapsuleType
+        if isinstance(solid, Cylinder):
+            return SolidArray.CylinderType
+        raise TypeError('Unsupported solid type %s' % type(solid))
+
+    @staticmethod
+    def concatenate(arrays, dtype=None):
+        """Returns a new SolidArray with the rows of all ``arrays``.
+
+        The result is dynamic only if all ``arrays`` are dynamic. Its dtype is
+        the widest dtype of all ``arrays`` unless ``dtype`` is given.
+        """
+        arrays = list(arrays)
+        if not arrays:
+            return SolidArray(dtype=dtype)
+        dynamic = all(a.dynamic for a in arrays)
+        if dtype is None:
+            dtype = promote(*[a.dtype for a in arrays])
+        result = SolidArray(dynamic=dynamic, dtype=dtype)
+        result.reserve(sum(len(a) for a in arrays))
+        for a in arrays:
+            result.extend(a)
+        return result
+
+    @staticmethod
+    def from_columns(columns, dynamic=None, dtype=None, copy=True):
+        """Creates a new SolidArray from column data, e.g. the columns of a
+        file. Missing columns are default initialized and new ids are
+        allocated if there is no ``id`` column.
+
+        Parameters
+        ----------
+        columns: dict
+            The column arrays (or memory maps) by name, all with the same
+            number of rows.
+        dynamic: bool or None
+            If ``None``, the array is dynamic if any dynamic column is given.
+            Dynamic columns are ignored if ``dynamic`` is False.
+        dtype: str or numpy.dtype
+            The floating point type of the array. If ``None``, the widest
+            dtype of all float columns is used.
+        copy: bool
+            If ``False``, columns that already have the dtype and shape of the
+            array column are used without copying them, e.g. memory maps.
+            Read-only columns stay read-only, appending solids copies them.
+        """
+        static = set(spec[0] for spec in SolidArray.StaticColumns)
+        dynamic_names = set(spec[0] for spec in SolidArray.DynamicColumns)
+        unknown = set(columns) - static - dynamic_names
+        if unknown:
+            raise KeyError('SolidArray has no column(s) {!s}'.format(', '.join(sorted(unknown))))
+        if dynamic is None:
+            dynamic = bool(set(columns) & dynamic_names)
+        if dtype is None:
+            floats = [np.asarray(columns[spec[0]]).dtype for spec in SolidArray.StaticColumns + SolidArray.DynamicColumns
+                      if spec[1] is None and spec[0] in columns]
+            dtype = promote(*floats) if floats else None
+        sizes = set(len(value) for value in columns.values())
+        if len(sizes) > 1:
+            raise ValueError('all columns must have the same number of rows')
+        size = sizes.pop() if sizes else 0
+
+        result = SolidArray(dynamic=dynamic, dtype=dtype)
+        result._size = size
+        for name, col_dtype, shape, default in result.column_specs():
+            column = columns.get(name)
+            if not copy and isinstance(column, np.ndarray) and column.dtype == result._columns[name].dtype \
+                    and column.shape == (size, ) + shape:
+                result._columns[name] = column
+                continue
+            result._columns[name] = np.empty((size, ) + shape, dtype=result._columns[name].dtype)
+            if name in columns:
+                result._columns[name][:size] = np.reshape(columns[name], (size, ) + shape)
+            elif name == 'id':
+                result._columns['id'][:size] = ids.allocate(size)
+            else:
+                result._columns[name][:size] = default
+        return result
+
+    @staticmethod
+    def from_solids(solids, dynamic=None, dtype=None):
+        """Creates a new SolidArray from an iterable of solid objects.
+
+        Parameters
+        ----------
+        solids: iterable
+            Solid objects, i.e. instances of :class:`Sphere`, :class:`Capsule`,
+            or :class:`Cylinder`.
+        dynamic: bool or None
+            If ``None``, the array is dynamic if all solids are dynamic.
+        dtype: str or numpy.dtype
+            The floating point type of the array. If ``None``, the widest dtype
+            of all solids is used.
+        """
+        solids = list(solids)
+        if dynamic is None:
+            dynamic = len(solids) > 0 and all(isinstance(s, IDynamicSolid) for s in solids)
+        if dtype is None and solids:
+            dtype = promote(*set(s.dtype for s in solids))
+
+        result = SolidArray(len(solids), dynamic=dynamic, dtype=dtype)
+        if not solids:
+            return result
+
+        result['id'] = [s.id for s in solids]
+        result['type'] = [SolidArray.type_of(s) for s in solids]
+        result['aabb'] = [s.aabb for s in solids]
+        result['center'] = [s.center for s in solids]
+        result['quaternion'] = [s.quaternion for s in solids]
+        result['radius'] = [s.radius for s in solids]
+        result['length'] = [getattr(s, 'length', 0) for s in solids]
+        if dynamic:
+            # static solids keep the default dynamic state
+            rows = [i for i, s in enumerate(solids) if isinstance(s, IDynamicSolid)]
+            solids = [solids[i] for i in rows]
+            if rows:
+                result['density'][rows] = [s.density for s in solids]
+                result['force'][rows] = [s.force for s in solids]
+                result['torque'][rows] = [s.torque for s in solids]
+                result['linear_velocity'][rows] = [s.linear_velocity for s in solids]
+                result['angular_velocity'][rows] = [s.angular_velocity for s in solids]
+                result['inertia'][rows] = [np.ravel(s.inertia) for s in solids]
+        return result
+
+    @staticmethod
+    def rods(centers, radii, lengths, axes=(1, 0, 0), solid_type=CapsuleType,
+             dynamic=False, dtype=None, **columns):
+        """Creates a new SolidArray of capsules or cylinders from column data.
+
+        Parameters
+        ----------
+        centers: array-like
+            The (N, 3) centers.
+        radii: float or array-like
+            The radii.
+        lengths: float or array-like
+            The lengths of the center lines.
+        axes: array-like
+            The (N, 3) or (3,) directions of the center lines, need not be
+            normalised.
+        solid_type: int
+            Either :attr:`CapsuleType` or :attr:`CylinderType`.
+        dynamic: bool
+            Whether the array stores the dynamic solid state.
+        dtype: str or numpy.dtype
+            The floating point type of the array.
+        columns: dict
+            Optional values of further columns, e.g. ``density``.
+        """
+        if solid_type not in (SolidArray.CapsuleType, SolidArray.CylinderType):
+            raise ValueError('solid_type must be either CapsuleType or CylinderType')
+
+        centers = np.asarray(centers).reshape((-1, 3))
+        result = SolidArray(len(centers), dynamic=dynamic, dtype=dtype)
+        result['type'] = solid_type
+        result['center'] = centers
+        result['quaternion'] = QuaternionArray.between((1, 0, 0), axes)
+        result['radius'] = radii
+        result['length'] = lengths
+        for name, value in columns.items():
+            result[name] = value
+        result.update()
+        return result
+
+    @staticmethod
+    def spheres(centers, radii, dynamic=False, dtype=None, **columns):
+        """Creates a new SolidArray of spheres from column data.
+
+        Parameters
+        ----------
+        centers: array-like
+            The (N, 3) sphere centers.
+        radii: float or array-like
+            The sphere radii.
+        dynamic: bool
+            Whether the array stores the dynamic solid state.
+        dtype: str or numpy.dtype
+            The floating point type of the array.
+        columns: dict
+            Optional values of further columns, e.g. ``density`` or
+            ``linear_velocity``.
+        """
+        centers = np.asarray(centers).reshape((-1, 3))
+        result = SolidArray(len(centers), dynamic=dynamic, dtype=dtype)
+        result['center'] = centers
+        result['radius'] = radii
+        for name, value in columns.items():
+            result[name] = value
+        result.update()
+        return result
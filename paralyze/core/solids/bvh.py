@@ -0,0 +1,220 @@
+"""Bounding volume hierarchy (BVH) over axis aligned bounding boxes.
+
+The hierarchy is built in bulk from an (N, 6) array of boxes, e.g. the
+``aabb`` column of a :class:`SolidArray`: boxes are sorted along a Morton
+(z-order) curve, consecutive boxes are grouped into leaves, and the levels
+above are built by merging pairs of neighboring nodes. Queries are evaluated
+for many boxes or rays at once by traversing the hierarchy level by level
+with array operations.
+"""
+from .grid import expand_ranges
+
+import numpy as np
+
+
+def morton_codes(points, bounds_min=None, bounds_max=None, bits=21):
+    """Returns the 3D Morton (z-order) codes of ``points``.
+
+    Parameters
+    ----------
+    points: array-like
+        The (N, 3) points.
+    bounds_min, bounds_max: array-like
+        The region that is mapped onto the code space. Defaults to the bounds
+        of the points.
+    bits: int
+        The number of bits per axis (at most 21).
+
+    Returns
+    -------
+    numpy.ndarray:
+        The (N,) uint64 codes.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape((-1, 3))
+    if bounds_min is None:
+        bounds_min = points.min(axis=0) if len(points) else np.zeros(3)
+    if bounds_max is None:
+        bounds_max = points.max(axis=0) if len(points) else np.ones(3)
+    extent = np.maximum(np.asarray(bounds_max) - bounds_min, np.finfo(np.float64).tiny)
+    scale = (1 << bits) - 1
+    cells = np.clip((points - bounds_min) / extent * scale, 0, scale).astype(np.uint64)
+
+    x, y, z = (_spread_bits(cells[:, axis]) for axis in range(3))
+    return (x << np.uint64(2)) | (y << np.uint64(1)) | z
+
+
+def _spread_bits(v):
+    """Inserts two zero bits between each of the lower 21 bits of ``v``.
+    """
+    v = v & np.uint64(0x1fffff)
+    for shift, mask in ((32, 0x1f00000000ffff), (16, 0x1f0000ff0000ff), (8, 0x100f00f00f00f00f),
+                        (4, 0x10c30c30c30c30c3), (2, 0x1249249249249249)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+class BVH(object):
+    """A binary bounding volume hierarchy over (N, 6) boxes.
+
+    Parameters
+    ----------
+    aabbs: array-like
+        The (N, 6) boxes, i.e. min and max corners.
+    leaf_size: int
+        The maximum number of boxes per leaf.
+
+    Examples
+    --------
+    >>> tree = BVH([(0, 0, 0, 1, 1, 1), (2, 0, 0, 3, 1, 1)])
+    >>> tree.overlaps([(.5, .5, .5)], [(2.5, .5, .5)])
+    (array([0, 0]), array([0, 1]))
+    """
+
+    def __init__(self, aabbs, leaf_size=4):
+        aabbs = np.asarray(aabbs, dtype=np.float64).reshape((-1, 6))
+        self._leaf_size = int(leaf_size)
+        if self._leaf_size < 1:
+            raise ValueError('leaf_size must be positive')
+
+        centers = .5 * (aabbs[:, :3] + aabbs[:, 3:])
+        self._order = np.argsort(morton_codes(centers), kind='stable')
+        self._aabbs = aabbs[self._order]
+
+        # leaves, then pairwise merged levels up to the root
+        levels = []
+        boxes = self._aabbs
+        starts = np.arange(0, len(boxes), self._leaf_size)
+        while True:
+            if len(boxes):
+                boxes = np.concatenate((
+                    np.minimum.reduceat(boxes[:, :3], starts, axis=0),
+                    np.maximum.reduceat(boxes[:, 3:], starts, axis=0)
+                ), axis=1)
+            levels.append(boxes)
+            if len(boxes) <= 1:
+                break
+            starts = np.arange(0, len(boxes), 2)
+        self._levels = levels[::-1]
+
+    def __len__(self):
+        return len(self._aabbs)
+
+    @property
+    def depth(self):
+        """Returns the number of levels including the leaf level.
+        """
+        return len(self._levels)
+
+    @property
+    def leaf_size(self):
+        return self._leaf_size
+
+    @property
+    def order(self):
+        """Returns the box indices in tree (leaf) order.
+        """
+        return self._order
+
+    def overlaps(self, box_min, box_max):
+        """Returns all (query, box) pairs where a query box intersects a box
+        of the hierarchy.
+
+        Parameters
+        ----------
+        box_min, box_max: array-like
+            The (M, 3) min and max corners of the query boxes.
+
+        Returns
+        -------
+        query: numpy.ndarray
+            The query box index of each pair.
+        box: numpy.ndarray
+            The (original) index of the intersecting box of each pair.
+        """
+        box_min = np.asarray(box_min, dtype=np.float64).reshape((-1, 3))
+        box_max = np.asarray(box_max, dtype=np.float64).reshape((-1, 3))
+
+        def overlap(query, boxes):
+            return np.all(boxes[:, :3] <= box_max[query], axis=1) & np.all(boxes[:, 3:] >= box_min[query], axis=1)
+
+        query, box = self._traverse(len(box_min), overlap)
+        return query, self._order[box]
+
+    def ray_candidates(self, origins, directions, max_distance=np.inf, min_distance=0.0):
+        """Returns all (ray, box) pairs where a ray intersects a box of the
+        hierarchy between ``min_distance`` and ``max_distance``.
+
+        Parameters
+        ----------
+        origins: array-like
+            The (M, 3) ray origins.
+        directions: array-like
+            The (M, 3) or (3,) ray directions.
+        max_distance, min_distance: float or array-like
+            The distance interval (in units of the direction length) along each
+            ray.
+
+        Returns
+        -------
+        ray: numpy.ndarray
+            The ray index of each pair.
+        box: numpy.ndarray
+            The (original) index of the intersected box of each pair.
+        distance: numpy.ndarray
+            The distance at which the ray enters the box.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape((-1, 3))
+        directions = np.broadcast_to(np.asarray(directions, dtype=np.float64).reshape((-1, 3)), origins.shape)
+        max_distance = np.broadcast_to(np.asarray(max_distance, dtype=np.float64), (len(origins), ))
+        min_distance = np.broadcast_to(np.asarray(min_distance, dtype=np.float64), (len(origins), ))
+        with np.errstate(divide='ignore'):
+            inverse = 1. / directions
+
+        def entry(ray, boxes):
+            o = origins[ray]
+            inv = inverse[ray]
+            with np.errstate(invalid='ignore'):
+                t0 = (boxes[:, :3] - o) * inv
+                t1 = (boxes[:, 3:] - o) * inv
+            # 0 * inf is nan for rays parallel to and within a slab
+            t0 = np.where(np.isnan(t0), -np.inf, t0)
+            t1 = np.where(np.isnan(t1), np.inf, t1)
+            near = np.maximum(np.max(np.minimum(t0, t1), axis=1), 0)
+            far = np.min(np.maximum(t0, t1), axis=1)
+            return near, (near <= far) & (near <= max_distance[ray]) & (far >= min_distance[ray])
+
+        ray, box = self._traverse(len(origins), lambda r, b: entry(r, b)[1])
+        distance = entry(ray, self._aabbs[box])[0] if len(ray) else np.empty(0)
+        return ray, self._order[box], distance
+
+    def _traverse(self, num_queries, test):
+        """Traverses the hierarchy for all queries at once.
+
+        ``test(query, boxes)`` must return for each (query, node box) pair
+        whether the query may intersect the node.
+        """
+        if not len(self._aabbs):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        query = np.arange(num_queries)
+        node = np.zeros(num_queries, dtype=np.int64)
+        for level, next_level in zip(self._levels, self._levels[1:] + [None]):
+            keep = test(query, level[node])
+            query = query[keep]
+            node = node[keep]
+            if next_level is None:
+                break
+            # descend into both children
+            query = np.repeat(query, 2)
+            node = 2 * np.repeat(node, 2) + np.tile((0, 1), len(node))
+            exists = node < len(next_level)
+            query = query[exists]
+            node = node[exists]
+
+        # expand leaves into boxes
+        starts = node * self._leaf_size
+        counts = np.minimum(starts + self._leaf_size, len(self._aabbs)) - starts
+        owner, box = expand_ranges(starts, counts)
+        query = query[owner]
+        keep = test(query, self._aabbs[box])
+        return query[keep], box[keep]
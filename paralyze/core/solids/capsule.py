@@ -1,7 +1,8 @@
-from ..algebra import AABB, Vector
+from ..algebra import AABB, Vector, rotation_matrices
+from .cylinder import Cylinder
 from .solid import PSolid, DynamicPSolid
+from .sphere import Sphere
 
-import math
 import numpy as np
 
 
@@ -44,8 +45,80 @@ class Capsule(PSolid):
 
         self._data[self.AABBSlice] = AABB(self.center - size, self.center + size, dtype=self.dtype)
 
+    @staticmethod
+    def calc_aabbs(centers, quaternions, radii, lengths, out=None):
+        """Calculates the axis-aligned bounding boxes of many capsules at once.
+
+        This is the vectorized equivalent of :func:`update_aabb`.
+
+        Parameters
+        ----------
+        centers: array-like
+            The (N, 3) capsule centers.
+        quaternions: array-like
+            The (N, 4) capsule orientations.
+        radii: array-like
+            The N capsule radii.
+        lengths: array-like
+            The N capsule lengths.
+        out: numpy.ndarray
+            Optional (N, 6) array the bounding boxes are written to.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The (N, 6) bounding boxes, i.e. min and max corners.
+        """
+        centers = np.asarray(centers).reshape((-1, 3))
+        r = rotation_matrices(quaternions)
+        size = np.abs(r[:, :, 0]) * (.5 * np.asarray(lengths)).reshape((-1, 1)) + np.asarray(radii).reshape((-1, 1))
+        if out is None:
+            out = np.empty((len(centers), 6), dtype=centers.dtype)
+        out[:, :3] = centers - size
+        out[:, 3:] = centers + size
+        return out
+
+    @staticmethod
+    def calc_contains(points, centers, axes, radii, lengths):
+        """Tests whether ``points`` are inside the capsules given by
+        ``centers``, (unit) center line ``axes``, ``radii``, and ``lengths``.
+
+        A point is inside a capsule if its distance to the capsule's center
+        line segment is less than or equal to the radius. All arguments are
+        broadcast against each other, see :func:`Sphere.calc_contains`.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The bool array of test results.
+        """
+        d = np.asarray(points) - centers
+        half = .5 * np.asarray(lengths)
+        t = np.clip(np.einsum('...i,...i->...', d, axes), -half, half)
+        d = d - t[..., np.newaxis] * axes
+        return np.einsum('...i,...i->...', d, d) <= np.square(radii)
+
+    @staticmethod
+    def calc_ray_intersections(origins, directions, centers, axes, radii, lengths):
+        """Returns the distances along the rays to their first intersection
+        with the capsules, see :func:`Cylinder.calc_ray_intervals` for the
+        parameters and :func:`Sphere.calc_ray_intersections` for the result.
+
+        A capsule is the union of a cylinder and two spheres, hence a ray enters
+        the capsule where it first enters one of them.
+        """
+        offset = .5 * np.asarray(lengths)[..., np.newaxis] * axes
+        return np.minimum.reduce((
+            Cylinder.calc_ray_intersections(origins, directions, centers, axes, radii, lengths),
+            Sphere.calc_ray_intersections(origins, directions, centers - offset, radii),
+            Sphere.calc_ray_intersections(origins, directions, centers + offset, radii)
+        ))
+
     def contains(self, point):
-        return False
+        return bool(self.contains_points(point))
+
+    def contains_points(self, points):
+        return Capsule.calc_contains(points, self.center, self.rotation_matrix[:, 0], self.radius, self.length)
 
     @property
     def equivalent_mesh_size(self):
@@ -67,11 +140,18 @@ class Capsule(PSolid):
     def radius(self, radius):
         self._data[self.RadiusIndex] = radius
 
+    @staticmethod
+    def calc_volumes(radii, lengths):
+        """Returns the volumes of capsules with the given ``radii`` and
+        ``lengths``.
+        """
+        caps = 4/3.0 * np.pi * np.power(radii, 3)
+        cylinder = np.pi * np.square(radii) * lengths
+        return cylinder + caps
+
     @property
     def volume(self):
-        caps = 4/3.0 * math.pi * self.radius ** 3
-        cylinder = math.pi * self.radius ** 2 * self.length
-        return cylinder + caps
+        return Capsule.calc_volumes(self.radius, self.length)
 
 
 class StaticCapsule(Capsule):
@@ -79,22 +159,31 @@ class StaticCapsule(Capsule):
 
 
 class DynamicCapsule(DynamicPSolid, Capsule):
-    Length = DynamicPSolid.Length + 2
+    Length      = DynamicPSolid.Length + 2
+    RadiusIndex = DynamicPSolid.Length
+    LengthIndex = DynamicPSolid.Length + 1
 
     def __init__(self, *args, **kwargs):
         DynamicPSolid.__init__(self, *args, **kwargs)
         Capsule.__init__(self, *args, **kwargs)
         self.update_inertia()
 
-    def update_inertia(self):
-        rho = self.density
-        r = self.radius
-        l = self.length
+    @staticmethod
+    def calc_inertia(radii, lengths, densities):
+        """Returns the (..., 3) principal moments of inertia (about the body x,
+        y, and z axes) of capsules with the given ``radii``, ``lengths``, and
+        ``densities``.
+        """
+        r = np.asarray(radii)
+        l = np.asarray(lengths)
 
-        m_s = 4./3 * math.pi * r**3 * rho # mass of cap sphere
-        m_c = math.pi * r**2 * l * rho # mass of cylinder
+        m_s = 4./3 * np.pi * r**3 * densities # mass of cap sphere
+        m_c = np.pi * r**2 * l * densities # mass of cylinder
 
         ia = r**2 * (.5 * m_c + .4 * m_s)
         ib = m_c * (.25 * r**2 + 1./12 * l**2) + m_s * (.4 * r**2 + .375 * r * l + .25 * l**2)
+        return np.stack((ia, ib, ib), axis=-1)
 
-        self._data[self.InertiaSlice] = np.array([ia, 0, 0, 0, ib, 0, 0, 0, ib], dtype=self.dtype)
+    def update_inertia(self):
+        i = DynamicCapsule.calc_inertia(self.radius, self.length, self.density)
+        self._data[self.InertiaSlice] = np.diag(i).ravel()
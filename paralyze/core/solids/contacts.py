@@ -0,0 +1,106 @@
+"""Contact and overlap detection for sphere packings.
+
+Candidate pairs are generated with a k-d tree (:class:`scipy.spatial.cKDTree`)
+in one call and filtered with array operations, i.e. there is no Python loop
+over solids or pairs. Periodic domains are supported through the toroidal
+distance metric of the tree (for a :class:`BlockStorage` ``blocks``, pass
+``domain=blocks.domain()`` and ``periodicity=blocks.periodicity()``), e.g. the
+first sphere overlaps the last one across the periodic x boundary:
+
+>>> from paralyze.core import AABB
+>>> contact_pairs([(0, 0, 0), (1.5, 0, 0), (9, 0, 0)], 1.0, domain=AABB((0, 0, 0), (10, 10, 10)),
+...               periodicity=(True, False, False))
+(array([0, 0]), array([1, 2]), array([-0.5, -1. ]))
+"""
+from scipy.spatial import cKDTree
+
+import numpy as np
+
+
+def contact_pairs(centers, radii, tolerance=0.0, domain=None, periodicity=(False, False, False)):
+    """Returns all pairs of spheres that touch or overlap.
+
+    Parameters
+    ----------
+    centers: array-like
+        The (N, 3) sphere centers.
+    radii: float or array-like
+        The sphere radii.
+    tolerance: float
+        Spheres whose surfaces are at most ``tolerance`` apart are in contact.
+    domain: AABB
+        The (periodic) domain, required if any axis is periodic.
+    periodicity: array-like
+        Whether the domain is periodic along the x, y, and z axis.
+
+    Returns
+    -------
+    first, second: numpy.ndarray
+        The indices ``first < second`` of the spheres of each contact pair.
+    gap: numpy.ndarray
+        The surface distance of each pair, i.e. the center distance minus the
+        sum of the radii. Negative values are overlap depths.
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape((-1, 3))
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (len(centers), ))
+    periodicity = np.asarray(periodicity, dtype=bool)
+    if len(centers) < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), np.empty(0)
+
+    cutoff = 2 * float(radii.max()) + tolerance
+    points, size = _wrap(centers, cutoff, domain, periodicity)
+    tree = cKDTree(points, boxsize=size)
+    pairs = tree.query_pairs(cutoff, output_type='ndarray')
+    first = pairs[:, 0].astype(np.int64)
+    second = pairs[:, 1].astype(np.int64)
+
+    delta = points[second] - points[first]
+    if size is not None:
+        # minimum image convention
+        delta -= size * np.round(delta / size)
+    gap = np.sqrt(np.einsum('ij,ij->i', delta, delta)) - radii[first] - radii[second]
+
+    touching = gap <= tolerance
+    first, second, gap = first[touching], second[touching], gap[touching]
+    order = np.lexsort((second, first))
+    return first[order], second[order], gap[order]
+
+
+def coordination_numbers(first, second, size):
+    """Returns the number of contacts of each of ``size`` solids given the
+    contact pairs (``first``, ``second``), see :func:`contact_pairs`.
+    """
+    return np.bincount(first, minlength=size) + np.bincount(second, minlength=size)
+
+
+def overlaps(first, second, gap):
+    """Returns the overlapping pairs and their (positive) overlap depths.
+    """
+    overlapping = gap < 0
+    return first[overlapping], second[overlapping], -gap[overlapping]
+
+
+def _wrap(centers, cutoff, domain, periodicity):
+    """Maps centers into the box [0, size) expected by cKDTree.
+    """
+    if not periodicity.any():
+        return centers, None
+    if domain is None:
+        raise ValueError('periodic contact detection requires a domain')
+
+    lower = np.asarray(domain[:3], dtype=np.float64)
+    length = np.asarray(domain[3:], dtype=np.float64) - lower
+    points = centers - lower
+    size = np.empty(3)
+    for axis in range(3):
+        if periodicity[axis]:
+            points[:, axis] %= length[axis]
+            size[axis] = length[axis]
+        else:
+            # a box that is large enough to never wrap within the cutoff
+            points[:, axis] -= points[:, axis].min()
+            size[axis] = 2 * (points[:, axis].max() + cutoff) + 1
+    # guard against round-off, coordinates must be < size
+    points = np.minimum(points, np.nextafter(size, 0))
+    return points, size
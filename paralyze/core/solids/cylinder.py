@@ -1,7 +1,7 @@
-from ..algebra import AABB, Vector
+from ..algebra import AABB, Vector, rotation_matrices
 from .solid import PSolid, DynamicPSolid
+from .sphere import ray_entry
 
-import math
 import numpy as np
 
 
@@ -77,8 +77,118 @@ class Cylinder(PSolid):
 
         self._data[self.AABBSlice] = aabb
 
+    @staticmethod
+    def calc_aabbs(centers, quaternions, radii, lengths, out=None):
+        """Calculates the (loosely fitting) axis-aligned bounding boxes of many
+        cylinders at once.
+
+        This is the vectorized equivalent of :func:`update_aabb`, see there for
+        details on the calculation.
+
+        Parameters
+        ----------
+        centers: array-like
+            The (N, 3) cylinder centers.
+        quaternions: array-like
+            The (N, 4) cylinder orientations.
+        radii: array-like
+            The N cylinder radii.
+        lengths: array-like
+            The N cylinder lengths.
+        out: numpy.ndarray
+            Optional (N, 6) array the bounding boxes are written to.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The (N, 6) bounding boxes, i.e. min and max corners.
+        """
+        centers = np.asarray(centers).reshape((-1, 3))
+        r = np.abs(rotation_matrices(quaternions))
+        size = .5 * r[:, :, 0] * np.asarray(lengths).reshape((-1, 1)) + \
+            (r[:, :, 1] + r[:, :, 2]) * np.asarray(radii).reshape((-1, 1))
+        if out is None:
+            out = np.empty((len(centers), 6), dtype=centers.dtype)
+        out[:, :3] = centers - size
+        out[:, 3:] = centers + size
+        return out
+
+    @staticmethod
+    def calc_contains(points, centers, axes, radii, lengths):
+        """Tests whether ``points`` are inside the cylinders given by
+        ``centers``, (unit) center line ``axes``, ``radii``, and ``lengths``.
+
+        A point is inside a cylinder if its projection onto the center line is
+        within half the length of the center and its distance to the center
+        line is less than or equal to the radius. All arguments are broadcast
+        against each other, see :func:`Sphere.calc_contains`.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The bool array of test results.
+        """
+        d = np.asarray(points) - centers
+        t = np.einsum('...i,...i->...', d, axes)
+        d = d - t[..., np.newaxis] * axes
+        return (np.abs(t) <= .5 * np.asarray(lengths)) & (np.einsum('...i,...i->...', d, d) <= np.square(radii))
+
+    @staticmethod
+    def calc_ray_intervals(origins, directions, centers, axes, radii, lengths):
+        """Returns the parameter intervals ``[t0, t1]`` in which the rays
+        ``origins + t * directions`` (unit ``directions``) are inside the
+        cylinders given by ``centers``, (unit) center line ``axes``,
+        ``radii``, and ``lengths``.
+
+        The interval is the intersection of the interval inside the infinite
+        cylinder and the interval between the two end cap planes. ``t0 > t1``
+        if a ray misses its cylinder.
+        """
+        oc = np.asarray(origins) - centers
+        d = np.asarray(directions)
+        oa = np.einsum('...i,...i->...', oc, axes)
+        da = np.einsum('...i,...i->...', d, axes)
+
+        # infinite cylinder: solve |oc_perp + t * d_perp|^2 = r^2
+        oc_p = oc - oa[..., np.newaxis] * axes
+        d_p = d - da[..., np.newaxis] * axes
+        a = np.einsum('...i,...i->...', d_p, d_p)
+        b = np.einsum('...i,...i->...', oc_p, d_p)
+        c = np.einsum('...i,...i->...', oc_p, oc_p) - np.square(radii)
+        disc = b * b - a * c
+        parallel = a < 1e-12
+        safe_a = np.where(parallel, 1, a)
+        root = np.sqrt(np.maximum(disc, 0))
+        t0 = np.where(parallel, np.where(c <= 0, -np.inf, np.inf), (-b - root) / safe_a)
+        t1 = np.where(parallel, np.where(c <= 0, np.inf, -np.inf), (-b + root) / safe_a)
+        miss = ~parallel & (disc < 0)
+        t0 = np.where(miss, np.inf, t0)
+        t1 = np.where(miss, -np.inf, t1)
+
+        # end cap planes: -l/2 <= oa + t * da <= l/2
+        half = .5 * np.asarray(lengths)
+        along = np.abs(da) < 1e-12
+        safe_da = np.where(along, 1, da)
+        s0 = (-half - oa) / safe_da
+        s1 = (half - oa) / safe_da
+        between = np.abs(oa) <= half
+        lo = np.where(along, np.where(between, -np.inf, np.inf), np.minimum(s0, s1))
+        hi = np.where(along, np.where(between, np.inf, -np.inf), np.maximum(s0, s1))
+        return np.maximum(t0, lo), np.minimum(t1, hi)
+
+    @staticmethod
+    def calc_ray_intersections(origins, directions, centers, axes, radii, lengths):
+        """Returns the distances along the rays to their first intersection
+        with the cylinders, see :func:`calc_ray_intervals` for the parameters
+        and :func:`Sphere.calc_ray_intersections` for the result.
+        """
+        return ray_entry(*Cylinder.calc_ray_intervals(origins, directions, centers, axes, radii, lengths))
+
     def contains(self, point):
-        return False
+        return bool(self.contains_points(point))
+
+    def contains_points(self, points):
+        return Cylinder.calc_contains(points, self.center, self.rotation_matrix[:, 0], self.radius, self.length)
 
     @property
     def equivalent_mesh_size(self):
@@ -100,9 +210,16 @@ class Cylinder(PSolid):
     def radius(self, radius):
         self._data[self.RadiusIndex] = radius
 
+    @staticmethod
+    def calc_volumes(radii, lengths):
+        """Returns the volumes of cylinders with the given ``radii`` and
+        ``lengths``.
+        """
+        return np.pi * np.square(radii) * lengths
+
     @property
     def volume(self):
-        return math.pi * self.radius**2 * self.length
+        return Cylinder.calc_volumes(self.radius, self.length)
 
 
 class StaticCylinder(Cylinder):
@@ -110,14 +227,28 @@ class StaticCylinder(Cylinder):
 
 
 class DynamicCylinder(DynamicPSolid, Cylinder):
-    Length = DynamicPSolid.Length + 2
+    Length      = DynamicPSolid.Length + 2
+    RadiusIndex = DynamicPSolid.Length
+    LengthIndex = DynamicPSolid.Length + 1
 
     def __init__(self, *args, **kwargs):
         DynamicPSolid.__init__(self, *args, **kwargs)
         Cylinder.__init__(self, *args, **kwargs)
         self.update_inertia()
 
+    @staticmethod
+    def calc_inertia(radii, lengths, densities):
+        """Returns the (..., 3) principal moments of inertia (about the body x,
+        y, and z axes) of cylinders with the given ``radii``, ``lengths``, and
+        ``densities``.
+        """
+        r = np.asarray(radii)
+        l = np.asarray(lengths)
+        m = Cylinder.calc_volumes(r, l) * densities
+        ia = .5 * m * r**2
+        ib = m * (.25 * r**2 + 1./12 * l**2)
+        return np.stack((ia, ib, ib), axis=-1)
+
     def update_inertia(self):
-        ia = .5 * self.mass * self.radius**2
-        ib = self.mass * (.25 * self.radius**2 + 1./12 * self.length**2)
-        self._data[self.InertiaSlice] = np.array([ia, 0, 0, 0, ib, 0, 0, 0, ib], dtype=self.dtype)
+        i = DynamicCylinder.calc_inertia(self.radius, self.length, self.density)
+        self._data[self.InertiaSlice] = np.diag(i).ravel()
@@ -0,0 +1,246 @@
+"""Uniform grid binning used to generate candidate pairs for geometric queries
+without looping over solids or points in Python.
+"""
+import numpy as np
+
+
+def expand_ranges(starts, counts):
+    """Expands ranges into flat index arrays.
+
+    Parameters
+    ----------
+    starts: array-like
+        The first index of each range.
+    counts: array-like
+        The number of indices in each range.
+
+    Returns
+    -------
+    owner: numpy.ndarray
+        For each generated index the index of the range it belongs to.
+    index: numpy.ndarray
+        The generated indices, i.e. the concatenation of
+        ``range(starts[i], starts[i] + counts[i])`` for all i.
+
+    Examples
+    --------
+    >>> expand_ranges([10, 20], [2, 3])
+    (array([0, 0, 1, 1, 1]), array([10, 11, 20, 21, 22]))
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    index = np.arange(len(owner), dtype=np.int64) - offsets[owner] + starts[owner]
+    return owner, index
+
+
+class PointGrid(object):
+    """Sorts points into the cells of a uniform grid.
+
+    Parameters
+    ----------
+    points: array-like
+        The (M, 3) points.
+    cell_size: float
+        The edge length of the grid cells. It is increased automatically if the
+        grid would have more than 2**20 cells along an axis.
+    """
+
+    MaxCellsPerAxis = 2**20
+
+    def __init__(self, points, cell_size):
+        self._points = np.asarray(points).reshape((-1, 3))
+        if len(self._points):
+            self._min = self._points.min(axis=0)
+            extent = float(np.max(self._points.max(axis=0) - self._min))
+        else:
+            self._min = np.zeros(3)
+            extent = 0.0
+        self._cell_size = max(float(cell_size), extent / self.MaxCellsPerAxis, np.finfo(np.float32).tiny)
+
+        cells = self.cells_of(self._points)
+        self._dims = cells.max(axis=0) + 1 if len(cells) else np.ones(3, dtype=np.int64)
+        keys = self.keys_of(cells)
+        self._order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._order]
+
+    @property
+    def cell_size(self):
+        return self._cell_size
+
+    @property
+    def dims(self):
+        return self._dims
+
+    @property
+    def order(self):
+        """Returns the point indices sorted by cell key.
+        """
+        return self._order
+
+    def cells_of(self, points):
+        """Returns the (unclipped) cell coordinates of ``points``.
+        """
+        return np.floor((np.asarray(points) - self._min) / self._cell_size).astype(np.int64)
+
+    def keys_of(self, cells):
+        """Returns the linear cell keys of the given cell coordinates.
+        """
+        return (cells[..., 0] * self._dims[1] + cells[..., 1]) * self._dims[2] + cells[..., 2]
+
+    def candidates(self, box_min, box_max):
+        """Returns all (box, point) pairs where the point lies in a grid cell
+        that overlaps the box.
+
+        Parameters
+        ----------
+        box_min, box_max: array-like
+            The (N, 3) min and max corners of the boxes.
+
+        Returns
+        -------
+        box: numpy.ndarray
+            The box index of each candidate pair.
+        point: numpy.ndarray
+            The point index of each candidate pair.
+        """
+        box_min = np.asarray(box_min).reshape((-1, 3))
+        box_max = np.asarray(box_max).reshape((-1, 3))
+
+        c0 = self.cells_of(box_min)
+        c1 = self.cells_of(box_max)
+        # boxes that are completely outside the grid do not have candidates
+        outside = np.any((c1 < 0) | (c0 >= self._dims), axis=1)
+        c0 = np.clip(c0, 0, self._dims - 1)
+        c1 = np.clip(c1, 0, self._dims - 1)
+        extent = c1 - c0 + 1
+        num_cells = np.where(outside, 0, np.prod(extent, axis=1))
+
+        # (box, cell) pairs
+        box, local = expand_ranges(np.zeros(len(num_cells)), num_cells)
+        ext = extent[box]
+        cells = np.empty((len(box), 3), dtype=np.int64)
+        cells[:, 2] = local % ext[:, 2]
+        local //= ext[:, 2]
+        cells[:, 1] = local % ext[:, 1]
+        cells[:, 0] = local // ext[:, 1]
+        cells += c0[box]
+        keys = self.keys_of(cells)
+
+        # (box, point) pairs
+        starts = np.searchsorted(self._keys, keys, side='left')
+        counts = np.searchsorted(self._keys, keys, side='right') - starts
+        owner, index = expand_ranges(starts, counts)
+        return box[owner], self._order[index]
+
+    def iter_candidates(self, box_min, box_max, chunk_size=4096):
+        """Yields the results of :func:`candidates` for chunks of
+        ``chunk_size`` boxes, which keeps the memory usage bounded.
+        """
+        box_min = np.asarray(box_min).reshape((-1, 3))
+        box_max = np.asarray(box_max).reshape((-1, 3))
+        for start in range(0, len(box_min), chunk_size):
+            box, point = self.candidates(box_min[start:start+chunk_size], box_max[start:start+chunk_size])
+            yield box + start, point
+
+
+def bin_into_domains(domains, box_min, box_max=None):
+    """Sorts points or boxes into (possibly overlapping) domains in one pass.
+
+    The domain corners define a rectilinear grid of elementary cells. Points
+    (boxes) are located in that grid with one ``searchsorted`` per axis and
+    each cell is mapped to the domains that cover it, i.e. the cost does not
+    grow with the number of domains times the number of items.
+
+    Parameters
+    ----------
+    domains: list
+        The D domains (AABBs or (6,) arrays). Domains are half-open intervals
+        ``[min, max)``, see :class:`AABB`.
+    box_min: array-like
+        The (N, 3) points or min corners of the boxes.
+    box_max: array-like
+        The (N, 3) max corners of the boxes. If ``None``, ``box_min`` is
+        treated as points and each point is assigned to the domains that
+        contain it. Otherwise each box is assigned to all domains it
+        intersects.
+
+    Returns
+    -------
+    list:
+        The D int64 index arrays (ascending) of the items in each domain.
+
+    Examples
+    --------
+    >>> bin_into_domains([(0, 0, 0, 1, 1, 1), (1, 0, 0, 2, 1, 1)], [(.5, .5, .5), (1.5, .5, .5), (3, 0, 0)])
+    [array([0]), array([1])]
+    """
+    domains = np.array([np.concatenate((d[:3], d[3:])) for d in domains], dtype=np.float64).reshape((-1, 6))
+    box_min = np.asarray(box_min, dtype=np.float64).reshape((-1, 3))
+    points = box_max is None
+    box_max = box_min if points else np.asarray(box_max, dtype=np.float64).reshape((-1, 3))
+    if not len(domains):
+        return []
+
+    edges = [np.unique(domains[:, [axis, axis + 3]]) for axis in range(3)]
+    dims = np.array([max(len(e) - 1, 1) for e in edges], dtype=np.int64)
+
+    def cells(lower, upper, axis):
+        # index ranges [lo, hi] of the elementary cells overlapped by [lower, upper)
+        # resp. containing ``lower`` if ``upper`` is None
+        e = edges[axis]
+        lo = np.searchsorted(e, lower, side='right') - 1
+        hi = lo if upper is None else np.searchsorted(e, upper, side='left') - 1
+        return lo, hi
+
+    # (domain, cell) pairs, sorted by cell key
+    d_lo, d_hi = np.transpose([cells(domains[:, axis], domains[:, axis + 3], axis) for axis in range(3)], (1, 2, 0))
+    d_lo, d_hi = np.asarray(d_lo), np.asarray(d_hi)
+    domain, domain_cells = _expand_cell_ranges(d_lo, d_hi)
+    domain_keys = _cell_keys(domain_cells, dims)
+    order = np.argsort(domain_keys, kind='stable')
+    domain, domain_keys = domain[order], domain_keys[order]
+
+    # (item, cell) pairs
+    i_lo, i_hi = np.transpose(
+        [cells(box_min[:, axis], None if points else box_max[:, axis], axis) for axis in range(3)], (1, 2, 0)
+    )
+    i_lo = np.maximum(i_lo, 0)
+    i_hi = np.minimum(i_hi, dims - 1)
+    if points:
+        # points on or beyond the last edge are outside of all domains
+        outside = np.zeros(len(box_min), dtype=bool)
+        for axis in range(3):
+            e = edges[axis]
+            outside |= (box_min[:, axis] < e[0]) | (box_min[:, axis] >= e[-1])
+        i_hi = np.where(outside[:, None], i_lo - 1, i_hi)
+    item, item_cells = _expand_cell_ranges(i_lo, i_hi)
+    item_keys = _cell_keys(item_cells, dims)
+
+    # (item, domain) pairs
+    starts = np.searchsorted(domain_keys, item_keys, side='left')
+    counts = np.searchsorted(domain_keys, item_keys, side='right') - starts
+    owner, index = expand_ranges(starts, counts)
+    pairs = np.unique(domain[index] * len(box_min) + item[owner])
+    bounds = np.searchsorted(pairs, np.arange(len(domains) + 1) * len(box_min))
+    return [pairs[bounds[i]:bounds[i+1]] - i * len(box_min) for i in range(len(domains))]
+
+
+def _expand_cell_ranges(lo, hi):
+    """Expands the (N, 3) inclusive cell ranges [lo, hi] into (owner, cell)
+    pairs, empty ranges are skipped.
+    """
+    extent = np.maximum(hi - lo + 1, 0)
+    owner, local = expand_ranges(np.zeros(len(extent)), np.prod(extent, axis=1))
+    ext = extent[owner]
+    cells = np.empty((len(owner), 3), dtype=np.int64)
+    cells[:, 2] = local % ext[:, 2]
+    local //= ext[:, 2]
+    cells[:, 1] = local % ext[:, 1]
+    cells[:, 0] = local // ext[:, 1]
+    return owner, cells + lo[owner]
+
+
+def _cell_keys(cells, dims):
+    return (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
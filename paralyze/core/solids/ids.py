@@ -0,0 +1,165 @@
+"""Allocation of compact integer solid ids.
+
+Solid ids are int64 values that are allocated monotonically by a per-process
+:class:`IdAllocator`. Compared to random uuids they are cheap to create, cheap
+to hash, and can be stored in numpy arrays.
+
+Uniqueness
+----------
+Ids allocated by the same allocator never repeat. To keep ids unique across
+several processes (e.g. the workers of a :class:`multiprocessing.Pool`) or
+across storages that were created independently and are merged later, every
+allocator owns a ``namespace``. An id consists of the namespace in its upper
+bits and a counter in its lower :attr:`IdAllocator.CounterBits` bits, i.e.
+
+    id = (namespace << IdAllocator.CounterBits) | counter
+
+The main process uses namespace 0. Worker processes should switch to a
+namespace of their own before they create any solids, either explicitly by
+calling :func:`set_namespace` with e.g. the worker rank (+ 1) or by passing
+:func:`init_worker` as ``initializer`` and :func:`worker_initargs` as
+``initargs`` to :class:`multiprocessing.Pool` or
+:class:`concurrent.futures.ProcessPoolExecutor`, so that every worker takes a
+fresh namespace from a counter of the parent process (process ids are not
+suitable, the operating system reuses them). Solids loaded from files that
+were written by different runs may still share ids, use
+:func:`paralyze.core.solids.SolidArray.reassign_ids` before merging those.
+"""
+import multiprocessing
+import random
+import threading
+
+import numpy as np
+
+
+class IdAllocator(object):
+    """Allocates monotonically increasing solid ids within a namespace.
+
+    Parameters
+    ----------
+    namespace: int
+        The namespace of the allocator, must be in [0, 2**NamespaceBits).
+
+    Examples
+    --------
+    >>> ids = IdAllocator(namespace=1)
+    >>> ids.next_id() == 1 << IdAllocator.CounterBits
+    True
+    >>> ids.allocate(3) - ids.allocate(3)
+    array([-3, -3, -3])
+    """
+
+    CounterBits = 40
+    NamespaceBits = 63 - CounterBits
+
+    def __init__(self, namespace=0):
+        if not 0 <= namespace < 2**self.NamespaceBits:
+            raise ValueError('namespace must be in [0, 2**{:d})'.format(self.NamespaceBits))
+        self._namespace = namespace
+        self._next = namespace << self.CounterBits
+        self._end = (namespace + 1) << self.CounterBits
+        self._lock = threading.Lock()
+
+    @property
+    def namespace(self):
+        return self._namespace
+
+    def allocate(self, n):
+        """Returns an array of ``n`` new consecutive ids (int64).
+        """
+        with self._lock:
+            start = self._next
+            if start + n > self._end:
+                raise OverflowError('id namespace {:d} is exhausted'.format(self._namespace))
+            self._next = start + n
+        return np.arange(start, start + n, dtype=np.int64)
+
+    def next_id(self):
+        """Returns a single new id.
+        """
+        with self._lock:
+            solid_id = self._next
+            if solid_id >= self._end:
+                raise OverflowError('id namespace {:d} is exhausted'.format(self._namespace))
+            self._next = solid_id + 1
+        return solid_id
+
+
+_allocator = IdAllocator()
+# the namespace counter of worker processes, see worker_initargs
+_namespaces = None
+
+
+def allocate(n):
+    """Returns ``n`` new ids of the current process' allocator.
+    """
+    return _allocator.allocate(n)
+
+
+def next_id():
+    """Returns a new id of the current process' allocator.
+    """
+    return _allocator.next_id()
+
+
+def namespace_of(ids):
+    """Returns the namespace(s) of the given id(s).
+    """
+    return np.right_shift(ids, IdAllocator.CounterBits)
+
+
+def set_namespace(namespace):
+    """Replaces the allocator of the current process by a new allocator for
+    ``namespace``.
+    """
+    global _allocator
+    _allocator = IdAllocator(namespace)
+
+
+def worker_initargs():
+    """Returns the ``initargs`` for :func:`init_worker`, i.e. the counter of
+    the parent process that hands out worker namespaces.
+
+    The counter is created by the main process and shared by all of its pools.
+    Workers that were initialized by :func:`init_worker` pass the same counter
+    on to pools of their own, so that no namespace is handed out twice.
+
+    Raises
+    ------
+    RuntimeError
+        If called in a child process that has no counter, i.e. in a worker
+        that was not initialized by :func:`init_worker`. A fresh counter
+        would hand out the namespaces of its sibling workers again.
+    """
+    global _namespaces
+    if _namespaces is None:
+        if multiprocessing.parent_process() is not None:
+            raise RuntimeError('worker_initargs must be called in the main process '
+                               'or in a worker initialized by init_worker')
+        _namespaces = multiprocessing.Value('q', _allocator.namespace + 1)
+    return (_namespaces, )
+
+
+def init_worker(namespaces=None):
+    """Sets the id namespace of the current process to a new namespace.
+
+    Intended to be passed as ``initializer`` to :class:`multiprocessing.Pool`
+    or :class:`concurrent.futures.ProcessPoolExecutor`.
+
+    Parameters
+    ----------
+    namespaces: multiprocessing.Value
+        The namespace counter returned by :func:`worker_initargs`. If ``None``,
+        a random namespace is used, which is unique only with high
+        probability.
+    """
+    global _namespaces
+    if namespaces is None:
+        set_namespace(random.SystemRandom().randrange(1, 2**IdAllocator.NamespaceBits))
+        return
+    with namespaces.get_lock():
+        namespace = namespaces.value
+        namespaces.value += 1
+    # nested pools of this worker continue with the same counter
+    _namespaces = namespaces
+    set_namespace(namespace)
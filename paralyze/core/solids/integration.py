@@ -0,0 +1,141 @@
+"""Time integration of the rigid body motion of dynamic solids.
+
+All integrators advance every solid of a dynamic
+:class:`paralyze.core.solids.SolidArray` at once, i.e. positions, velocities,
+and orientations are updated column-wise with numpy operations. Forces and
+torques are taken from the ``force`` and ``torque`` columns; the angular
+velocities are given in the global frame.
+
+Solids with zero mass (e.g. zero density) are treated as fixed, i.e. they are
+not accelerated.
+"""
+from ..algebra import rotation_matrices
+from ..algebra.quaternion_array import integrate as integrate_quaternions
+
+import numpy as np
+
+
+def accelerations(solids, gravity=(0, 0, 0)):
+    """Returns the linear and angular accelerations of all solids.
+
+    The angular acceleration solves Euler's equation in the global frame,
+    ``I * dw/dt = torque - w x (I * w)``, where ``I`` is the body frame inertia
+    rotated into the global frame. Solids with singular inertia (e.g. rows
+    whose inertia was never updated) have no angular acceleration.
+
+    Parameters
+    ----------
+    solids: SolidArray
+        A dynamic solid array with up-to-date inertia.
+    gravity: array-like
+        The gravitational acceleration that acts on all (non-fixed) solids.
+
+    Returns
+    -------
+    linear: numpy.ndarray
+        The (N, 3) linear accelerations.
+    angular: numpy.ndarray
+        The (N, 3) angular accelerations.
+    """
+    _check_dynamic(solids)
+
+    mass = solids.masses()
+    free = mass > 0
+
+    linear = np.zeros((len(solids), 3))
+    linear[free] = solids['force'][free] / mass[free, np.newaxis] + gravity
+
+    r = rotation_matrices(solids['quaternion'][free])
+    body = solids['inertia'][free]
+    w = solids['angular_velocity'][free]
+
+    angular = np.zeros((len(solids), 3))
+    if np.any(body[:, (1, 2, 3, 5, 6, 7)]):
+        inertia = r @ body.reshape((-1, 3, 3)) @ r.transpose((0, 2, 1))
+        rhs = solids['torque'][free] - np.cross(w, np.einsum('nij,nj->ni', inertia, w))
+        # solve raises for the whole batch if any tensor is singular
+        regular = np.linalg.det(inertia) != 0
+        acc = np.zeros_like(rhs)
+        acc[regular] = np.linalg.solve(inertia[regular], rhs[regular, :, np.newaxis])[..., 0]
+        angular[free] = acc
+    else:
+        # all body frame inertia tensors are diagonal (the common case), i.e.
+        # rotate into the body frame and divide by the principal moments
+        moments = body[:, 0::4]
+        iw = np.einsum('nij,nj->ni', r, moments * np.einsum('nji,nj->ni', r, w))
+        rhs = solids['torque'][free] - np.cross(w, iw)
+        body_rhs = np.einsum('nji,nj->ni', r, rhs)
+        # zero moments (e.g. inertia that was never updated) give no angular acceleration
+        body_acc = np.divide(body_rhs, moments, out=np.zeros_like(body_rhs), where=moments > 0)
+        angular[free] = np.einsum('nij,nj->ni', r, body_acc)
+    return linear, angular
+
+
+def symplectic_euler(solids, timestep, gravity=(0, 0, 0)):
+    """Advances all solids by one step of the semi-implicit (symplectic)
+    Euler method.
+
+    The velocities are updated first and the new velocities are used to update
+    positions and orientations. Bounding boxes and inertia are refreshed
+    afterwards.
+
+    Parameters
+    ----------
+    solids: SolidArray
+        The dynamic solids, updated in place.
+    timestep: float
+        The time step size.
+    gravity: array-like
+        The gravitational acceleration.
+    """
+    linear, angular = accelerations(solids, gravity)
+
+    v = solids['linear_velocity']
+    w = solids['angular_velocity']
+    v += timestep * linear
+    w += timestep * angular
+
+    solids['center'] += timestep * v
+    solids['quaternion'] = integrate_quaternions(solids['quaternion'], w, timestep)
+    solids.update()
+
+
+def velocity_verlet(solids, timestep, forces=None, gravity=(0, 0, 0)):
+    """Advances all solids by one step of the velocity Verlet method.
+
+    Parameters
+    ----------
+    solids: SolidArray
+        The dynamic solids, updated in place.
+    timestep: float
+        The time step size.
+    forces: callable
+        Called as ``forces(solids)`` after the positions have been advanced and
+        must store the new forces and torques in the ``force`` and ``torque``
+        columns. If ``None``, forces and torques are assumed to be constant
+        during the step.
+    gravity: array-like
+        The gravitational acceleration.
+    """
+    linear, angular = accelerations(solids, gravity)
+
+    v = solids['linear_velocity']
+    w = solids['angular_velocity']
+    v += .5 * timestep * linear
+    w += .5 * timestep * angular
+
+    solids['center'] += timestep * v
+    solids['quaternion'] = integrate_quaternions(solids['quaternion'], w, timestep)
+    solids.update()
+
+    if forces is not None:
+        forces(solids)
+
+    linear, angular = accelerations(solids, gravity)
+    v += .5 * timestep * linear
+    w += .5 * timestep * angular
+
+
+def _check_dynamic(solids):
+    if not getattr(solids, 'dynamic', False):
+        raise TypeError('Time integration requires a dynamic SolidArray')
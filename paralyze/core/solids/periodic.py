@@ -0,0 +1,58 @@
+"""Periodic images (shadow copies) of solids.
+
+A solid whose bounding box crosses a face of a periodic domain has an image
+on the opposite side of the domain, solids near an edge or corner have up to
+three or seven images. The images are computed for all solids at once from
+their (N, 6) bounding boxes, see :func:`periodic_images` and
+:func:`SolidArray.periodic_images`.
+"""
+import numpy as np
+
+
+# all non-empty subsets of the three axes as (7, 3) bool mask
+_AxisCombinations = np.array([[(bits >> axis) & 1 for axis in range(3)] for bits in range(1, 8)], dtype=bool)
+
+
+def periodic_images(aabbs, domain, periodicity):
+    """Returns the shifts of all periodic images of the given boxes.
+
+    Parameters
+    ----------
+    aabbs: array-like
+        The (N, 6) bounding boxes.
+    domain: AABB
+        The periodic domain.
+    periodicity: array-like
+        Whether the domain is periodic along the x, y, and z axis.
+
+    Returns
+    -------
+    source: numpy.ndarray
+        The index of the box of each image.
+    shift: numpy.ndarray
+        The (M, 3) translation from the box to its image.
+
+    Raises
+    ------
+    ValueError:
+        If a box crosses both faces of a periodic axis, i.e. it is larger than
+        the domain.
+    """
+    aabbs = np.asarray(aabbs, dtype=np.float64).reshape((-1, 6))
+    periodicity = np.asarray(periodicity, dtype=bool)
+    lower = np.asarray(domain[:3], dtype=np.float64)
+    upper = np.asarray(domain[3:], dtype=np.float64)
+
+    below = (aabbs[:, :3] < lower) & periodicity
+    above = (aabbs[:, 3:] > upper) & periodicity
+    if np.any(below & above):
+        raise ValueError('solid bounding box must not be bigger than the periodic domain')
+    # boxes that cross the lower face are mapped onto the upper face and vice versa
+    axis_shift = (below * (upper - lower)) - (above * (upper - lower))
+
+    crossing = below | above
+    # an image for every combination of crossed axes
+    valid = np.all(crossing[:, None, :] | ~_AxisCombinations, axis=2)
+    source, combination = np.nonzero(valid)
+    shift = axis_shift[source] * _AxisCombinations[combination]
+    return source.astype(np.int64), shift
@@ -0,0 +1,43 @@
+"""Floating point precision of solid data.
+
+Every solid container (:class:`SolidArray`, :class:`Storage`) and every solid
+object stores its floating point data in a single dtype that is chosen when
+the container is created, e.g. ``float32`` for huge archival beds and
+``float64`` for dynamics. :data:`DEFAULT_DTYPE` is used if no dtype is given,
+it can be set through the ``PARALYZE_SOLID_DTYPE`` environment variable.
+
+Conversion rules
+----------------
+- Data written into a container (column assignment, ``append``, ``extend``)
+  is cast to the dtype of the container, i.e. the receiving container wins.
+- Operations that create a new container from several sources (e.g.
+  :func:`SolidArray.concatenate` or :func:`SolidArray.from_solids`) promote
+  to the widest dtype of all sources unless a dtype is given explicitly.
+- Converting a container to another precision always creates a copy, see
+  :func:`SolidArray.astype`.
+"""
+import os
+
+import numpy as np
+
+
+DEFAULT_DTYPE = os.environ.get('PARALYZE_SOLID_DTYPE', 'float32')
+
+
+def as_dtype(dtype=None):
+    """Returns ``dtype`` (or :data:`DEFAULT_DTYPE` if ``None``) as
+    numpy.dtype and raises a TypeError if it is not a floating point type.
+    """
+    dtype = np.dtype(DEFAULT_DTYPE if dtype is None else dtype)
+    if dtype.kind != 'f':
+        raise TypeError('solid data requires a floating point dtype, got {!s}'.format(dtype))
+    return dtype
+
+
+def promote(*dtypes):
+    """Returns the dtype that represents all ``dtypes`` without loss of
+    precision, e.g. ``promote('float32', 'float64')`` is float64.
+    """
+    if not dtypes:
+        return as_dtype()
+    return as_dtype(np.result_type(*[as_dtype(dtype) for dtype in dtypes]))
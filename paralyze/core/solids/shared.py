@@ -0,0 +1,260 @@
+"""Solid arrays in shared memory.
+
+A :class:`SharedSolidArray` stores all columns of a :class:`SolidArray` in a
+single :class:`multiprocessing.shared_memory.SharedMemory` block. Worker
+processes attach to the block by name, i.e. the columns are not copied or
+pickled when solids are passed to e.g. the workers of a
+:class:`multiprocessing.Pool`. Only a small :class:`SharedSolidHandle` is
+sent to the workers.
+
+Examples
+--------
+Each worker gets a writable view of its own partition of the rows, the worker
+function has to be defined at module level::
+
+    def scale(handle):
+        with SharedSolidArray.attach(handle, readonly=False) as part:
+            part['radius'] *= 2
+
+    with SharedSolidArray.from_array(SolidArray.spheres(centers, radii)) as solids:
+        with multiprocessing.Pool(4) as pool:
+            pool.map(scale, solids.handle.partition(4))
+
+Notes
+-----
+The process that created the shared array owns the memory block and is
+responsible for releasing it by calling :func:`SharedSolidArray.unlink` (or
+by using the array as context manager). Shared arrays have a fixed capacity,
+i.e. they cannot grow beyond the size they were created with.
+"""
+from multiprocessing import shared_memory, resource_tracker
+
+from .array import SolidArray
+from .precision import as_dtype
+
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+
+class SharedSolidHandle(object):
+    """A picklable reference to (a range of rows of) a
+    :class:`SharedSolidArray`.
+
+    Parameters
+    ----------
+    name: str
+        The name of the shared memory block.
+    size: int
+        The number of solids in the block.
+    dynamic: bool
+        Whether the block stores the dynamic solid state.
+    dtype: str or numpy.dtype
+        The floating point type of the float columns.
+    rows: tuple
+        The (start, stop) range of rows the handle refers to.
+    owner: int
+        The process id of the process that created the block.
+    """
+
+    Alignment = 64
+
+    def __init__(self, name, size, dynamic, dtype, rows=None, owner=None):
+        self.name = name
+        self.size = size
+        self.dynamic = bool(dynamic)
+        self.dtype = as_dtype(dtype)
+        self.rows = (0, size) if rows is None else tuple(rows)
+        self.owner = os.getpid() if owner is None else owner
+
+    def __len__(self):
+        return self.rows[1] - self.rows[0]
+
+    def __repr__(self):
+        return 'SharedSolidHandle(name={!r}, size={:d}, rows={!r})'.format(self.name, self.size, self.rows)
+
+    def layout(self):
+        """Returns the (name, dtype, shape, offset) tuples of all columns and
+        the total number of bytes of the block.
+        """
+        layout = []
+        offset = 0
+        columns = SolidArray.StaticColumns
+        if self.dynamic:
+            columns = columns + SolidArray.DynamicColumns
+        for name, col_dtype, shape, default in columns:
+            dtype = np.dtype(col_dtype or self.dtype)
+            layout.append((name, dtype, (self.size, ) + shape, offset))
+            nbytes = self.size * int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            offset += -(-nbytes // self.Alignment) * self.Alignment
+        return layout, max(offset, 1)
+
+    def partition(self, n):
+        """Splits the rows of the handle into ``n`` contiguous partitions of
+        (almost) equal size.
+
+        Returns
+        -------
+        list:
+            The handles of the partitions.
+        """
+        bounds = np.linspace(self.rows[0], self.rows[1], n + 1).astype(np.int64)
+        return [
+            SharedSolidHandle(self.name, self.size, self.dynamic, self.dtype, (int(a), int(b)), self.owner)
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+
+
+class SharedSolidArray(SolidArray):
+    """A :class:`SolidArray` whose columns live in shared memory.
+
+    Shared arrays are created with :func:`from_array` or :func:`empty` and
+    attached to with :func:`attach`. Pickling a shared array only pickles its
+    :attr:`handle`, unpickling attaches to the same memory block (read-only).
+    """
+
+    def __init__(self, *args, **kwargs):
+        raise TypeError('use SharedSolidArray.empty, from_array, or attach to create shared arrays')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._handle.owner == os.getpid() and self._owner:
+            self.unlink()
+        else:
+            self.close()
+
+    def __reduce__(self):
+        return SharedSolidArray.attach, (self._handle, )
+
+    def __repr__(self):
+        return 'SharedSolidArray(name={!r}, size={:d}, rows={!r}, dynamic={!r}, dtype={!r})'.format(
+            self._handle.name, self._size, self._handle.rows, self._dynamic, self._dtype
+        )
+
+    @staticmethod
+    def empty(size, dynamic=False, dtype=None, name=None):
+        """Creates a new shared array of ``size`` default initialized solids.
+
+        Parameters
+        ----------
+        size: int
+            The number (and the fixed capacity) of solids.
+        dynamic: bool
+            Whether the array stores the dynamic solid state.
+        dtype: str or numpy.dtype
+            The floating point type of the float columns.
+        name: str
+            The name of the shared memory block, a unique name is generated
+            if ``None``.
+        """
+        handle = SharedSolidHandle(None, size, dynamic, dtype)
+        layout, nbytes = handle.layout()
+        shm = shared_memory.SharedMemory(name=name, create=True, size=nbytes)
+        handle.name = shm.name
+
+        result = SharedSolidArray._create(handle, shm, readonly=False, owner=True)
+        defaults = SolidArray(dynamic=dynamic, dtype=dtype)
+        defaults.resize(size)
+        for column in result.columns:
+            result._columns[column][...] = defaults.column(column)
+        return result
+
+    @staticmethod
+    def from_array(solids, name=None):
+        """Copies the SolidArray ``solids`` into a new shared array.
+        """
+        result = SharedSolidArray.empty(len(solids), solids.dynamic, solids.dtype, name)
+        for column in result.columns:
+            result._columns[column][...] = solids.column(column)
+        return result
+
+    @staticmethod
+    def attach(handle, readonly=True):
+        """Attaches to the shared array referenced by ``handle``.
+
+        Parameters
+        ----------
+        handle: SharedSolidHandle
+            The handle of the shared array (or of a partition of it).
+        readonly: bool
+            If ``True``, all columns are read-only. Otherwise the columns can
+            be modified; workers that write concurrently should attach to
+            disjoint partitions, see :func:`SharedSolidHandle.partition`.
+        """
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=handle.name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=handle.name)
+            if handle.owner != os.getpid() and multiprocessing.parent_process() is None:
+                # an unrelated process has a resource tracker of its own that
+                # would unlink the block (owned by another process) on exit;
+                # child processes share the tracker of their parent
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        return SharedSolidArray._create(handle, shm, readonly=readonly, owner=False)
+
+    @staticmethod
+    def _create(handle, shm, readonly, owner):
+        result = SolidArray.__new__(SharedSolidArray)
+        result._dtype = handle.dtype
+        result._dynamic = handle.dynamic
+        result._handle = handle
+        result._shm = shm
+        result._owner = owner
+
+        start, stop = handle.rows
+        layout, nbytes = handle.layout()
+        result._columns = {}
+        for name, dtype, shape, offset in layout:
+            column = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[start:stop]
+            column.flags.writeable = not readonly
+            result._columns[name] = column
+        result._size = stop - start
+        return result
+
+    @property
+    def handle(self):
+        """Returns the picklable :class:`SharedSolidHandle` of the array.
+        """
+        return self._handle
+
+    @property
+    def name(self):
+        """Returns the name of the shared memory block.
+        """
+        return self._handle.name
+
+    def close(self):
+        """Detaches from the shared memory block. All column views obtained
+        from the array must have been released before.
+        """
+        if self._shm is not None:
+            self._columns = {}
+            self._size = 0
+            self._shm.close()
+            self._shm = None
+
+    def reserve(self, capacity):
+        if capacity > self.capacity:
+            raise ValueError('SharedSolidArray cannot grow beyond its capacity of {:d}'.format(self.capacity))
+
+    def to_array(self):
+        """Returns a (process local) SolidArray copy of the shared rows.
+        """
+        result = SolidArray(dynamic=self._dynamic, dtype=self._dtype)
+        result.extend(self)
+        return result
+
+    def unlink(self):
+        """Detaches from and destroys the shared memory block, must only be
+        called by the process that created the array.
+        """
+        shm = self._shm
+        if shm is None:
+            shm = shared_memory.SharedMemory(name=self._handle.name)
+        self._shm = shm
+        self.close()
+        shm.unlink()
@@ -1,19 +1,24 @@
 from ..algebra import AABB, Vector, Quaternion
+from .precision import as_dtype
+from . import ids
 
-import uuid
 import abc
 import numpy as np
 
 
-DEFAULT_DTYPE = 'float32'
-
-
 class ISolid(object):
 
-    def __init__(self):
-        self.__id = uuid.uuid4().int
+    def __init__(self, solid_id=None):
+        self.__id = ids.next_id() if solid_id is None else solid_id
         self._dirty = False
 
+    def __eq__(self, other):
+        # solids are identified by their id, e.g. a row view of a SolidArray
+        # equals the solid object the row was created from
+        if isinstance(other, ISolid):
+            return self.id == other.id
+        return NotImplemented
+
     def __hash__(self):
         return self.id
 
@@ -39,6 +44,13 @@ class ISolid(object):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def contains_points(self, points):
+        """Returns a bool array indicating for each of the (M, 3) ``points``
+        whether it is inside the solid.
+        """
+        raise NotImplementedError
+
     @property
     @abc.abstractmethod
     def equivalent_mesh_size(self):
@@ -179,10 +191,10 @@ class IDynamicSolid(ISolid):
 
     @property
     def inertia_tensor(self):
+        """Returns the solids inertia tensor in the global frame (3x3 matrix).
         """
-        """
-        r = self.rotation_matrix
-        return r * self.inertia * r.T
+        r = np.asarray(self.rotation_matrix)
+        return r.dot(self.inertia).dot(r.T)
 
     @property
     @abc.abstractmethod
@@ -225,9 +237,11 @@ class PSolid(ISolid):
     QuaternionSlice = slice(9, 13)
 
     def __init__(self, *args, **kwargs):
-        ISolid.__init__(self)
-
-        self._data = np.zeros(self.Length, dtype=kwargs.get('dtype', DEFAULT_DTYPE))
+        # subclasses with multiple bases (e.g. DynamicSphere) run this more than
+        # once, so only the first call allocates the data buffer
+        if getattr(self, '_data', None) is None:
+            ISolid.__init__(self)
+            self._data = np.zeros(self.Length, dtype=as_dtype(kwargs.get('dtype')))
 
         center = kwargs.get('center', 0)
         rot_axis = kwargs.get('rotation_axis', (1, 0, 0))
@@ -241,7 +255,12 @@ class PSolid(ISolid):
             rot_angle = args[2]
 
         self.center = center
-        self.quaternion = Quaternion(axis=rot_axis, angle=rot_angle)
+        if rot_angle == 0:
+            # skip the (comparably expensive) Quaternion construction for the
+            # common case of unrotated solids
+            self.quaternion = (1, 0, 0, 0)
+        else:
+            self.quaternion = Quaternion(axis=rot_axis, angle=rot_angle)
 
     @property
     def aabb(self):
@@ -288,6 +307,22 @@ class PSolid(ISolid):
     def set_rotation(self, *args, **kwargs):
         self.quaternion = Quaternion(*args, **kwargs)
 
+    @classmethod
+    def view(cls, data, solid_id):
+        """Returns a solid instance that operates on ``data`` instead of
+        allocating its own buffer.
+
+        No initialization is performed, i.e. ``data`` must already hold a valid
+        solid state. ``data`` may be anything that supports item access with
+        the slices and indices of the solid's layout, e.g. a numpy array of
+        length ``cls.Length`` or a row of a
+        :class:`paralyze.core.solids.array.SolidArray`.
+        """
+        solid = cls.__new__(cls)
+        ISolid.__init__(solid, solid_id)
+        solid._data = data
+        return solid
+
     def to_array(self):
         """Returns the numpy array that holds all the solid's data
         """
@@ -296,7 +331,7 @@ class PSolid(ISolid):
 
 class DynamicPSolid(IDynamicSolid, PSolid):
 
-    Length = PSolid.Length + 13
+    Length = PSolid.Length + 22
     DensityIndex = PSolid.Length
     ForceSlice = slice(PSolid.Length+1 , PSolid.Length+4 )
     TorqueSlice = slice(PSolid.Length+4 , PSolid.Length+7 )
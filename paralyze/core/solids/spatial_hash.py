@@ -0,0 +1,178 @@
+"""Incremental uniform grid index (spatial hash) for solids.
+"""
+from .grid import expand_ranges
+
+import numpy as np
+
+
+class SpatialHash(object):
+    """Sorts solid ids into the cells of a uniform grid.
+
+    Every solid is stored in the cell that contains its center. The index
+    consists of two arrays, the linear keys of the occupied cells and the ids
+    of the solids, both sorted by cell key. Queries look up the key range of
+    each grid column (cells along z) that overlaps the region with
+    ``searchsorted``, i.e. they only touch the solids of those cells. Solids
+    are inserted and removed by merging sorted runs into these arrays, so the
+    index does not have to be rebuilt when the indexed set changes.
+
+    The largest half extent (reach) of all inserted solids is tracked, so that
+    queries for solids whose bounding box intersects a region only have to
+    visit the cells of the region grown by the reach.
+
+    Parameters
+    ----------
+    cell_size: float
+        The edge length of the grid cells. Cells should be about as large as
+        the typical solid. Cell coordinates are clamped to
+        [-2**20, 2**20), i.e. solids beyond 2**20 cells from the origin share
+        the boundary cells.
+
+    Examples
+    --------
+    >>> index = SpatialHash(cell_size=1.0)
+    >>> index.insert([10, 11], [(0.5, 0.5, 0.5), (4.5, 0.5, 0.5)])
+    >>> index.candidates((0, 0, 0), (1, 1, 1))
+    array([10])
+    """
+
+    CellBits = 21
+
+    def __init__(self, cell_size):
+        if not cell_size > 0:
+            raise ValueError('cell_size must be positive')
+        self._cell_size = float(cell_size)
+        self.clear()
+
+    def __contains__(self, solid_id):
+        return bool(np.isin(solid_id, self._ids))
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def cell_size(self):
+        return self._cell_size
+
+    @property
+    def num_buckets(self):
+        """Returns the number of occupied cells.
+        """
+        return int(np.count_nonzero(np.diff(self._keys))) + 1 if len(self._keys) else 0
+
+    @property
+    def reach(self):
+        """Returns the largest half extent of all solids inserted so far.
+        """
+        return self._reach
+
+    def cells_of(self, points):
+        """Returns the (N, 3) int cell coordinates of ``points``.
+        """
+        cells = np.floor(np.asarray(points, dtype=np.float64) / self._cell_size)
+        half = 1 << (self.CellBits - 1)
+        return np.clip(cells, -half, half - 1).astype(np.int64)
+
+    def keys_of(self, cells):
+        """Returns the linear (int64) keys of the given cell coordinates, keys
+        of cells that only differ in z are consecutive.
+        """
+        cells = np.asarray(cells, dtype=np.int64) + (1 << (self.CellBits - 1))
+        return (cells[..., 0] << (2 * self.CellBits)) | (cells[..., 1] << self.CellBits) | cells[..., 2]
+
+    def clear(self):
+        """Removes all solids from the index.
+        """
+        self._keys = np.empty(0, dtype=np.int64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._reach = 0.0
+        self._lower = self._upper = None
+
+    def insert(self, ids, centers, extents=None):
+        """Inserts solids into the index, solids that are already indexed are
+        moved to the cell of their new center.
+
+        Parameters
+        ----------
+        ids: array-like
+            The (N,) solid ids.
+        centers: array-like
+            The (N, 3) solid centers.
+        extents: array-like
+            The (N, 3) half extents of the solids' bounding boxes. If ``None``,
+            the solids are treated as points.
+        """
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        if not len(ids):
+            return
+        self.remove(ids)
+        cells = self.cells_of(np.reshape(centers, (-1, 3)))
+        if extents is not None and len(extents):
+            self._reach = max(self._reach, float(np.max(extents)))
+
+        lower = cells.min(axis=0)
+        upper = cells.max(axis=0)
+        self._lower = lower if self._lower is None else np.minimum(self._lower, lower)
+        self._upper = upper if self._upper is None else np.maximum(self._upper, upper)
+
+        keys = self.keys_of(cells)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        # merge the sorted run into the sorted arrays
+        positions = np.searchsorted(self._keys, keys, side='right')
+        self._keys = np.insert(self._keys, positions, keys)
+        self._ids = np.insert(self._ids, positions, ids[order])
+
+    def remove(self, ids):
+        """Removes solids from the index, unknown ids are ignored.
+        """
+        if not len(self._ids):
+            return
+        keep = ~np.isin(self._ids, np.asarray(ids, dtype=np.int64).ravel())
+        if not keep.all():
+            self._keys = self._keys[keep]
+            self._ids = self._ids[keep]
+
+    def candidates(self, box_min, box_max, reach=0.0):
+        """Returns the ids of all solids in cells that overlap the box grown
+        by ``reach`` in all directions.
+
+        Use ``reach=self.reach`` to find all solids whose bounding box may
+        intersect the box, and ``reach=0`` for solids whose center may lie in
+        the box.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The candidate ids (int64), in no particular order.
+        """
+        if not len(self._ids):
+            return np.empty(0, dtype=np.int64)
+        lo = self.cells_of(np.asarray(box_min, dtype=np.float64) - reach)
+        hi = self.cells_of(np.asarray(box_max, dtype=np.float64) + reach)
+        # clip to the occupied range first, boxes may be infinite
+        lo = np.maximum(lo, self._lower)
+        hi = np.minimum(hi, self._upper)
+        if np.any(hi < lo):
+            return np.empty(0, dtype=np.int64)
+
+        num_columns = int(np.prod(hi[:2] - lo[:2] + 1))
+        if num_columns > len(self._ids):
+            # the box covers more grid columns than there are solids
+            cells = self._cells_of_keys(self._keys)
+            return self._ids[np.all((cells >= lo) & (cells <= hi), axis=1)]
+
+        # one contiguous key range per grid column
+        x, y = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1), indexing='ij')
+        columns = np.stack((x.ravel(), y.ravel(), np.full(x.size, lo[2])), axis=-1)
+        first = self.keys_of(columns)
+        starts = np.searchsorted(self._keys, first, side='left')
+        counts = np.searchsorted(self._keys, first + (hi[2] - lo[2]), side='right') - starts
+        return self._ids[expand_ranges(starts, counts)[1]]
+
+    def _cells_of_keys(self, keys):
+        """Inverts :func:`keys_of`.
+        """
+        mask = (1 << self.CellBits) - 1
+        cells = np.stack((keys >> (2 * self.CellBits), (keys >> self.CellBits) & mask, keys & mask), axis=-1)
+        return cells - (1 << (self.CellBits - 1))
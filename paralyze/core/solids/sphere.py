@@ -4,6 +4,16 @@ from .solid import PSolid, DynamicPSolid
 import numpy as np
 
 
+def ray_entry(t0, t1):
+    """Returns the distance at which rays enter convex solids given the
+    intervals ``[t0, t1]`` along the rays that are inside the solids.
+
+    Rays that start inside a solid enter it at distance 0, rays that miss a
+    solid (or leave it behind their origin) at distance ``inf``.
+    """
+    return np.where((t0 <= t1) & (t1 >= 0), np.maximum(t0, 0), np.inf)
+
+
 def create_sphere(*args, dynamic=False, **kwargs):
     """Returns a new instance of a static/dynamic Sphere.
 
@@ -84,15 +94,87 @@ class Sphere(PSolid):
         # of the "Vector - float" case
         min_corner = self.center - self.radius
         max_corner = self.center + self.radius
-        self._data[self.AABBSlice] = self.aabb.update(min=min_corner, max=max_corner)
+        self.aabb.update(min=min_corner, max=max_corner)
 
     @property
     def equivalent_mesh_size(self):
         return self.radius * 2.
 
+    @staticmethod
+    def calc_contains(points, centers, radii):
+        """Tests whether ``points`` are inside the spheres given by
+        ``centers`` and ``radii``.
+
+        All arguments are broadcast against each other, i.e. this tests either
+        many points against a single sphere or each point against its
+        corresponding sphere.
+
+        Parameters
+        ----------
+        points: array-like
+            The (..., 3) points.
+        centers: array-like
+            The (..., 3) sphere centers.
+        radii: array-like
+            The (...) sphere radii.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The bool array of test results.
+        """
+        d = np.asarray(points) - centers
+        return np.einsum('...i,...i->...', d, d) <= np.square(radii)
+
+    @staticmethod
+    def calc_ray_intervals(origins, directions, centers, radii):
+        """Returns the parameter intervals ``[t0, t1]`` in which the rays
+        ``origins + t * directions`` are inside the spheres.
+
+        Parameters
+        ----------
+        origins: array-like
+            The (..., 3) ray origins.
+        directions: array-like
+            The (..., 3) unit ray directions.
+        centers: array-like
+            The (..., 3) sphere centers.
+        radii: array-like
+            The (...) sphere radii.
+
+        Returns
+        -------
+        t0, t1: numpy.ndarray
+            The entry and exit parameters, ``t0 > t1`` if a ray misses its
+            sphere.
+        """
+        oc = np.asarray(origins) - centers
+        b = np.einsum('...i,...i->...', oc, directions)
+        c = np.einsum('...i,...i->...', oc, oc) - np.square(radii)
+        disc = b * b - c
+        root = np.sqrt(np.maximum(disc, 0))
+        miss = disc < 0
+        return np.where(miss, np.inf, -b - root), np.where(miss, -np.inf, -b + root)
+
+    @staticmethod
+    def calc_ray_intersections(origins, directions, centers, radii):
+        """Returns the distances along the rays to their first intersection
+        with the spheres, see :func:`calc_ray_intervals` for the parameters.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The distances, ``0`` for rays that start inside their sphere and
+            ``inf`` for rays that miss it.
+        """
+        return ray_entry(*Sphere.calc_ray_intervals(origins, directions, centers, radii))
+
     def contains(self, point):
         return (point - self.center).sqr_length() <= (self.radius * self.radius)
 
+    def contains_points(self, points):
+        return Sphere.calc_contains(points, self.center, self.radius)
+
     @property
     def radius(self):
         return self._data[self.RadiusIndex]
@@ -102,9 +184,15 @@ class Sphere(PSolid):
         self._data[self.RadiusIndex] = radius
         self._dirty = True
 
+    @staticmethod
+    def calc_volumes(radii):
+        """Returns the volumes of spheres with the given ``radii``.
+        """
+        return 4/3. * np.pi * np.power(radii, 3)
+
     @property
     def volume(self):
-        return 4/3. * np.pi * np.power(self.radius, 3)
+        return Sphere.calc_volumes(self.radius)
 
 
 class StaticSphere(Sphere):
@@ -117,6 +205,7 @@ class StaticSphere(Sphere):
 
 class DynamicSphere(DynamicPSolid, Sphere):
     Length = DynamicPSolid.Length + 1
+    RadiusIndex = DynamicPSolid.Length
 
     def __init__(self, *args, **kwargs):
         DynamicPSolid.__init__(self, *args, **kwargs)
@@ -124,6 +213,15 @@ class DynamicSphere(DynamicPSolid, Sphere):
         if type(self) == DynamicSphere:
             self.update()
 
+    @staticmethod
+    def calc_inertia(radii, densities):
+        """Returns the (..., 3) principal moments of inertia of spheres with
+        the given ``radii`` and ``densities``.
+        """
+        radii = np.asarray(radii)
+        i = 0.4 * Sphere.calc_volumes(radii) * densities * radii**2
+        return np.stack((i, i, i), axis=-1)
+
     def update_inertia(self):
-        i = 0.4 * self.mass * self.radius**2
-        self._data[self.InertiaSlice] = np.array([i, 0, 0, 0, i, 0, 0, 0, i], dtype=self.dtype)
+        i = DynamicSphere.calc_inertia(self.radius, self.density)
+        self._data[self.InertiaSlice] = np.diag(i).ravel()
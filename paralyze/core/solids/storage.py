@@ -1,69 +1,341 @@
-from collections.abc import Set
 from paralyze.core import AABB, Vector
+from .array import SolidArray
+from .precision import as_dtype
+from .solid import ISolid
+from .spatial_hash import SpatialHash
 
 import numpy as np
 
 
 class Solids(set):
+    """A set of solids that keeps track of its spatial extent and provides
+    columnar access to the solid attributes.
 
-    def __init__(self, solids=[]):
+    The extent is maintained incrementally while solids are added. Removing
+    solids only marks the extent as outdated, it is then recomputed in a
+    single vectorized pass on the next access.
+
+    Attributes are returned as numpy arrays with one row per solid, e.g.
+    ``solids['radius']`` or ``solids.x``, see :attr:`Attributes`. They are
+    computed in bulk from a :class:`SolidArray` snapshot of the set (see
+    :func:`to_array`) and cached until the set changes. Solids that are
+    modified after they have been added are not tracked, call
+    :func:`invalidate` in that case.
+    """
+
+    Attributes = (
+        'id', 'center', 'x', 'y', 'z', 'aabb', 'quaternion', 'radius', 'length', 'volume', 'mass',
+        'equivalent_mesh_size', 'density', 'linear_velocity', 'angular_velocity'
+    )
+
+    def __init__(self, solids=()):
         set.__init__(self, solids)
+        self._extent = None
+        self._array = None
+        self._attributes = {}
 
     def __getitem__(self, key):
-        # TODO: Implement []-operator to return solid attributes (e.g. x, y, mass, velocity, etc.)
-        pass
+        """Returns the attribute ``key`` of all solids as numpy array, the rows
+        are in iteration order of the set.
+        """
+        value = self._attributes.get(key)
+        if value is None:
+            value = self._attribute(key)
+            value.flags.writeable = False
+            self._attributes[key] = value
+        return value
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
 
     @property
     def aabb(self):
-        """TODO: precompute to be more efficient.
-        """
-        min_x = np.inf
-        min_y = np.inf
-        min_z = np.inf
-        max_x = -np.inf
-        max_y = -np.inf
-        max_z = -np.inf
-        for solid in self:
-            center = solid.center
-            min_x = min(min_x, center.x)
-            min_y = min(min_y, center.y)
-            min_z = min(min_z, center.z)
-            max_x = max(max_x, center.x)
-            max_y = max(max_y, center.y)
-            max_z = max(max_z, center.z)
-        return AABB((min_x, min_y, min_z), (max_x, max_y, max_z))
+        """Returns the union of the bounding boxes of all solids.
+        """
+        return AABB(*np.split(self._get_extent()[1], 2))
+
+    @property
+    def center_aabb(self):
+        """Returns the bounding box of all solid centers.
+        """
+        return AABB(*np.split(self._get_extent()[0], 2))
+
+    @property
+    def x(self):
+        return self['x']
+
+    @property
+    def y(self):
+        return self['y']
+
+    @property
+    def z(self):
+        return self['z']
+
+    def add(self, solid):
+        if solid in self:
+            return
+        if self._extent is not None:
+            self._grow([solid])
+        set.add(self, solid)
+        self._reset_attributes()
+
+    def clear(self):
+        set.clear(self)
+        self.invalidate()
+
+    def difference_update(self, *others):
+        set.difference_update(self, *others)
+        self.invalidate()
+
+    def discard(self, solid):
+        if solid in self:
+            set.discard(self, solid)
+            self.invalidate()
+
+    def intersection_update(self, *others):
+        set.intersection_update(self, *others)
+        self.invalidate()
+
+    def invalidate(self):
+        """Marks the extent and all cached attributes as outdated, e.g. after
+        solids have been moved.
+        """
+        self._extent = None
+        self._reset_attributes()
+
+    def pop(self):
+        self.invalidate()
+        return set.pop(self)
+
+    def remove(self, solid):
+        set.remove(self, solid)
+        self.invalidate()
+
+    def symmetric_difference_update(self, other):
+        set.symmetric_difference_update(self, other)
+        self.invalidate()
+
+    def to_array(self):
+        """Returns a (cached) :class:`SolidArray` copy of the solids in
+        iteration order of the set.
+        """
+        if self._array is None:
+            self._array = SolidArray.from_solids(self)
+        return self._array
+
+    def update(self, *others):
+        added = [solid for other in others for solid in other if solid not in self]
+        if not added:
+            return
+        set.update(self, added)
+        if self._extent is not None:
+            self._grow(added)
+        self._reset_attributes()
+
+    def _attribute(self, key):
+        return _attribute(self.to_array(), key)
+
+    def _get_extent(self):
+        if self._extent is None:
+            self._extent = np.array((np.inf, np.inf, np.inf, -np.inf, -np.inf, -np.inf) * 2).reshape((2, 6))
+            if self._array is not None:
+                self._grow_by(self._array.column('center'), self._array.column('aabb'))
+            else:
+                self._grow(self)
+        return self._extent
+
+    def _grow(self, solids):
+        """Extends the extent by the given solids in one vectorized pass.
+        """
+        solids = list(solids)
+        if not solids:
+            return
+        centers = np.array([solid.center for solid in solids], dtype=np.float64).reshape((-1, 3))
+        aabbs = np.array([solid.aabb for solid in solids], dtype=np.float64).reshape((-1, 6))
+        self._grow_by(centers, aabbs)
+
+    def _grow_by(self, centers, aabbs):
+        _grow_extent(self._extent, centers, aabbs)
+
+    def _reset_attributes(self):
+        self._array = None
+        self._attributes = {}
 
 
 class Storage(object):
+    """A set of solids within a ``domain``.
+
+    The solids are stored in a compact :class:`SolidArray`, i.e. solids that
+    are added are copied into the storage and iterating over the storage
+    yields views onto its rows. Set operations (:func:`merged`,
+    :func:`intersection`, :func:`difference`, :func:`remove`) compare solid
+    ids with numpy set routines and select rows with index arrays.
 
-    def __init__(self, domain=AABB.inf(), solids=()):
+    Parameters
+    ----------
+    domain: AABB
+        Only solids whose center is inside the domain are stored.
+    solids: iterable
+        The initial solids, either a :class:`SolidArray`, another storage,
+        or an iterable of solid objects.
+    cell_size: float
+        If not ``None``, the storage maintains a :class:`SpatialHash` index
+        with the given cell size, such that region queries (:func:`query`,
+        :func:`clipped`, :func:`split`) only visit the solids near the region.
+        See also :func:`build_index`. Storages that are derived from an
+        indexed storage (e.g. by :func:`split` or set operations) build their
+        index with the same cell size on first use.
+    dtype: str or numpy.dtype
+        The floating point type of the storage. If ``None``, the dtype of the
+        first solids that are added is used.
+    """
+
+    def __init__(self, domain=AABB.inf(), solids=(), cell_size=None, dtype=None):
         self._domain = domain
-        self._solids = Solids([])
+        self._dtype = None if dtype is None else as_dtype(dtype)
+        self._array = SolidArray(dtype=dtype)
+        self._index = None
+        # the cell size of an index that is built on first use, see _derived
+        self._deferred_cell_size = None
+        self._reset()
+        if cell_size is not None:
+            self._index = SpatialHash(cell_size)
         self.add(solids)
 
     def __and__(self, other):
         return self.intersection(other)
 
-    def __iand__(self, other):
-        self = self.intersection(other)
+    def __contains__(self, solid):
+        return bool(np.isin(solid.id, self._array.column('id')))
+
+    def __getitem__(self, key):
+        """Returns the attribute ``key`` of all stored solids as numpy array
+        in row order, see :attr:`Solids.Attributes`.
+        """
+        value = self._attributes.get(key)
+        if value is None:
+            value = _attribute(self._array, key)
+            value.flags.writeable = False
+            self._attributes[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._array)
 
     def __or__(self, other):
         return self.merged(other)
 
-    def __ior__(self, other):
-        self = self.merged(other)
-
     def __len__(self):
-        return len(self._solids)
+        return len(self._array)
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    @property
+    def aabb(self):
+        """Returns the union of the bounding boxes of all stored solids.
+        """
+        return AABB(*np.split(self._get_extent()[1], 2))
+
+    @property
+    def array(self):
+        """Returns the :class:`SolidArray` that holds the solids. Changes to
+        the array are not tracked, call :func:`invalidate` afterwards.
+        """
+        return self._array
+
+    @property
+    def center_aabb(self):
+        """Returns the bounding box of all stored solid centers.
+        """
+        return AABB(*np.split(self._get_extent()[0], 2))
+
+    @property
+    def ids(self):
+        """Returns the ids of all stored solids in row order.
+        """
+        return self._array.column('id')
+
+    @property
+    def x(self):
+        return self['x']
+
+    @property
+    def y(self):
+        return self['y']
+
+    @property
+    def z(self):
+        return self['z']
 
     def add(self, solids):
-        """Add all solids to either the local or shadow storage.
+        """Adds all ``solids`` whose center is inside the storage domain.
+        Solids that are already stored (same id) are skipped.
+
+        Parameters
+        ----------
+        solids: SolidArray, Storage, or iterable
+            The solids to add.
         """
-        for solid in solids:
-            if self.domain.contains(solid.center):
-                self._solids.add(solid)
+        solids = self._as_array(solids)
+        if not len(solids):
+            return
+        ids = solids.column('id')
+        first = np.unique(ids, return_index=True)[1]
+        keep = np.zeros(len(solids), dtype=bool)
+        keep[first] = True
+        keep &= ~np.isin(ids, self._array.column('id'))
+        keep &= self.domain.contains_point(solids.column('center'))
+        rows = np.flatnonzero(keep)
+        if not len(rows):
+            return
+        if not len(self._array) and (solids.dynamic != self._array.dynamic or self._dtype is None):
+            # an empty storage adopts the layout of the first solids
+            self._array = SolidArray(dynamic=solids.dynamic, dtype=self._dtype or solids.dtype)
+
+        start = len(self._array)
+        self._array.extend(solids if len(rows) == len(solids) else solids.take(rows))
+        added = np.arange(start, len(self._array))
+        extent = self._extent
+        self._reset()
+        if extent is not None:
+            self._extent = extent
+            _grow_extent(extent, self._array.column('center')[added], self._array.column('aabb')[added])
+        if self._index is not None:
+            self._insert(added)
+
+    def build_index(self, cell_size=None):
+        """Builds (or rebuilds) the spatial hash index of the storage.
 
-    def clipped(self, domain):
+        Parameters
+        ----------
+        cell_size: float
+            The edge length of the grid cells. If ``None``, the median bounding
+            box size of the solids is used.
+        """
+        if cell_size is None:
+            aabbs = self._array.column('aabb')
+            size = np.max(aabbs[:, 3:] - aabbs[:, :3], axis=1) if len(aabbs) else [1.0]
+            cell_size = float(np.median(size)) or 1.0
+        self._index = SpatialHash(cell_size)
+        self._deferred_cell_size = None
+        self._insert(np.arange(len(self._array)))
+
+    def clipped(self, domain, strict=False):
         """Returns the subset of solids that are inside the
         specified ``domain``.
 
@@ -71,23 +343,47 @@ class Storage(object):
         ----------
         domain: AABB
             The clipping domain.
+        strict: bool
+            If ``True``, only solids whose bounding box is fully contained in
+            the domain are returned. Otherwise all solids whose bounding box
+            intersects the domain are returned.
 
         Returns
         -------
-        filter:
-            The subset of bodies that is inside the specified `domain`.
+        Solids:
+            The subset of solids that is inside the specified `domain`.
         """
-        if domain.contains(self.domain):
+        if not strict and domain.contains(self.domain):
             return self.solids
-        return filter(lambda solid: self.is_local(solid, domain) or self.is_shadow(solid, domain), self.solids)
+        return self.query(domain, 'contained' if strict else 'intersects')
+
+    def difference(self, other):
+        """Returns a new storage with the solids of ``self`` that are not in
+        ``other`` (a Storage, Solids, SolidArray, or iterable of solids).
+        """
+        return self._derived(self.domain, self._array.take(self._rows_not_in(other)))
 
     @property
     def domain(self):
         return self._domain
 
+    def drop_index(self):
+        """Removes the spatial hash index of the storage.
+        """
+        self._index = None
+        self._deferred_cell_size = None
+
+    @property
+    def index(self):
+        """Returns the :class:`SpatialHash` index or ``None``.
+        """
+        return self._get_index()
+
     def intersection(self, other):
         """Returns the solids that are contained in the intersection of
         the domains of ``self`` and ``other`` and merges solids automatically.
+        Solids that are not stored in a Storage (e.g. the :class:`Solids`
+        returned by :func:`query`) span the domain of ``self``.
 
         Returns
         -------
@@ -95,25 +391,266 @@ class Storage(object):
             A new storage that spans the intersection domain of self and other.
             The new storage contains no duplicate solids.
         """
-        return Storage(self.domain & other.domain, self.solids | other.solids)
+        domain, array = self._operand(other)
+        domain = self.domain & domain
+        own = np.flatnonzero(domain.contains_point(self._array.column('center')))
+        rows = self._new_rows(array, domain)
+        return self._derived(domain, self._array.take(own), array.take(rows))
+
+    def invalidate(self):
+        """Drops all cached data, e.g. after solids have been modified through
+        views or :attr:`array`. The spatial index is not updated.
+        """
+        self._reset()
 
     def iter_solids(self):
-        return iter(self._solids)
+        return iter(self._array)
 
     def merged(self, other):
-        """Merges ``other`` storage and ``self``.
+        """Merges ``other`` storage and ``self``. Solids that are not stored
+        in a Storage are only merged if they are inside the domain of ``self``.
         """
-        return Storage(self.domain | other.domain, self.solids | other.solids)
+        domain, array = self._operand(other)
+        domain = self.domain | domain
+        return self._derived(domain, self._array, array.take(self._new_rows(array, domain)))
 
-    def remove(self, solid):
-        pass
+    def query(self, region, mode='center'):
+        """Returns the solids that lie inside ``region``.
+
+        Parameters
+        ----------
+        region: AABB
+            The query region.
+        mode: str
+            ``'center'`` selects solids whose center is inside the region,
+            ``'intersects'`` solids whose bounding box intersects the region,
+            and ``'contained'`` solids whose bounding box is fully contained in
+            the region.
+
+        Returns
+        -------
+        Solids:
+            The selected solids.
+        """
+        return Solids(self._array.view(row) for row in self.query_rows(region, mode).tolist())
+
+    def query_rows(self, region, mode='center'):
+        """Returns the (ascending) row indices of the solids that lie inside
+        ``region``, see :func:`query`.
+        """
+        region = AABB(region[:3], region[3:])
+        if mode not in ('center', 'intersects', 'contained'):
+            raise ValueError('unknown query mode {!r}'.format(mode))
+
+        index = self._get_index()
+        if index is None:
+            rows = np.arange(len(self._array))
+        else:
+            reach = index.reach if mode == 'intersects' else 0.0
+            rows = np.sort(self._rows_of(index.candidates(region.min, region.max, reach)))
+        if not len(rows):
+            return rows
+
+        if mode == 'center':
+            inside = region.contains_point(self._array.column('center')[rows])
+        else:
+            aabbs = self._array.column('aabb')[rows]
+            if mode == 'contained':
+                inside = region.contains_other(aabbs)
+            else:
+                inside = np.all(aabbs[:, 3:] > region.min, axis=1) & np.all(aabbs[:, :3] < region.max, axis=1)
+        return rows[inside]
+
+    def remove(self, solids):
+        """Removes ``solids`` from the storage, solids that are not stored
+        are ignored.
+
+        Parameters
+        ----------
+        solids: solid, SolidArray, Storage, or iterable
+            A single solid or the solids (or solid ids) to remove.
+        """
+        ids = _ids_of(solids)
+        removed = np.isin(self._array.column('id'), ids)
+        if not removed.any():
+            return
+        if self._index is not None:
+            self._index.remove(self._array.column('id')[removed])
+        self._array = self._array.take(np.flatnonzero(~removed))
+        self._reset()
 
     @property
     def solids(self):
+        """Returns the stored solids as :class:`Solids` set of row views.
+        """
+        if self._solids is None:
+            self._solids = Solids(self._array)
         return self._solids
 
-    def split(self, domains, strict=False):
-        storages = []
-        for domain in domains:
-            storages.append(Storage(domain, self.solids))
-        return storages
+    def split(self, domains, strict=False, mode='center'):
+        """Splits the storage into one storage per domain, see
+        :func:`split_indices`.
+
+        Parameters
+        ----------
+        domains: list
+            The domains (AABBs).
+        strict: bool
+            If ``True``, only solids whose bounding box is fully contained in
+            a domain are added to its storage.
+        mode: str
+            ``'center'`` adds solids to the storages of the domains that
+            contain their center, ``'intersects'`` to the storages of all
+            domains their bounding box intersects. The storages then also
+            hold the shadow copies of solids whose center is in a
+            neighboring domain.
+
+        Returns
+        -------
+        list:
+            The storages, one per domain. The solids are copied, use
+            :func:`split_indices` to select the rows of each domain instead.
+        """
+        domains = list(domains)
+        indices = self.split_indices(domains, strict, mode)
+        return [self._derived(domain, self._array.take(rows)) for domain, rows in zip(domains, indices)]
+
+    def split_indices(self, domains, strict=False, mode='center'):
+        """Returns the rows of the solids of each domain.
+
+        All solid centers (or bounding boxes) are binned into the domains in
+        a single pass, see :func:`SolidArray.split_indices`, i.e. the solids are not
+        filtered once per domain. Solids in overlapping domains are assigned
+        to each of them. See :func:`split` for the parameters.
+
+        Returns
+        -------
+        list:
+            The (ascending) row indices of :attr:`array` for each domain.
+        """
+        domains = list(domains)
+        indices = self._array.split_indices(domains, mode)
+        if strict:
+            aabbs = self._array.column('aabb')
+            for i, (domain, rows) in enumerate(zip(domains, indices)):
+                indices[i] = rows[AABB(domain[:3], domain[3:]).contains_other(aabbs[rows])]
+        return indices
+
+    def _as_array(self, solids):
+        if isinstance(solids, Storage):
+            return solids._array
+        if isinstance(solids, SolidArray):
+            return solids
+        if isinstance(solids, ISolid):
+            solids = (solids, )
+        return SolidArray.from_solids(solids, dtype=self._dtype)
+
+    def _cell_size(self):
+        return self._deferred_cell_size if self._index is None else self._index.cell_size
+
+    def _derived(self, domain, *arrays):
+        """Returns a new storage with the same settings as ``self`` that holds
+        the rows of ``arrays``, which must be inside ``domain`` and unique.
+        The index of the new storage is built on first use.
+        """
+        result = Storage(domain, dtype=self._dtype)
+        result._array = SolidArray.concatenate(arrays, dtype=self._dtype)
+        result._deferred_cell_size = self._cell_size()
+        return result
+
+    def _get_index(self):
+        """Returns the spatial hash index, a deferred index is built first.
+        """
+        if self._index is None and self._deferred_cell_size is not None:
+            self.build_index(self._deferred_cell_size)
+        return self._index
+
+    def _get_extent(self):
+        if self._extent is None:
+            self._extent = np.array((np.inf, np.inf, np.inf, -np.inf, -np.inf, -np.inf) * 2).reshape((2, 6))
+            _grow_extent(self._extent, self._array.column('center'), self._array.column('aabb'))
+        return self._extent
+
+    def _insert(self, rows):
+        centers = self._array.column('center')[rows]
+        aabbs = self._array.column('aabb')[rows]
+        extents = np.maximum(centers - aabbs[:, :3], aabbs[:, 3:] - centers)
+        self._index.insert(self._array.column('id')[rows], centers, extents)
+
+    def _reset(self):
+        self._attributes = {}
+        self._extent = None
+        self._solids = None
+        self._sorter = None
+
+    def _new_rows(self, array, domain):
+        """Returns the rows of the solids of ``array`` that are not stored in
+        ``self`` and whose center is inside ``domain``.
+        """
+        rows = np.flatnonzero(~np.isin(array.column('id'), self._array.column('id')))
+        return rows[domain.contains_point(array.column('center')[rows])]
+
+    def _operand(self, other):
+        """Returns the domain and the SolidArray of the operand ``other`` of a
+        set operation.
+        """
+        if isinstance(other, Storage):
+            return other.domain, other._array
+        return self.domain, self._as_array(other)
+
+    def _rows_not_in(self, other):
+        """Returns the rows of the solids that are not in ``other``.
+        """
+        return np.flatnonzero(~np.isin(self._array.column('id'), _ids_of(other)))
+
+    def _rows_of(self, ids):
+        """Returns the rows of the solids with the given (stored) ``ids``.
+        """
+        if self._sorter is None:
+            self._sorter = np.argsort(self._array.column('id'), kind='stable')
+        sorted_ids = self._array.column('id')[self._sorter]
+        return self._sorter[np.searchsorted(sorted_ids, ids)]
+
+
+def _attribute(array, key):
+    """Returns the attribute ``key`` of all solids of a SolidArray.
+    """
+    if key not in Solids.Attributes:
+        raise KeyError('unknown solid attribute {!r}'.format(key))
+    if key in ('x', 'y', 'z'):
+        return np.ascontiguousarray(array.column('center')[:, 'xyz'.index(key)])
+    if key == 'volume':
+        return array.volumes()
+    if key == 'mass':
+        return array.masses()
+    if key == 'equivalent_mesh_size':
+        return array.equivalent_mesh_sizes()
+    if key == 'density':
+        return array.densities()
+    if key in ('linear_velocity', 'angular_velocity') and not array.dynamic:
+        # static solids do not move
+        return np.zeros((len(array), 3), dtype=array.dtype)
+    return array.column(key)
+
+
+def _grow_extent(extent, centers, aabbs):
+    """Extends the (2, 6) center and bounding box ``extent`` in place.
+    """
+    if not len(centers):
+        return
+    extent[0, :3] = np.minimum(centers.min(axis=0), extent[0, :3])
+    extent[0, 3:] = np.maximum(centers.max(axis=0), extent[0, 3:])
+    extent[1, :3] = np.minimum(aabbs[:, :3].min(axis=0), extent[1, :3])
+    extent[1, 3:] = np.maximum(aabbs[:, 3:].max(axis=0), extent[1, 3:])
+
+
+def _ids_of(solids):
+    """Returns the ids of a solid, of solids, or of a storage.
+    """
+    if isinstance(solids, ISolid):
+        return np.array([solids.id], dtype=np.int64)
+    if isinstance(solids, (Storage, Solids)):
+        return solids['id']
+    if isinstance(solids, SolidArray):
+        return solids.column('id')
+    return np.array([solid if isinstance(solid, (int, np.integer)) else solid.id for solid in solids], dtype=np.int64)
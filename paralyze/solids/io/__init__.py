@@ -1,7 +1,13 @@
+from .archive import SnapshotArchive
+from .binary import SolidFile
 from .csb import CSB
 from .npy import save_spheres, load_spheres
+from .series import SeriesWriter, SolidSeries
 
 __all__ = [
     "CSB",
+    "SolidFile",
+    "SnapshotArchive",
+    "SeriesWriter", "SolidSeries",
     "save_spheres", "load_spheres"
 ]
@@ -0,0 +1,309 @@
+"""Indexed random access to tar archives of solids snapshots.
+
+Time series of csb snapshots are usually stored as (gzipped) tar archives.
+Listing the members of such an archive with :mod:`tarfile` decompresses the
+whole archive, and members can only be read in order. A
+:class:`SnapshotArchive` scans the archive once and caches the offsets of all
+members in an index file beside the archive (``<archive>.index``), so that
+members can be read by name or position afterwards.
+
+Members of plain tar archives are read with a single seek. For gzipped
+archives, seek points into the compressed stream are built and cached as well
+(``<archive>.index.gzidx``) if the optional ``indexed_gzip`` package is
+installed (``pip install paralyze[archive]``), i.e. reading a member only
+decompresses the data between the closest seek point and the member. Without
+``indexed_gzip``, members are read in archive order in a single forward pass
+over the gzip stream, i.e. reading the last members of an archive still
+decompresses everything before them.
+
+If the directory of the archive is not writable, the index files are kept in
+a cache directory (see :func:`cache_path`) instead.
+
+Examples
+--------
+::
+
+    with SnapshotArchive('case_fill.tar.gz') as archive:
+        for name, solids in archive.iter_load(archive.names[-50:], jobs=4):
+            print(name, solids.volumes().sum())
+"""
+from paralyze.core.solids import ids
+from . import csb
+
+try:
+    import indexed_gzip
+    HAS_INDEXED_GZIP = True
+except ImportError:
+    HAS_INDEXED_GZIP = False
+
+import concurrent.futures
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tarfile
+import tempfile
+import warnings
+
+import numpy as np
+
+
+class SnapshotArchive(object):
+    """A tar archive (optionally gzipped) with random access to its members.
+
+    Parameters
+    ----------
+    path: str
+        The path of the archive.
+    index: str
+        The path of the index file, defaults to ``path + '.index'`` or, if the
+        archive directory is not writable, to :func:`cache_path`. The index
+        is built if it does not exist or if the archive has changed.
+    rebuild: bool
+        If ``True``, the index is rebuilt in any case.
+    spacing: int
+        The distance (in uncompressed bytes) between two gzip seek points.
+    """
+
+    Version = 1
+
+    def __init__(self, path, index=None, rebuild=False, spacing=1 << 22):
+        self._path = os.fspath(path)
+        self._index_paths = [index] if index else [self._path + '.index', cache_path(self._path)]
+        self._index_path = None
+        self._file = None
+        self._position = 0
+        self._index = None if rebuild else self._read_index()
+        if self._index is None:
+            self.build_index(spacing)
+
+    def __contains__(self, name):
+        return name in self._members
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getitem__(self, key):
+        """Returns the content of a member by name or position.
+        """
+        if isinstance(key, (int, np.integer)):
+            key = self.names[key]
+        return self.read(key)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_file'] = None
+        state['_position'] = 0
+        return state
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self._index['members'])
+
+    @property
+    def compressed(self):
+        return self._index['compression'] == 'gzip'
+
+    @property
+    def has_seek_points(self):
+        """Returns whether members of a gzipped archive can be read without
+        decompressing the archive up to the member.
+        """
+        return self._index['seek_points'] is not None and HAS_INDEXED_GZIP
+
+    @property
+    def names(self):
+        """Returns the names of all file members in archive order.
+        """
+        return [member[0] for member in self._index['members']]
+
+    @property
+    def path(self):
+        return self._path
+
+    def build_index(self, spacing=1 << 22):
+        """Scans the archive and writes the member index (and the gzip seek
+        points, see :attr:`has_seek_points`).
+        """
+        with open(self._path, 'rb') as f:
+            compressed = f.read(2) == b'\x1f\x8b'
+        members = []
+        # streaming mode reads the archive in a single pass without seeking
+        with tarfile.open(self._path, 'r|gz' if compressed else 'r|') as tar:
+            for member in tar:
+                if member.isfile():
+                    members.append((member.name, member.offset_data, member.size))
+
+        stat = os.stat(self._path)
+        self._index = {
+            'version': self.Version,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'compression': 'gzip' if compressed else None,
+            'seek_points': None,
+            'members': members
+        }
+        self._index_path = None
+        for path in self._index_paths:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                if compressed and HAS_INDEXED_GZIP:
+                    self._index['seek_points'] = path + '.gzidx'
+                    with indexed_gzip.IndexedGzipFile(self._path, spacing=spacing) as f:
+                        f.build_full_index()
+                        f.export_index(self._index['seek_points'])
+                with open(path, 'w') as f:
+                    json.dump(self._index, f)
+            except OSError:
+                # e.g. a read-only archive directory, try the next location
+                self._index['seek_points'] = None
+                continue
+            self._index_path = path
+            break
+        else:
+            warnings.warn('cannot write the index of archive {!s}, it is rebuilt for every instance'.format(self._path))
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._position = 0
+
+    def iter_load(self, names=None, jobs=None, **kwargs):
+        """Loads members in a process pool and yields them in completion
+        order.
+
+        The members are split into ``jobs`` groups of consecutive members,
+        each worker reads the members of its group with its own file handle.
+        Gzipped archives without seek points (see :attr:`has_seek_points`)
+        are read in the calling process in a single pass, workers would have
+        to decompress the archive up to their group again.
+
+        Parameters
+        ----------
+        names: iterable
+            The names of the members to load, defaults to all members.
+        jobs: int
+            The number of worker processes, defaults to the number of CPUs.
+        kwargs: dict
+            Passed to :func:`csb.load`, all values must be picklable.
+
+        Yields
+        ------
+        name: str
+            The member name.
+        solids: SolidArray
+            The solids of the member.
+        """
+        names = self._sorted(self.names if names is None else names)
+        jobs = min(jobs or multiprocessing.cpu_count(), max(len(names), 1))
+        if jobs == 1 or (self.compressed and not self.has_seek_points):
+            for name in names:
+                yield name, self.load(name, **kwargs)
+            return
+
+        groups = [list(group) for group in np.array_split(np.array(names, dtype=object), jobs) if len(group)]
+        # workers allocate the ids of their solids in namespaces of their own
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=ids.init_worker,
+                                                    initargs=ids.worker_initargs()) as pool:
+            futures = [pool.submit(_load_members, self, group, kwargs) for group in groups]
+            for future in concurrent.futures.as_completed(futures):
+                yield from future.result()
+
+    def load(self, name, **kwargs):
+        """Loads the solids of member ``name``, see :func:`csb.load` for the
+        keyword arguments.
+        """
+        return csb.load(self.open(name), **kwargs)
+
+    def member(self, name):
+        """Returns the (offset, size) of member ``name`` in the uncompressed
+        archive.
+        """
+        try:
+            return self._members[name]
+        except KeyError:
+            raise KeyError('archive {!s} has no member {!r}'.format(self._path, name))
+
+    def open(self, name):
+        """Returns the content of member ``name`` as binary file object.
+        """
+        return io.BytesIO(self.read(name))
+
+    def read(self, name):
+        """Returns the content of member ``name``.
+        """
+        offset, size = self.member(name)
+        f = self._handle(offset)
+        f.seek(offset)
+        data = f.read(size)
+        self._position = offset + size
+        return data
+
+    @property
+    def _members(self):
+        members = self.__dict__.get('_member_dict')
+        if members is None:
+            members = dict((name, (offset, size)) for name, offset, size in self._index['members'])
+            self.__dict__['_member_dict'] = members
+        return members
+
+    def _handle(self, offset):
+        if self._file is not None and self.compressed and not self.has_seek_points and offset < self._position:
+            # a gzip stream can only be read forward, start over
+            self.close()
+        if self._file is None:
+            if not self.compressed:
+                self._file = open(self._path, 'rb')
+            elif self.has_seek_points:
+                self._file = indexed_gzip.IndexedGzipFile(self._path, index_file=self._index['seek_points'])
+            else:
+                self._file = gzip.open(self._path, 'rb')
+        return self._file
+
+    def _read_index(self):
+        stat = os.stat(self._path)
+        for path in self._index_paths:
+            try:
+                with open(path, 'r') as f:
+                    index = json.load(f)
+            except (IOError, ValueError):
+                continue
+            if index.get('version') != self.Version or index['size'] != stat.st_size \
+                    or index['mtime'] != stat.st_mtime_ns:
+                continue
+            if index['seek_points'] is not None and not os.path.exists(index['seek_points']):
+                continue
+            self._index_path = path
+            return index
+        return None
+
+    def _sorted(self, names):
+        """Returns ``names`` sorted by member offset.
+        """
+        return sorted(names, key=lambda name: self.member(name)[0])
+
+
+def cache_path(path):
+    """Returns the path of the index of archive ``path`` in the cache
+    directory, which is used if the archive directory is not writable.
+
+    The cache directory is ``$PARALYZE_CACHE_DIR`` or ``paralyze`` in the
+    temporary directory.
+    """
+    cache = os.environ.get('PARALYZE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'paralyze'))
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(cache, key + '.index')
+
+
+def _load_members(archive, names, kwargs):
+    with archive:
+        return [(name, archive.load(name, **kwargs)) for name in names]
@@ -0,0 +1,290 @@
+"""Memory-mapped binary solids format with spatial tiling.
+
+A solids file stores all columns of a :class:`SolidArray` in binary form, with
+the solids sorted into the tiles of a uniform grid over the solid centers. It
+is meant as working format for huge beds, csb files are kept for interchange.
+
+File layout
+-----------
+- 8 bytes magic ``b'PSOLIDS\\x00'``
+- 8 bytes (little-endian uint64) length of the json header
+- json header: version, number of solids, dtype, whether the dynamic state
+  is stored, the tile grid, and the name, dtype, shape and byte offset of all
+  sections
+- the sections, each aligned to 64 bytes:
+    - ``tile_offsets``: (T + 1,) int64, the first row of each tile
+    - ``tile_bounds``: (T, 6) float64, the union of the solid bounding boxes
+      of each tile
+    - one section per column of the :class:`SolidArray`, rows in tile order
+
+Only non-empty tiles are stored. :class:`SolidFile` maps the file with
+:class:`numpy.memmap`, so that a region query only reads the rows (pages) of
+the tiles whose bounds intersect the region.
+
+Examples
+--------
+::
+
+    save('bed.psb', solids)
+    with SolidFile('bed.psb') as f:
+        part = f.query(AABB((0, 0, 0), (10, 10, 10)))
+"""
+from paralyze.core.algebra import AABB
+from paralyze.core.solids import SolidArray, Storage
+from paralyze.core.solids.grid import expand_ranges
+
+import json
+
+import numpy as np
+
+
+Magic = b'PSOLIDS\x00'
+Version = 1
+Alignment = 64
+
+
+def save(filename, solids, tile_size=None, solids_per_tile=4096):
+    """Saves solids to a tiled binary solids file.
+
+    Parameters
+    ----------
+    filename: str
+        The file name, conventionally with extension ``.psb``.
+    solids: SolidArray, Storage, or iterable
+        The solids to save.
+    tile_size: float
+        The edge length of the (cubic) tiles. If ``None``, it is chosen such
+        that tiles hold about ``solids_per_tile`` solids on average.
+    solids_per_tile: int
+        The target number of solids per tile if ``tile_size`` is ``None``.
+    """
+    if isinstance(solids, Storage):
+        solids = solids.array
+    elif not isinstance(solids, SolidArray):
+        solids = SolidArray.from_solids(solids)
+
+    centers = solids.column('center').astype(np.float64)
+    origin = centers.min(axis=0) if len(solids) else np.zeros(3)
+    if tile_size is None:
+        extent = np.maximum(centers.max(axis=0) - origin, 1e-12) if len(solids) else np.ones(3)
+        num_tiles = max(len(solids) / float(solids_per_tile), 1.0)
+        tile_size = float(np.prod(extent) / num_tiles) ** (1. / 3.)
+    tile_size = float(tile_size)
+    if not tile_size > 0:
+        raise ValueError('tile_size must be positive')
+
+    cells = np.floor((centers - origin) / tile_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1 if len(solids) else np.ones(3, dtype=np.int64)
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+    tile_offsets = np.r_[starts, len(keys)].astype(np.int64)
+
+    aabbs = solids.column('aabb')[order].astype(np.float64)
+    if len(starts):
+        tile_bounds = np.concatenate((
+            np.minimum.reduceat(aabbs[:, :3], starts, axis=0),
+            np.maximum.reduceat(aabbs[:, 3:], starts, axis=0)
+        ), axis=1)
+    else:
+        tile_bounds = np.empty((0, 6))
+
+    sections = [('tile_offsets', tile_offsets), ('tile_bounds', tile_bounds)]
+    sections += [(name, solids.column(name)[order]) for name in solids.columns]
+
+    header = {
+        'version': Version,
+        'size': len(solids),
+        'dtype': solids.dtype.str,
+        'dynamic': solids.dynamic,
+        'tiles': {'origin': origin.tolist(), 'size': tile_size, 'dims': dims.tolist(), 'count': len(starts)},
+        'sections': []
+    }
+    # the header length depends on the offsets, i.e. reserve enough space
+    offset = _align(len(Magic) + 8 + len(_encode(header, sections, 0)) + 64 * len(sections))
+    encoded = _encode(header, sections, offset)
+    if len(Magic) + 8 + len(encoded) > offset:
+        raise IOError('the header of {!s} does not fit into the reserved {:d} bytes'.format(filename, offset))
+
+    with open(filename, 'wb') as f:
+        f.write(Magic)
+        f.write(np.array(len(encoded), dtype='<u8').tobytes())
+        f.write(encoded)
+        for (name, data), spec in zip(sections, header['sections']):
+            f.write(b'\x00' * (spec['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(data, dtype=spec['dtype']).tobytes())
+
+
+def load(filename, domain=None, mode='center'):
+    """Loads solids from a tiled binary solids file.
+
+    Parameters
+    ----------
+    filename: str
+        The file name.
+    domain: AABB
+        If not ``None``, only the solids inside the domain are loaded, see
+        :func:`SolidFile.query`.
+    mode: str
+        The query mode if a domain is given.
+
+    Returns
+    -------
+    SolidArray:
+        The solids.
+    """
+    with SolidFile(filename) as f:
+        if domain is None:
+            return f.load()
+        return f.query(domain, mode)
+
+
+class SolidFile(object):
+    """A memory-mapped tiled binary solids file (read-only).
+
+    Parameters
+    ----------
+    filename: str
+        The file name.
+    """
+
+    def __init__(self, filename):
+        self._filename = filename
+        with open(filename, 'rb') as f:
+            if f.read(len(Magic)) != Magic:
+                raise IOError('{!s} is not a solids file'.format(filename))
+            length = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+            self._header = json.loads(f.read(length).decode('utf-8'))
+        if self._header['version'] > Version:
+            raise IOError('unsupported solids file version {:d}'.format(self._header['version']))
+
+        self._map = np.memmap(filename, dtype=np.uint8, mode='r')
+        self._sections = {}
+        for spec in self._header['sections']:
+            self._sections[spec['name']] = np.ndarray(
+                tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=self._map, offset=spec['offset']
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._header['size']
+
+    def __repr__(self):
+        return 'SolidFile({!r}, size={:d}, tiles={:d})'.format(self._filename, len(self), self.num_tiles)
+
+    @property
+    def columns(self):
+        """Returns the names of all solid columns in the file.
+        """
+        return tuple(spec['name'] for spec in self._header['sections'] if not spec['name'].startswith('tile_'))
+
+    @property
+    def dtype(self):
+        return np.dtype(self._header['dtype'])
+
+    @property
+    def dynamic(self):
+        return self._header['dynamic']
+
+    @property
+    def num_tiles(self):
+        return self._header['tiles']['count']
+
+    @property
+    def tile_bounds(self):
+        """Returns the (T, 6) union of the solid bounding boxes of each tile.
+        """
+        return self._sections['tile_bounds']
+
+    def close(self):
+        """Releases the memory map, all column views must have been released
+        before.
+        """
+        self._sections = {}
+        self._map = None
+
+    def column(self, name):
+        """Returns the memory-mapped (read-only) column ``name`` in tile
+        order.
+        """
+        if name not in self.columns:
+            raise KeyError('solids file has no column {!r}'.format(name))
+        return self._sections[name]
+
+    def load(self):
+        """Reads all solids (in tile order) into a :class:`SolidArray`.
+        """
+        return self._read(slice(None))
+
+    def query(self, region, mode='center'):
+        """Reads the solids inside ``region``, only the tiles whose bounds
+        intersect the region are read.
+
+        Parameters
+        ----------
+        region: AABB
+            The query region.
+        mode: str
+            ``'center'`` selects solids whose center is inside the region,
+            ``'intersects'`` solids whose bounding box intersects the region,
+            and ``'contained'`` solids whose bounding box is fully contained in
+            the region.
+
+        Returns
+        -------
+        SolidArray:
+            The selected solids in tile order.
+        """
+        region = AABB(region[:3], region[3:])
+        if mode not in ('center', 'intersects', 'contained'):
+            raise ValueError('unknown query mode {!r}'.format(mode))
+
+        tiles = self.tiles(region)
+        offsets = self._sections['tile_offsets']
+        owner, rows = expand_ranges(offsets[tiles], offsets[tiles + 1] - offsets[tiles])
+        if mode == 'center':
+            inside = region.contains_point(self._sections['center'][rows])
+        else:
+            aabbs = self._sections['aabb'][rows]
+            if mode == 'contained':
+                inside = region.contains_other(aabbs) if len(rows) else np.zeros(0, dtype=bool)
+            else:
+                inside = np.all(aabbs[:, 3:] > region.min, axis=1) & np.all(aabbs[:, :3] < region.max, axis=1)
+        return self._read(rows[inside])
+
+    def tiles(self, region):
+        """Returns the indices of all tiles whose bounds intersect ``region``.
+        """
+        bounds = self._sections['tile_bounds']
+        region = AABB(region[:3], region[3:])
+        return np.flatnonzero(np.all(bounds[:, 3:] >= region.min, axis=1) & np.all(bounds[:, :3] <= region.max, axis=1))
+
+    def _read(self, rows):
+        columns = dict((name, self._sections[name][rows]) for name in self.columns)
+        return SolidArray.from_columns(columns, dynamic=self.dynamic, dtype=self.dtype)
+
+
+def _align(offset):
+    return -(-offset // Alignment) * Alignment
+
+
+def _encode(header, sections, offset):
+    header['sections'] = _layout(sections, offset)
+    return json.dumps(header).encode('utf-8')
+
+
+def _layout(sections, offset):
+    layout = []
+    for name, data in sections:
+        data = np.asarray(data)
+        dtype = data.dtype.newbyteorder('<') if data.dtype.byteorder not in ('<', '|') else data.dtype
+        offset = _align(offset)
+        layout.append({'name': name, 'dtype': dtype.str, 'shape': list(data.shape), 'offset': offset})
+        offset += data.nbytes
+    return layout
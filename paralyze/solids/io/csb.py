@@ -1,47 +1,161 @@
-from paralyze.core.solids import Capsule, Cylinder, Sphere
-from paralyze.core.solids import create_sphere
-from paralyze.core.algebra import Vector
+from paralyze.core.solids import SolidArray, Storage, ids
 
+import concurrent.futures
+import glob
+import gzip
+import io
+import itertools
+import multiprocessing
 import os
+import tarfile
 import warnings
 
+import numpy as np
+
 
 class CSB(object):
 
     SphereType = 1
     SupportedTypes = (SphereType, )
 
-    # save methods
+    # number of columns of a row (including the type column) per solid type
+    NumColumns = {SphereType: 5}
 
     @staticmethod
-    def get_data(sphere):
-        c = sphere.center
-        data = [c[0], c[1], c[2], sphere.radius * 2.0]
-        return data
+    def parse_table(content, delimiter=','):
+        """Parses the numeric table of all supported solids in ``content``.
 
-    # load methods
+        Comment lines (starting with '#') and empty lines are skipped. Rows of
+        unsupported solid types are skipped with a warning.
 
-    @staticmethod
-    def parse_vector(data, scale=1.0, offset=Vector(0)):
-        assert len(data) == 3
-        return Vector((float(data[0]), float(data[1]), float(data[2]))) * scale + offset
+        Returns
+        -------
+        numpy.ndarray:
+            The (N, 5) float64 table of all sphere rows.
+        """
+        stream = io.StringIO(content)
+        try:
+            with warnings.catch_warnings():
+                # empty input is not an error
+                warnings.simplefilter('ignore', UserWarning)
+                table = np.loadtxt(stream, delimiter=delimiter, comments='#', ndmin=2)
+        except ValueError:
+            # rows of different solid types have different numbers of columns
+            return CSB._parse_mixed_table(content, delimiter)
+
+        if not len(table):
+            return np.empty((0, CSB.NumColumns[CSB.SphereType]))
+        types = table[:, 0].astype(np.int64)
+        supported = np.isin(types, CSB.SupportedTypes)
+        if not supported.all():
+            for stype in np.unique(types[~supported]).tolist():
+                warnings.warn("Solid type %d is not supported by CSB. Skipping import." % stype)
+            table = table[supported]
+        if table.shape[1] != CSB.NumColumns[CSB.SphereType]:
+            raise ValueError('sphere rows must have {:d} columns, got {:d}'.format(
+                CSB.NumColumns[CSB.SphereType], table.shape[1]))
+        return table
 
     @staticmethod
-    def parse_sphere(line, dynamic, scale, offset, **kwargs):
-        assert int(line[0]) == CSB.SphereType
-        assert len(line) == 5
+    def _parse_mixed_table(content, delimiter):
+        rows = {}
+        for line in content.splitlines():
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
+                continue
+            stype = int(stripped.split(delimiter, 1)[0])
+            rows.setdefault(stype, []).append(stripped)
 
-        center = CSB.parse_vector(line[1:4], scale, offset)
-        diameter = float(line[4]) * scale
+        for stype in sorted(set(rows) - set(CSB.SupportedTypes)):
+            warnings.warn("Solid type %d is not supported by CSB. Skipping import." % stype)
+        spheres = rows.get(CSB.SphereType, [])
+        if not spheres:
+            return np.empty((0, CSB.NumColumns[CSB.SphereType]))
+        return np.loadtxt(spheres, delimiter=delimiter, ndmin=2)
 
-        return create_sphere(center, radius=diameter/2, dynamic=dynamic, **kwargs)
+    @staticmethod
+    def to_array(table, dynamic=False, scale=1.0, offset=(0, 0, 0), dtype=None):
+        """Creates the spheres of a parsed table (see :func:`parse_table`)
+        and applies ``scale`` and ``offset``.
+        """
+        centers = table[:, 1:4] * scale + np.asarray(offset, dtype=np.float64)
+        radii = table[:, 4] * (0.5 * scale)
+        return SolidArray.spheres(centers, radii, dynamic=dynamic, dtype=dtype)
 
 
 # public interface members
 
+def iter_chunks(f, chunk_rows=1 << 20, delimiter=',', encoding='utf-8',
+                dynamic=False, scale=1.0, offset=(0, 0, 0),
+                filter=None, domain=None, dtype=None):
+    """Reads solids from a csb file in chunks of at most ``chunk_rows`` rows.
+
+    Only one chunk of the file is held in memory at a time, i.e. files much
+    larger than the available memory can be processed chunk by chunk. The
+    ``domain`` and ``filter`` predicates are applied to each chunk before it
+    is yielded. See :func:`load` for a description of the file format and of
+    all other parameters.
+
+    Parameters
+    ----------
+    f: file-like or path-like
+        A path (gzip compressed if it ends with '.gz'), a text or binary file
+        object, or a member of a tar archive as returned by
+        :func:`tarfile.TarFile.extractfile`. File objects are not closed.
+    chunk_rows: int
+        The maximum number of (input) rows per chunk.
+
+    Yields
+    ------
+    SolidArray:
+        The (non-empty) solids of the next chunk.
+
+    Examples
+    --------
+    >>> f = io.StringIO('1,0,0,0,2\\n1,4,0,0,2\\n1,8,0,0,2\\n')
+    >>> [len(chunk) for chunk in iter_chunks(f, chunk_rows=2)]
+    [2, 1]
+    """
+    if chunk_rows < 1:
+        raise ValueError('chunk_rows must be positive')
+    if isinstance(f, (str, os.PathLike)):
+        with _open_text(f, encoding) as fh:
+            yield from _iter_chunks(fh, chunk_rows, delimiter, dynamic, scale, offset, filter, domain, dtype)
+    elif isinstance(f.read(0), bytes):
+        # universal newlines, e.g. for files written on Windows
+        text = io.TextIOWrapper(f, encoding=encoding)
+        try:
+            yield from _iter_chunks(text, chunk_rows, delimiter, dynamic, scale, offset, filter, domain, dtype)
+        finally:
+            # do not close ``f`` with the wrapper
+            text.detach()
+    else:
+        yield from _iter_chunks(f, chunk_rows, delimiter, dynamic, scale, offset, filter, domain, dtype)
+
+
+def _open_text(path, encoding):
+    if os.fspath(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding=encoding)
+    return open(path, 'r', encoding=encoding)
+
+
+def _iter_chunks(lines, chunk_rows, delimiter, dynamic, scale, offset, filter, domain, dtype):
+    while True:
+        chunk = ''.join(itertools.islice(lines, chunk_rows))
+        if not chunk:
+            return
+        solids = CSB.to_array(CSB.parse_table(chunk, delimiter), dynamic, scale, offset, dtype)
+        if domain is not None:
+            solids = solids.take(domain.contains_point(solids.column('center')))
+        if filter is not None:
+            solids = solids.take(np.fromiter((bool(filter(solid)) for solid in solids), dtype=bool, count=len(solids)))
+        if len(solids):
+            yield solids
+
+
 def load(f, delimiter=',', linesep=os.linesep, encoding='utf-8',
-         dynamic=False, scale=1.0, offset=Vector(0),
-         filter=lambda solid: True):
+         dynamic=False, scale=1.0, offset=(0, 0, 0),
+         filter=None, domain=None, dtype=None):
     """Loads solids from a file.
 
     A csb file is a csv (Comma Separated Values) file where each row represents
@@ -53,8 +167,11 @@ def load(f, delimiter=',', linesep=os.linesep, encoding='utf-8',
 
         1,23.4,45.3,-56.34,0.45
 
-    where the last value represents the sphere diameter. For more details,
-    please refer to the _parse_* methods below.
+    where the last value represents the sphere diameter.
+
+    The file is parsed in chunks (see :func:`iter_chunks`) and the solids are
+    created as rows of a :class:`SolidArray`, i.e. no solid objects are
+    created.
 
     Parameters
     ----------
@@ -66,74 +183,272 @@ def load(f, delimiter=',', linesep=os.linesep, encoding='utf-8',
     delimiter: str
         The string or char that is used to limit csv columns. Default is ','.
     linesep: str
-        The newline str/char. Defaults to os.linesep.
+        Not used anymore, lines may end with any newline sequence.
     encoding: str
         The file encoding. Default is 'utf-8'.
     dynamic: bool
-        Determines whether solids should be created as subclasses of
-        :class:`paralyze.core.solids.solid.ISolid` or
-        :class:`paralyze.core.solids.solid.IDynamicSolid`. Please refer to
-        :module:`paralyze.core.solids.solid` for more details. Default is
-        False.
+        Determines whether the returned SolidArray stores the dynamic solid
+        state. Default is False.
     scale: float (0, inf)
         The length scale factor. Default is 1.0.
-    offset: Vector
-        The offset that is applied to all solid center points. Default is Vector(0).
+    offset: array-like
+        The offset that is applied to all solid center points (after
+        scaling). Default is (0, 0, 0).
     filter: function
-        A custom filter function, i.e. something like :func:`filter`. The default
-        value returns True for all solids.
+        A custom per-solid filter function, i.e. something like
+        :func:`filter`. It is called with a row view of each solid, prefer
+        ``domain`` for spatial filtering.
+    domain: AABB
+        If not ``None``, only solids whose center is inside the domain are
+        returned.
+    dtype: str or numpy.dtype
+        The floating point type of the returned SolidArray.
 
     Returns
     -------
-    set:
+    SolidArray:
         All solids that have been parsed from the file and that conformed to
-        the ``filter`` argument.
+        the ``filter`` and ``domain`` arguments.
+    """
+    chunks = list(iter_chunks(f, delimiter=delimiter, encoding=encoding, dynamic=dynamic, scale=scale,
+                              offset=offset, filter=filter, domain=domain, dtype=dtype))
+    if len(chunks) == 1:
+        return chunks[0]
+    if not chunks:
+        return SolidArray(dynamic=dynamic, dtype=dtype)
+    return SolidArray.concatenate(chunks, dtype=chunks[0].dtype)
+
+
+def iter_files(sources, jobs=None, **kwargs):
+    """Loads many csb files in a process pool and yields the results in
+    completion order.
+
+    Parameters
+    ----------
+    sources: str or iterable
+        A path, a glob pattern (e.g. ``'snapshots/*.csv'``), or a tarball
+        (whose file members are loaded), or a list of those.
+    jobs: int
+        The number of worker processes, defaults to the number of CPUs. With
+        ``jobs=1`` all files are loaded in the calling process.
+    kwargs: dict
+        Passed to :func:`load`, all values must be picklable (e.g. no lambda
+        ``filter``).
+
+    Yields
+    ------
+    name: str
+        The path (or ``tarball:member`` name) of the file.
+    solids: SolidArray
+        The solids of the file.
+    """
+    for position, name, solids in _iter_results(sources, jobs, kwargs):
+        yield name, solids
+
+
+def load_files(sources, jobs=None, **kwargs):
+    """Loads many csb files in a process pool and merges them into one
+    SolidArray, see :func:`iter_files` for the parameters.
+
+    The rows of the files are concatenated in the order of ``sources``.
     """
+    results = sorted(_iter_results(sources, jobs, kwargs), key=lambda result: result[0])
+    arrays = [solids for position, name, solids in results if len(solids)]
+    if not arrays:
+        return SolidArray(dynamic=kwargs.get('dynamic', False), dtype=kwargs.get('dtype'))
+    return SolidArray.concatenate(arrays, dtype=arrays[0].dtype)
 
-    solids = []
-
-    if isinstance(f, str):  # open/read/close if f is path-like
-        path = f
-        with open(path, 'r', encoding=encoding) as f:
-            content = f.read()
-    else:  # explicit type testing
-        path = str(f)
-        content = f.read()
-        if isinstance(content, bytes):  # convert content to str
-            content = content.decode(encoding)
+
+def _iter_results(sources, jobs, kwargs):
+    """Yields the (position, name, solids) tuples of all files in completion
+    order.
+    """
+    tasks = enumerate(_iter_tasks(sources))
+    jobs = jobs or multiprocessing.cpu_count()
+    if jobs == 1:
+        for position, (name, source) in tasks:
+            yield position, name, _load_task(source, kwargs)
+        return
+
+    # workers allocate the ids of their solids in namespaces of their own
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=ids.init_worker,
+                                                initargs=ids.worker_initargs()) as pool:
+        pending = {}
+        for position, (name, source) in tasks:
+            pending[pool.submit(_load_task, source, kwargs)] = (position, name)
+            # bound the number of tarball members held in memory
+            if len(pending) >= 2 * jobs:
+                yield from _completed(pending, concurrent.futures.FIRST_COMPLETED)
+        yield from _completed(pending, concurrent.futures.ALL_COMPLETED)
+
+
+def _completed(pending, return_when):
+    done, _ = concurrent.futures.wait(pending, return_when=return_when)
+    for future in done:
+        position, name = pending.pop(future)
+        yield position, name, future.result()
+
+
+def _iter_tasks(sources):
+    """Yields the (name, source) pairs of all files, where source is either a
+    path or the content of a tarball member.
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+    for source in sources:
+        source = os.fspath(source)
+        if os.path.isfile(source) and tarfile.is_tarfile(source):
+            with tarfile.open(source) as tar:
+                for member in tar:
+                    if member.isfile():
+                        yield '{!s}:{!s}'.format(source, member.name), tar.extractfile(member).read()
+        elif any(c in source for c in '*?['):
+            for path in sorted(glob.glob(source)):
+                yield path, path
         else:
-            content = content
-    content = content.split(linesep)
+            yield source, source
 
-    err_str = """
-    Error while reading line {line_num} in file {path}:
-        {line}
-    Error message: {msg}"""
 
-    for i, line in enumerate(content):
-        if line.startswith('#'):  # line is a comment
-            continue
-        line = line.split(delimiter)
-        if len(line) <= 1:  # line is empty
-            continue
+def _load_task(source, kwargs):
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return load(source, **kwargs)
 
-        try:
-            stype = int(line[0])
-        except OSError as e:
-            raise OSError(err_str.format(line_num=i+1, path=path, line=line, msg=e.args[0]))
 
-        if stype not in CSB.SupportedTypes:
-            warnings.warn("Solid type %d is not supported by CSB. Skipping import." % stype)
+def save(f, solids, delimiter=',', linesep=os.linesep, precision=None,
+         compress=None, chunk_rows=1 << 16):
+    """Saves solids to a csb file, see :func:`load` for the file format.
+
+    The rows are formatted column block by column block, i.e. no solid
+    objects are created. Only spheres can be stored in csb files, all other
+    solids are skipped with a warning.
+
+    Parameters
+    ----------
+    f: file-like or path-like
+        A path or a binary file object. File objects are not closed.
+    solids: SolidArray, Storage, or iterable
+        The solids to save.
+    delimiter: str
+        The column delimiter. Default is ','.
+    linesep: str
+        The line separator. Default is ``os.linesep``.
+    precision: int
+        The number of significant digits of all values. If ``None``, each
+        value is written with the fewest digits that restore it exactly in
+        the dtype of ``solids``, e.g. '4.033' for the float32 value 4.033.
+    compress: bool
+        Whether the file is gzip compressed. If ``None``, paths ending with
+        '.gz' are compressed.
+    chunk_rows: int
+        The number of rows that are formatted at once.
+    """
+    if isinstance(solids, Storage):
+        solids = solids.array
+    elif not isinstance(solids, SolidArray):
+        solids = SolidArray.from_solids(solids)
+
+    spheres = solids.column('type') == CSB.SphereType
+    if not spheres.all():
+        for stype in np.unique(solids.column('type')[~spheres]).tolist():
+            warnings.warn("Solid type %d is not supported by CSB. Skipping export." % stype)
+    shortest = None
+    if precision is not None:
+        value = '%.{:d}g'.format(int(precision))
+    elif solids.dtype == np.float64:
+        # the repr of a float is the shortest decimal that restores it
+        value = '%r'
+    else:
+        value = '%.*g'
+        shortest = solids.dtype
+
+    row = delimiter.join(['{:d}'.format(CSB.SphereType)] + [value] * 4) + linesep
+    table = np.empty((int(spheres.sum()), 4), dtype=np.float64)
+    table[:, :3] = solids.column('center')[spheres]
+    # doubling is exact, the diameters are values of the solids dtype as well
+    table[:, 3] = solids.column('radius')[spheres] * 2.0
+
+    if isinstance(f, (str, os.PathLike)):
+        if compress is None:
+            compress = os.fspath(f).endswith('.gz')
+        with (gzip.open(f, 'wb') if compress else open(f, 'wb')) as fh:
+            _write_table(fh, table, row, chunk_rows, shortest)
+    elif compress:
+        with gzip.GzipFile(fileobj=f, mode='wb') as fh:
+            _write_table(fh, table, row, chunk_rows, shortest)
+    else:
+        _write_table(f, table, row, chunk_rows, shortest)
+
+
+def _write_table(f, table, row, chunk_rows, shortest=None):
+    """Writes ``table`` in blocks of ``chunk_rows`` rows. If ``shortest`` is
+    a dtype, ``row`` formats the values with '%.*g' and the number of digits
+    of each value is taken from :func:`_shortest_digits`.
+    """
+    for start in range(0, len(table), chunk_rows):
+        chunk = table[start:start + chunk_rows]
+        if shortest is None:
+            values = chunk.ravel().tolist()
         else:
-            solid = CSB.parse_sphere(line, dynamic, scale, offset)
-            if filter(solid):
-                solids.append(solid)
+            digits, rounded = _shortest_digits(chunk.ravel(), shortest)
+            values = [None] * (2 * digits.size)
+            values[0::2] = digits.tolist()
+            values[1::2] = rounded.tolist()
+        # one printf-style operation per block instead of one per value
+        f.write(((row * len(chunk)) % tuple(values)).encode('utf-8'))
 
-    return solids
 
+# relative distance of the rounded values to the decimals they represent (4 ulp)
+_Margin = 2.0 ** -50
+_PowersOfTen = 10.0 ** np.arange(1, 23)
 
-def save(filename, solids, delimiter=',', linesep=os.linesep):
-    with open(filename, 'w') as csb:
-        for solid in solids:
-            data = CSB.get_data(solid)
-            csb.write(delimiter.join(map(str, data)) + linesep)
+
+def _shortest_digits(values, dtype):
+    """Returns the number of significant digits and the rounded values such
+    that ``'%.*g' % (digits, rounded)`` is the shortest decimal that is read
+    back as the ``dtype`` value of each of the float64 ``values``.
+
+    For p digits, the candidate decimal of a value is ``n * 10**-k`` with
+    ``n = round(value * 10**k)``. The float64 ``n / 10**k`` is within
+    :data:`_Margin` of it, and the candidate is accepted if the whole
+    interval around ``n / 10**k`` converts to the value.
+    """
+    target = values.astype(dtype)
+    max_digits = _round_trip_digits(dtype)
+    digits = np.ones(len(values), dtype=np.int64)
+    rounded = values.copy()
+
+    magnitude = np.abs(values)
+    pending = np.flatnonzero(np.isfinite(values) & (magnitude > 0))
+    digits[pending] = max_digits
+    exponent = np.floor(np.log10(magnitude[pending])).astype(np.int64)
+    integral = np.zeros(len(values), dtype=np.int64)
+    integral[pending] = exponent + 1
+    for p in range(1, max_digits):
+        if not len(pending):
+            break
+        scale = 10.0 ** (p - 1 - exponent)
+        n = np.round(values[pending] * scale)
+        r = n / scale
+        # the interval bounds of the largest values overflow to inf
+        with np.errstate(over='ignore'):
+            ok = ((r * (1 - _Margin)).astype(dtype) == target[pending]) & \
+                 ((r * (1 + _Margin)).astype(dtype) == target[pending])
+        done = pending[ok]
+        rounded[done] = r[ok]
+        # the digits of n, which is 10**p if the value was rounded up to the next power of ten
+        digits[done] = np.searchsorted(_PowersOfTen, np.abs(n[ok]), side='right') + 1
+        pending, exponent = pending[~ok], exponent[~ok]
+    # all other values are written with max_digits, which always restores them
+
+    # '%g' writes integral digits as exponent, e.g. '1e+01' instead of '10'
+    fixed = integral <= max_digits
+    digits[fixed] = np.maximum(digits[fixed], integral[fixed])
+    return digits, rounded
+
+
+def _round_trip_digits(dtype):
+    """Returns the number of significant decimal digits that restore any
+    value of ``dtype`` exactly, e.g. 9 for float32 and 17 for float64.
+    """
+    return int(np.ceil((np.finfo(dtype).nmant + 1) * np.log10(2))) + 1
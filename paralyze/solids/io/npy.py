@@ -1,54 +1,93 @@
-from paralyze.core.solids.sphere import Sphere, create_sphere
+from paralyze.core.solids import SolidArray, Storage
 import numpy as np
 
 
-def load_spheres(f, dynamic=False):
-    data = np.load(f)
-    spheres = set()
-    if not dynamic:
-        for i in range(len(data)):
-            spheres.add(create_sphere(
-                center=data['center'][i], radius=data['radius'][i]
-            ))
-    else:
-        for i in range(len(data)):
-            spheres.add(create_sphere(dynamic=True,
-                center=data['center'][i], radius=data['radius'][i],
-                density=data['density'][i],
-                angular_velocity=data['angular_velocity'][i],
-                linear_velocity=data['linear_velocity'][i],
-                force=data['force'][i], torque=data['torque'][i]
-            ))
-
-    return spheres
-
-def save_spheres(solids, f, dynamic=False, dtype=np.float32):
-
-    spheres = list(filter(lambda solid: isinstance(solid, Sphere), solids))
-    n = len(spheres)
-
-    if not dynamic:
-        data = np.zeros(n, [('center', dtype, 3),
-                            ('radius', dtype, 1)])
-
-        data['center'] = np.array([sphere.center for sphere in spheres])
-        data['radius'] = np.array([sphere.radius for sphere in spheres])
-
-    else:
-        data = np.zeros(n, [('center'          , dtype, 3),
-                            ('radius'          , dtype, 1),
-                            ('density'         , dtype, 1),
-                            ('angular_velocity', dtype, 3),
-                            ('linear_velocity' , dtype, 3),
-                            ('force'           , dtype, 3),
-                            ('torque'          , dtype, 3)])
-
-        data['center'] = np.array([sphere.center for sphere in spheres])
-        data['radius'] = np.array([sphere.radius for sphere in spheres])
-        data['density'] = np.array([sphere.density for sphere in spheres])
-        data['angular_velocity'] = np.array([sphere.angular_velocity for sphere in spheres])
-        data['linear_velocity'] = np.array([sphere.linear_velocity for sphere in spheres])
-        data['force'] = np.array([sphere.force for sphere in spheres])
-        data['torque'] = np.array([sphere.torque for sphere in spheres])
+# fields of the structured array, the dynamic fields are only stored for dynamic solids
+STATIC_FIELDS = (('center', (3, )), ('radius', ()), ('aabb', (6, )))
+DYNAMIC_FIELDS = (('density', ()), ('angular_velocity', (3, )), ('linear_velocity', (3, )),
+                  ('force', (3, )), ('torque', (3, )), ('inertia', (9, )))
+
+
+def load_spheres(f, dynamic=None, mmap_mode=None, dtype=None):
+    """Loads spheres from a .npy file that was written by :func:`save_spheres`.
+
+    The fields of the stored structured array are used as columns of the
+    returned SolidArray without copying them if they have its dtype, i.e. no
+    solid objects are created.
+
+    Parameters
+    ----------
+    f: file-like or path-like
+        The file to load from.
+    dynamic: bool
+        Whether the returned SolidArray stores the dynamic solid state. If
+        ``None``, it does if the file contains the dynamic fields.
+    mmap_mode: str
+        If not ``None``, the file is memory-mapped with this mode, see
+        :func:`numpy.load`. The solids are read-only for mode 'r', changes
+        are written to the file for mode 'r+', and are kept in memory for
+        mode 'c'.
+    dtype: str or numpy.dtype
+        The floating point type of the returned SolidArray, defaults to the
+        type of the stored data. Other types require a copy.
+
+    Returns
+    -------
+    SolidArray:
+        The spheres.
+    """
+    data = np.load(f, mmap_mode=mmap_mode)
+    fields = data.dtype.names
+    if dynamic is None:
+        dynamic = 'density' in fields
+
+    names = [name for name, shape in STATIC_FIELDS + (DYNAMIC_FIELDS if dynamic else ())]
+    columns = dict((name, data[name]) for name in names if name in fields)
+    if dtype is None:
+        dtype = data.dtype['center'].base
+    solids = SolidArray.from_columns(columns, dynamic=dynamic, dtype=dtype, copy=False)
+
+    # files of older versions store neither the bounding boxes nor the inertia
+    if 'aabb' not in columns:
+        solids.update_aabbs()
+    if dynamic and 'inertia' not in columns:
+        solids.update_inertia()
+    return solids
+
+
+def save_spheres(solids, f, dynamic=False, dtype=None):
+    """Saves all spheres of ``solids`` to a .npy file as structured array,
+    all other solids are ignored.
+
+    Parameters
+    ----------
+    solids: SolidArray, Storage, or iterable
+        The solids to save.
+    f: file-like or path-like
+        The file to save to.
+    dynamic: bool
+        Whether the dynamic state (density, velocities, forces, torques, and
+        inertia) is stored. Static solids are stored with the default
+        dynamic state.
+    dtype: str or numpy.dtype
+        The floating point type of the stored data. If ``None``, the dtype of
+        ``solids`` is used.
+    """
+    if isinstance(solids, Storage):
+        solids = solids.array
+    elif not isinstance(solids, SolidArray):
+        solids = SolidArray.from_solids(solids, dynamic=dynamic)
+    solids = solids.take(solids.column('type') == SolidArray.SphereType)
+    if dynamic and not solids.dynamic:
+        columns = dict((name, solids.column(name)) for name in solids.columns)
+        solids = SolidArray.from_columns(columns, dynamic=True, dtype=solids.dtype)
+        solids.update_inertia()
+    if dtype is None:
+        dtype = solids.dtype
+
+    fields = STATIC_FIELDS + (DYNAMIC_FIELDS if dynamic else ())
+    data = np.zeros(len(solids), [(name, dtype, shape) for name, shape in fields])
+    for name, shape in fields:
+        data[name] = solids.column(name)
 
     np.save(f, data)
@@ -0,0 +1,346 @@
+"""Compressed archive format for time series of solids snapshots.
+
+Simulation runs write thousands of snapshots in which most solids barely
+move. A series file stores the ids, centers, and radii of the spheres of all
+snapshots, the positions and radii quantized to a fixed ``resolution``
+relative to the lower corner of the simulation domain. Each step is
+delta-encoded against the previous step and compressed with zlib or lzma:
+the values of a sphere against the values of the sphere with the same id, the
+ids row by row. Every ``keyframe_interval`` steps the full state is stored, so
+that reading an arbitrary step decodes at most ``keyframe_interval`` blocks.
+
+Only spheres are stored, other solids are skipped with a warning. Neither
+orientations nor the dynamic state (velocities, forces, ...) are stored.
+Apart from that, quantization is the only loss, the error of all positions
+and radii is at most ``resolution / 2``.
+
+File layout
+-----------
+- 8 bytes magic ``b'PSERIES\\x00'``
+- one compressed block per step: the (except for keyframes delta-encoded)
+  int64 ids and quantized values of x, y, z, and radius, zigzag-encoded and
+  byte-shuffled for better compression
+- json index: version, domain, resolution, codec, dtype, and the name, number
+  of solids, byte offset, byte length, and keyframe flag of all steps
+- 8 bytes (little-endian uint64) length of the json index
+- 8 bytes magic
+
+Examples
+--------
+::
+
+    with SeriesWriter('case.pss', domain, resolution=1e-5) as series:
+        for name, solids in SnapshotArchive('case_fill.tar.gz').iter_load(jobs=1):
+            series.append(solids, name)
+    series = SolidSeries('case.pss')
+    solids = series.load(series.names[-1])
+"""
+from paralyze.core.algebra import AABB
+from paralyze.core.solids import SolidArray, Storage
+
+import json
+import lzma
+import warnings
+import zlib
+
+import numpy as np
+
+
+Magic = b'PSERIES\x00'
+Version = 2
+Codecs = ('zlib', 'lzma')
+
+
+class SeriesWriter(object):
+    """Writes a series file step by step, the file is complete only after
+    :func:`close`.
+
+    Parameters
+    ----------
+    filename: str
+        The file name, conventionally with extension ``.pss``.
+    domain: AABB
+        The simulation domain, its lower corner is the origin of the
+        quantized positions.
+    resolution: float
+        The quantization step of positions and radii.
+    codec: str
+        The compression codec, either 'zlib' or 'lzma'.
+    level: int
+        The compression level (preset for lzma), defaults to the codec default.
+    keyframe_interval: int
+        The number of steps between two fully stored steps.
+    """
+
+    def __init__(self, filename, domain, resolution, codec='zlib', level=None, keyframe_interval=16):
+        if codec not in Codecs:
+            raise ValueError('unknown codec {!r}, supported codecs are {!s}'.format(codec, ', '.join(Codecs)))
+        if not resolution > 0:
+            raise ValueError('resolution must be positive')
+        if keyframe_interval < 1:
+            raise ValueError('keyframe_interval must be positive')
+
+        self._domain = AABB(domain[:3], domain[3:])
+        self._resolution = float(resolution)
+        self._codec = codec
+        self._level = level
+        self._keyframe_interval = int(keyframe_interval)
+        self._steps = []
+        self._dtype = None
+        self._previous = None
+        self._file = open(filename, 'wb')
+        self._file.write(Magic)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._steps)
+
+    def append(self, solids, name=None):
+        """Appends the spheres of ``solids`` as next step, all other solids
+        are skipped with a warning.
+
+        Spheres are delta-encoded against the spheres with the same id in the
+        previous step, i.e. the row order may change between steps. Keeping it
+        stable (e.g. appending new solids at the end) compresses the ids best.
+
+        Parameters
+        ----------
+        solids: SolidArray, Storage, or iterable
+            The solids of the step.
+        name: str
+            The step name, defaults to the step number.
+        """
+        if isinstance(solids, Storage):
+            solids = solids.array
+        elif not isinstance(solids, SolidArray):
+            solids = SolidArray.from_solids(solids)
+        spheres = solids.column('type') == SolidArray.SphereType
+        if not spheres.all():
+            for stype in np.unique(solids.column('type')[~spheres]).tolist():
+                warnings.warn("Solid type %d is not supported by series files. Skipping." % stype)
+            solids = solids.take(spheres)
+        if self._dtype is None:
+            self._dtype = solids.dtype
+
+        values = np.empty((4, len(solids)), dtype=np.int64)
+        values[:3] = np.rint((solids.column('center') - self._domain.min) / self._resolution).T
+        values[3] = np.rint(solids.column('radius') / self._resolution)
+
+        ids = solids.column('id').copy()
+        keyframe = len(self._steps) % self._keyframe_interval == 0
+        block = _encode(ids, values, None if keyframe else self._previous)
+        data = self._compress(block)
+
+        offset = self._file.tell()
+        self._file.write(data)
+        self._steps.append({
+            'name': str(len(self._steps)) if name is None else str(name),
+            'size': len(solids),
+            'offset': offset,
+            'length': len(data),
+            'keyframe': keyframe
+        })
+        self._previous = (ids, values)
+
+    def close(self):
+        """Writes the index and closes the file.
+        """
+        if self._file is None:
+            return
+        index = {
+            'version': Version,
+            'domain': list(map(float, self._domain.min)) + list(map(float, self._domain.max)),
+            'resolution': self._resolution,
+            'codec': self._codec,
+            'dtype': (self._dtype or np.dtype(np.float64)).str,
+            'steps': self._steps
+        }
+        encoded = json.dumps(index).encode('utf-8')
+        self._file.write(encoded)
+        self._file.write(np.array(len(encoded), dtype='<u8').tobytes())
+        self._file.write(Magic)
+        self._file.close()
+        self._file = None
+
+    def _compress(self, data):
+        if self._codec == 'lzma':
+            return lzma.compress(data, preset=self._level)
+        return zlib.compress(data, -1 if self._level is None else self._level)
+
+
+class SolidSeries(object):
+    """Reads the steps of a series file, see :class:`SeriesWriter`.
+
+    Parameters
+    ----------
+    filename: str
+        The file name.
+    """
+
+    def __init__(self, filename):
+        self._filename = filename
+        with open(filename, 'rb') as f:
+            if f.read(len(Magic)) != Magic:
+                raise IOError('{!s} is not a series file'.format(filename))
+            f.seek(-len(Magic) - 8, 2)
+            trailer = f.read(8 + len(Magic))
+            if trailer[8:] != Magic:
+                raise IOError('{!s} is incomplete, the writer was not closed'.format(filename))
+            length = int(np.frombuffer(trailer[:8], dtype='<u8')[0])
+            f.seek(-len(Magic) - 8 - length, 2)
+            self._index = json.loads(f.read(length).decode('utf-8'))
+        if self._index['version'] != Version:
+            raise IOError('unsupported series file version {:d}'.format(self._index['version']))
+
+        self._positions = dict((step['name'], i) for i, step in enumerate(self._index['steps']))
+        # the last decoded step, sequential reads decode a single block
+        self._cache = (None, None)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __getitem__(self, key):
+        return self.load(key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.load(i)
+
+    def __len__(self):
+        return len(self._index['steps'])
+
+    def __repr__(self):
+        return 'SolidSeries({!r}, steps={:d})'.format(self._filename, len(self))
+
+    @property
+    def domain(self):
+        domain = self._index['domain']
+        return AABB(domain[:3], domain[3:])
+
+    @property
+    def names(self):
+        """Returns the names of all steps in order.
+        """
+        return [step['name'] for step in self._index['steps']]
+
+    @property
+    def resolution(self):
+        return self._index['resolution']
+
+    def load(self, step, dynamic=False, dtype=None):
+        """Returns the spheres of a step.
+
+        Parameters
+        ----------
+        step: int or str
+            The step number or name.
+        dynamic: bool
+            Whether the returned SolidArray stores the dynamic solid state.
+        dtype: str or numpy.dtype
+            The floating point type of the returned SolidArray, defaults to
+            the type of the written solids.
+
+        Returns
+        -------
+        SolidArray:
+            The spheres of the step.
+        """
+        ids, values = self._values(self._position(step))
+        centers = values[:3].T * self.resolution + self.domain.min
+        radii = values[3] * self.resolution
+        solids = SolidArray.spheres(centers, radii, dynamic=dynamic, dtype=dtype or self._index['dtype'])
+        solids.column('id')[...] = ids
+        return solids
+
+    def _position(self, step):
+        if isinstance(step, (int, np.integer)):
+            if not -len(self) <= step < len(self):
+                raise IndexError('step {:d} out of range for series of {:d} steps'.format(step, len(self)))
+            return int(step) % len(self)
+        try:
+            return self._positions[step]
+        except KeyError:
+            raise KeyError('series {!s} has no step {!r}'.format(self._filename, step))
+
+    def _values(self, position):
+        """Returns the (N,) ids and the quantized (4, N) values of step
+        ``position``.
+        """
+        steps = self._index['steps']
+        cached, decoded = self._cache
+        if cached == position:
+            return decoded
+
+        start = position
+        while not steps[start]['keyframe']:
+            start -= 1
+        # continue from the cached step if it is on the way
+        if cached is not None and start <= cached < position:
+            start = cached + 1
+        else:
+            decoded = None
+
+        with open(self._filename, 'rb') as f:
+            for i in range(start, position + 1):
+                f.seek(steps[i]['offset'])
+                block = self._decompress(f.read(steps[i]['length']))
+                decoded = _decode(block, steps[i]['size'], None if steps[i]['keyframe'] else decoded)
+        self._cache = (position, decoded)
+        return decoded
+
+    def _decompress(self, data):
+        if self._index['codec'] == 'lzma':
+            return lzma.decompress(data)
+        return zlib.decompress(data)
+
+
+def _encode(ids, values, previous):
+    """Returns the delta-encoded, zigzag-encoded, and byte-shuffled bytes of
+    the (N,) int64 ``ids`` and (4, N) int64 ``values``. ``previous`` are the
+    ids and values of the previous step or ``None``.
+    """
+    deltas = np.empty((5, len(ids)), dtype=np.int64)
+    deltas[0] = ids
+    deltas[1:] = values
+    if previous is not None:
+        previous_ids, previous_values = previous
+        common = min(len(ids), len(previous_ids))
+        deltas[0, :common] -= previous_ids[:common]
+        rows, matches = _match(ids, previous_ids)
+        deltas[1:, rows] -= previous_values[:, matches]
+    # small negative deltas become small positive integers
+    zigzag = ((deltas << 1) ^ (deltas >> 63)).astype('<u8')
+    # group the bytes by significance, the high bytes are mostly zero
+    return zigzag.view(np.uint8).reshape((-1, 8)).T.tobytes()
+
+
+def _decode(data, size, previous):
+    """Inverts :func:`_encode`, returns the ids and values.
+    """
+    zigzag = np.frombuffer(data, dtype=np.uint8).reshape((8, 5 * size)).T.copy().view('<u8').reshape((5, size))
+    deltas = ((zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64))
+    ids, values = deltas[0], deltas[1:]
+    if previous is not None:
+        previous_ids, previous_values = previous
+        common = min(size, len(previous_ids))
+        ids[:common] += previous_ids[:common]
+        rows, matches = _match(ids, previous_ids)
+        values[:, rows] += previous_values[:, matches]
+    return ids, values
+
+
+def _match(ids, previous_ids):
+    """Returns the rows of ``ids`` that are in ``previous_ids`` and the rows
+    of ``previous_ids`` they match.
+    """
+    if not len(previous_ids):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    order = np.argsort(previous_ids, kind='stable')
+    matches = order[np.minimum(np.searchsorted(previous_ids, ids, sorter=order), len(order) - 1)]
+    rows = np.flatnonzero(previous_ids[matches] == ids)
+    return rows, matches[rows]
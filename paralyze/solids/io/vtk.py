@@ -1,18 +1,22 @@
-"""Module doc goes here...
+"""Export of solids to VTK files.
 """
 from pyevtk.hl import pointsToVTK
 import numpy as np
 
 
 def save(filename, solids, attributes=('volume', )):
-    pointsToVTK(filename, solids.x, solids.y, solids.z, data={a: solids[a] for a in attributes})
+    """Saves the solid centers and ``attributes`` as VTK point data.
 
-
-# Example 1
-npoints = 100
-x = np.random.rand(npoints)
-y = np.random.rand(npoints)
-z = np.random.rand(npoints)
-pressure = np.random.rand(npoints)
-temp = np.random.rand(npoints)
-pointsToVTK("./rnd_points", x, y, z, data = {"temp" : temp, "pressure" : pressure})
\ No newline at end of file
+    Parameters
+    ----------
+    filename: str
+        The file name without extension.
+    solids: Storage or Solids
+        The solids, ``solids[attribute]`` must return one value per solid,
+        see :class:`paralyze.core.solids.Solids`.
+    attributes: iterable
+        The names of the (scalar) solid attributes to save.
+    """
+    data = {a: np.ascontiguousarray(solids[a], dtype=np.float64) for a in attributes}
+    x, y, z = (np.ascontiguousarray(c, dtype=np.float64) for c in (solids.x, solids.y, solids.z))
+    pointsToVTK(filename, x, y, z, data=data)
@@ -1,5 +1,8 @@
-from ..algebra import AABB, Vector
-from ..fields import Cell, CellInterval
+from paralyze.core.algebra import AABB, Vector
+from paralyze.core.fields import Cell, CellInterval
+from paralyze.core.solids import SolidArray
+
+import numpy as np
 
 
 def map_aabb_to_cell_interval(aabb, field_orig, field_res, field=None):
@@ -33,19 +36,41 @@ def map_solids(solids, field, field_orig=Vector(0), field_res=Vector(1), solid_v
 
     Parameters
     ----------
+    solids: SolidArray or iterable
+        The solids that will be mapped. Solid objects are converted to a
+        :class:`SolidArray` first.
+    field: Field
+        The field onto which the solids will be mapped (including ghost layers).
+    field_orig: Vector
+        The origin of the field.
+    field_res: Vector
+        The resolution of the field.
+    solid_value:
+        The value of cells whose center is inside a solid.
 
     Notes
     -----
     In contrast to :func:`map_solid_volume_fraction` this function maps solids in
     a binary manner, i.e. the cell value will be set to either ``solid_value``
     or ``void_value`` depending on whether the cell center is inside the solid.
+
+    The cell centers are tested against all solids at once with
+    :func:`SolidArray.contains_points`, one z-layer of cells at a time.
     """
-    for solid in solids:
-        cell_interval = map_aabb_to_cell_interval(solid.aabb, field, field_orig, field_res)
-        for cell in cell_interval:
-            cell_center = field_orig + field_res * (Vector(cell) + Vector(0.5))
-            if solid.contains(cell_center):
-                field[cell] = solid_value
+    if not isinstance(solids, SolidArray):
+        solids = SolidArray.from_solids(solids)
+
+    data = field.data
+    first = np.asarray(field.cell_interval.min)
+    x, y = np.meshgrid(np.arange(data.shape[0]), np.arange(data.shape[1]), indexing='ij')
+    layer = np.empty((x.size, 3))
+    layer[:, 0] = x.ravel()
+    layer[:, 1] = y.ravel()
+    for k in range(data.shape[2]):
+        layer[:, 2] = k
+        centers = np.asarray(field_orig) + np.asarray(field_res) * (layer + first + .5)
+        inside = solids.contains_points(centers).reshape(x.shape)
+        data[:, :, k][inside] = solid_value
 
 
 def map_solid_volume_fraction(solids, field, level=1, field_orig=Vector(0), field_res=Vector(1)):
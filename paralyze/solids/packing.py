@@ -1,5 +1,4 @@
-from paralyze.core.algebra import Vector, Ray
-from paralyze.core.bodies.tracing import intersects
+from paralyze.core.solids import SolidArray
 
 from multiprocessing import Pool
 from functools import partial
@@ -14,9 +13,9 @@ import numpy as np
 def calc_mean_solid_fraction(blocks, bodies_id, domain=None):
 
     if domain is None:
-        domain = blocks.domain
+        domain = blocks.domain()
 
-    with Pool(blocks.num_processes) as pool:
+    with Pool(blocks.num_processes()) as pool:
         results = pool.map(partial(__get_solid_volume, bodies_id=bodies_id, domain=domain), blocks)
 
     solid = sum(results)
@@ -26,7 +25,7 @@ def calc_mean_solid_fraction(blocks, bodies_id, domain=None):
 def calc_mean_packing_height(blocks, bodies_id, domain=None, position_generator=None, num_samples=100):
 
     if domain is None:
-        domain = blocks.domain
+        domain = blocks.domain()
 
     args = {
         'bodies_id': bodies_id,
@@ -35,8 +34,8 @@ def calc_mean_packing_height(blocks, bodies_id, domain=None, position_generator=
         'num_samples': num_samples
     }
 
-    with Pool(blocks.num_processes) as pool:
-        results = pool.map(partial(__sample_packing_height, **args))
+    with Pool(blocks.num_processes()) as pool:
+        results = pool.map(partial(__sample_packing_height, **args), blocks)
 
     sum_s = 0
     num_s = 0
@@ -55,13 +54,14 @@ def __get_solid_volume(block, bodies_id, domain):
 
 
 def __sample_packing_height(block, bodies_id, domain, position_generator, num_samples):
-    heights = np.zeros(num_samples)
-    # ray tracing algorithm
-    for i in range(num_samples):
-        pos = position_generator.next()
-        ray = Ray(Vector((pos[0], pos[1], domain.z_max)), Vector((0, 0, -1)))
-        for body in block[bodies_id]:
-            intersection = intersects(ray, body)
-            if intersection[0]:
-                heights[i] = max(heights[i], ray.at(intersection[1]).z)
-    return heights
+    solids = block[bodies_id]
+    if not isinstance(solids, SolidArray):
+        solids = SolidArray.from_solids(solids)
+    positions = np.array([next(position_generator) for _ in range(num_samples)], dtype=np.float64)
+
+    # cast all rays downwards from the top of the domain at once
+    origins = np.empty((num_samples, 3))
+    origins[:, :2] = positions[:, :2]
+    origins[:, 2] = domain.max[2]
+    index, distance = solids.cast_rays(origins, (0, 0, -1))
+    return np.where(index >= 0, domain.max[2] - distance, 0)
@@ -0,0 +1,62 @@
+from unittest import TestCase
+from paralyze.core.algebra import Quaternion, QuaternionArray
+
+import unittest
+import numpy as np
+
+
+class QuaternionArrayTest(TestCase):
+
+    def setUp(self):
+        np.random.seed(42)
+        self.q = QuaternionArray.random(10)
+
+    def test_quaternion_equivalence(self):
+        other = QuaternionArray.random(10)
+        product = self.q.multiply(other)
+        v = np.random.random((10, 3))
+        rotated = self.q.rotate(v)
+        for i in range(10):
+            q = Quaternion(*self.q[i])
+            np.testing.assert_allclose(product[i], np.asarray(q * Quaternion(*other[i])), atol=1e-12)
+            np.testing.assert_allclose(self.q.rotation_matrix[i], q.rotation_matrix, atol=1e-12)
+            np.testing.assert_allclose(self.q.conjugate()[i], np.asarray(q.conjugate), atol=1e-12)
+            np.testing.assert_allclose(rotated[i], q.rotation_matrix.dot(v[i]), atol=1e-12)
+
+    def test_axis_angle(self):
+        q = QuaternionArray.from_axis_angle([(0, 0, 2), (1, 0, 0)], np.pi / 2)
+        np.testing.assert_allclose(q.rotate([(1, 0, 0), (1, 0, 0)]), [(0, 1, 0), (1, 0, 0)], atol=1e-12)
+
+        axes, angles = self.q.to_axis_angle()
+        q = QuaternionArray.from_axis_angle(axes, angles)
+        # q and -q are the same rotation
+        np.testing.assert_allclose(np.abs(np.einsum('ij,ij->i', q, self.q)), 1)
+
+    def test_inverse_and_normalise(self):
+        q = QuaternionArray(self.q * 3)
+        np.testing.assert_allclose(q.multiply(q.inverse), QuaternionArray.identity(10), atol=1e-12)
+        q.normalise()
+        np.testing.assert_allclose(q.norm, 1)
+
+    def test_between(self):
+        u = np.random.random((10, 3)) - .5
+        v = np.random.random((10, 3)) - .5
+        v[0] = -u[0]
+        v[1] = u[1]
+        q = QuaternionArray.between(u, v)
+        expected = v / np.linalg.norm(v, axis=1)[:, np.newaxis]
+        np.testing.assert_allclose(q.rotate(u / np.linalg.norm(u, axis=1)[:, np.newaxis]), expected, atol=1e-12)
+
+    def test_slerp_and_integrate(self):
+        q1 = QuaternionArray.from_axis_angle((0, 0, 1), [np.pi / 2, -np.pi / 2])
+        q = QuaternionArray.slerp(QuaternionArray.identity(2), q1, .5)
+        np.testing.assert_allclose(q.angle, np.pi / 4)
+        np.testing.assert_allclose(q.axis, [(0, 0, 1), (0, 0, -1)], atol=1e-12)
+
+        q = QuaternionArray.identity(2)
+        q.integrate([(0, 0, np.pi / 2), (0, 0, -np.pi / 2)], 1.0)
+        np.testing.assert_allclose(q, q1, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
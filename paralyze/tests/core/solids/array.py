@@ -0,0 +1,174 @@
+from unittest import TestCase
+from paralyze.core.algebra import AABB, Quaternion
+from paralyze.core.solids import SolidArray, create_sphere, create_capsule, create_cylinder
+
+import unittest
+import numpy as np
+
+
+class SolidArrayTest(TestCase):
+
+    def test_spheres(self):
+        solids = SolidArray.spheres(centers=[(0, 0, 0), (2, 0, 0)], radii=(1, 2))
+
+        self.assertEqual(len(solids), 2)
+        self.assertEqual(solids['center'].shape, (2, 3))
+        np.testing.assert_array_equal(solids['aabb'][1], (0, -2, -2, 4, 2, 2))
+
+    def test_view(self):
+        solids = SolidArray.spheres(centers=[(0, 0, 0), (2, 0, 0)], radii=1)
+        sphere = solids[1]
+        sphere.radius = 3
+        sphere.center = (1, 1, 1)
+        sphere.update()
+
+        self.assertEqual(solids['radius'][1], 3)
+        np.testing.assert_array_equal(solids['center'][1], (1, 1, 1))
+        np.testing.assert_array_equal(solids['aabb'][1], (-2, -2, -2, 4, 4, 4))
+        self.assertEqual(hash(sphere), hash(solids[1]))
+
+    def test_from_solids(self):
+        objects = [
+            create_sphere((1, 1, 1), radius=2, dynamic=True, density=3),
+            create_capsule(radius=1, start=(0, 0, 0), end=(2, 0, 0), dynamic=True)
+        ]
+        solids = SolidArray.from_solids(objects)
+
+        self.assertTrue(solids.dynamic)
+        np.testing.assert_array_equal(solids['type'], (SolidArray.SphereType, SolidArray.CapsuleType))
+        np.testing.assert_array_equal(solids['density'], (3, 1))
+        self.assertEqual(solids[1].length, 2)
+        self.assertEqual(solids[0].mass, objects[0].mass)
+
+    def test_extend_and_take(self):
+        solids = SolidArray(dynamic=True)
+        for i in range(10):
+            solids.append(create_sphere((i, 0, 0), radius=1))
+
+        self.assertEqual(len(solids), 10)
+        np.testing.assert_array_equal(solids['density'], 1)
+
+        subset = solids[solids['center'][:, 0] >= 5]
+        self.assertEqual(len(subset), 5)
+        self.assertEqual(subset[0].id, solids[5].id)
+
+    def test_update_aabbs(self):
+        objects = []
+        for i in range(20):
+            create = create_capsule if i % 2 else create_cylinder
+            solid = create(radius=.5, start=(i, 0, 0), end=(i+2, 1, 0), dtype=np.float64)
+            solid.set_rotation(Quaternion.random())
+            solid.update_aabb()
+            objects.append(solid)
+        solids = SolidArray.from_solids(objects, dtype=np.float64)
+        solids['aabb'] = 0
+        solids.update_aabbs()
+
+        np.testing.assert_allclose(solids['aabb'], [s.aabb for s in objects])
+
+    def test_contains_points(self):
+        rng = np.random.RandomState(42)
+        objects = [create_sphere(rng.rand(3) * 10, radius=1, dtype=np.float64) for _ in range(10)]
+        for create in (create_capsule, create_cylinder) * 5:
+            start = rng.rand(3) * 10
+            solid = create(radius=.5, start=start, end=start + (2, 0, 0), dtype=np.float64)
+            solid.set_rotation(Quaternion.random())
+            solid.update_aabb()
+            objects.append(solid)
+        solids = SolidArray.from_solids(objects, dtype=np.float64)
+        points = rng.rand(5000, 3) * 10
+
+        expected = np.any([s.contains_points(points) for s in objects], axis=0)
+        which = solids.contains_points(points, which=True)
+
+        np.testing.assert_array_equal(solids.contains_points(points), expected)
+        np.testing.assert_array_equal(which >= 0, expected)
+        for i in np.flatnonzero(expected)[:50]:
+            self.assertTrue(objects[which[i]].contains(points[i]))
+
+    def test_rods(self):
+        axes = [(0, 0, 1), (0, 1, 0), (1, 0, 0)]
+        solids = SolidArray.rods(np.zeros((3, 3)), radii=.5, lengths=2, axes=axes,
+                                 solid_type=SolidArray.CylinderType)
+
+        np.testing.assert_allclose(solids.axes(), axes, atol=1e-6)
+        np.testing.assert_allclose(solids['aabb'][0], (-.5, -.5, -1, .5, .5, 1), atol=1e-6)
+        np.testing.assert_allclose(solids.orientation_tensor(), np.eye(3) / 3, atol=1e-6)
+        self.assertEqual(solids[0].length, 2)
+
+    def test_mass_properties(self):
+        objects = [
+            create_sphere((1, 1, 1), radius=2, dynamic=True, density=3),
+            create_capsule(radius=1, start=(0, 0, 0), end=(2, 2, 0), dynamic=True),
+            create_cylinder(radius=.5, start=(0, 0, 1), end=(0, 3, 1), dynamic=True, density=2)
+        ]
+        solids = SolidArray.from_solids(objects, dtype='float64')
+        masses, moments, tensors = solids.mass_properties()
+
+        for i, solid in enumerate(objects):
+            solid.update()
+            self.assertAlmostEqual(masses[i], solid.mass, places=4)
+            np.testing.assert_allclose(moments[i], np.diag(solid.inertia), rtol=1e-6)
+            np.testing.assert_allclose(tensors[i], solid.inertia_tensor, rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(solids.inertia_tensors(frame='body')[2], np.diag(moments[2]))
+        np.testing.assert_allclose(solids.center_of_mass(), masses.dot(solids['center']) / masses.sum())
+        # static arrays use unit density unless specified otherwise
+        static = SolidArray.from_solids(objects, dynamic=False)
+        np.testing.assert_allclose(static.masses(), static.volumes())
+
+    def test_precision(self):
+        single = SolidArray.spheres(centers=[(0, 0, 0)], radii=1, dtype='float32')
+        double = SolidArray.spheres(centers=[(1, 0, 0)], radii=1, dtype='float64')
+
+        self.assertEqual(SolidArray.concatenate((single, double)).dtype, np.float64)
+        self.assertEqual(SolidArray.concatenate((single, double), dtype='float32').dtype, np.float32)
+        single.extend(double)
+        self.assertEqual(single['center'].dtype, np.float32)
+        self.assertEqual(single.astype('float64')['radius'].dtype, np.float64)
+        self.assertEqual(SolidArray.from_solids([create_sphere(dtype='float64')]).dtype, np.float64)
+        self.assertRaises(TypeError, SolidArray, dtype='int32')
+
+    def test_memory_report(self):
+        solids = SolidArray(100, dynamic=True, dtype='float64')
+        report = solids.memory_report()
+
+        self.assertEqual(report['center'], 100 * 3 * 8)
+        self.assertEqual(report['total'], sum(v for k, v in report.items() if k != 'total'))
+        self.assertEqual(report, SolidArray.estimate_memory(100, dynamic=True, dtype='float64'))
+
+    def test_from_columns(self):
+        solids = SolidArray.from_columns({'center': np.zeros((3, 3)), 'radius': np.arange(3.), 'density': 2.0 * np.ones(3)})
+
+        self.assertTrue(solids.dynamic)
+        self.assertEqual(solids.dtype, np.float64)
+        self.assertEqual(len(set(solids['id'])), 3)
+        self.assertTrue(np.all(solids['shadow_of'] == -1))
+        self.assertRaises(KeyError, SolidArray.from_columns, {'color': np.zeros(3)})
+        self.assertRaises(ValueError, SolidArray.from_columns, {'center': np.zeros((3, 3)), 'radius': np.zeros(2)})
+
+        centers = np.zeros((3, 3), dtype=np.float32)
+        solids = SolidArray.from_columns({'center': centers, 'radius': np.ones(3)}, dtype='float32', copy=False)
+        self.assertTrue(np.shares_memory(solids['center'], centers))
+        solids.append(create_sphere(center=(1, 2, 3), radius=1))
+        self.assertFalse(np.shares_memory(solids['center'], centers))
+        np.testing.assert_allclose(solids['center'][3], (1, 2, 3))
+
+    def test_split_indices(self):
+        np.random.seed(3)
+        solids = SolidArray.spheres(np.random.random((1000, 3)) * 10, radii=.2)
+        domains = [AABB((0, 0, 0), (5, 10, 10)), AABB((5, 0, 0), (10, 10, 10)), AABB((4, 4, 4), (6, 6, 6))]
+
+        centers = solids.split_indices(domains)
+        self.assertEqual(len(centers[0]) + len(centers[1]), len(solids))
+        for domain, indices in zip(domains, centers):
+            self.assertTrue(np.array_equal(indices, np.flatnonzero(domain.contains_point(solids['center']))))
+
+        aabbs = solids['aabb']
+        for domain, indices in zip(domains, solids.split_indices(domains, mode='intersects')):
+            expected = np.all(aabbs[:, 3:] > domain.min, axis=1) & np.all(aabbs[:, :3] < domain.max, axis=1)
+            self.assertTrue(np.array_equal(indices, np.flatnonzero(expected)))
+        self.assertRaises(ValueError, solids.split_indices, domains, mode='contained')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+from unittest import TestCase
+from paralyze.core.solids import SolidArray
+from paralyze.core.solids.bvh import BVH
+
+import unittest
+import numpy as np
+
+
+class BVHTest(TestCase):
+
+    def setUp(self):
+        np.random.seed(3)
+        centers = np.random.random((2000, 3)) * 30
+        self.aabbs = np.hstack((centers - .5, centers + .5))
+
+    def test_overlaps(self):
+        tree = BVH(self.aabbs, leaf_size=3)
+        box_min = np.random.random((50, 3)) * 30
+        box_max = box_min + 2
+        query, box = tree.overlaps(box_min, box_max)
+
+        expected = np.all(self.aabbs[np.newaxis, :, :3] <= box_max[:, np.newaxis], axis=2) & \
+            np.all(self.aabbs[np.newaxis, :, 3:] >= box_min[:, np.newaxis], axis=2)
+        self.assertEqual(set(zip(query.tolist(), box.tolist())), set(map(tuple, np.argwhere(expected).tolist())))
+
+    def test_ray_candidates(self):
+        tree = BVH(self.aabbs)
+        origins = np.random.random((50, 3)) * 30
+        origins[:, 2] = 40
+        ray, box, distance = tree.ray_candidates(origins, (0, 0, -1))
+
+        inside = np.all(self.aabbs[np.newaxis, :, :2] <= origins[:, np.newaxis, :2], axis=2) & \
+            np.all(self.aabbs[np.newaxis, :, 3:5] >= origins[:, np.newaxis, :2], axis=2)
+        self.assertEqual(set(zip(ray.tolist(), box.tolist())), set(map(tuple, np.argwhere(inside).tolist())))
+        np.testing.assert_allclose(distance, 40 - self.aabbs[box, 5])
+
+    def test_cast_rays(self):
+        solids = SolidArray.spheres([(0, 0, 0), (0, 0, 5)], radii=1)
+        solids.extend(SolidArray.rods([(5, 0, 0), (10, 0, 0)], radii=1, lengths=2, axes=(0, 0, 1)))
+        solids.extend(SolidArray.rods([(15, 0, 0)], radii=1, lengths=2, axes=(0, 0, 1),
+                                      solid_type=SolidArray.CylinderType))
+        origins = [(0, 0, 10), (5, 0, 10), (10, .5, 10), (15, .5, 10), (20, 0, 10), (0, 0, 5)]
+        index, distance = solids.cast_rays(origins, (0, 0, -1))
+
+        np.testing.assert_array_equal(index, (1, 2, 3, 4, -1, 1))
+        np.testing.assert_allclose(distance, (4, 8, 9 - np.sqrt(.75), 9, np.inf, 0), rtol=1e-6)
+
+        index, distance = solids.cast_rays([(-5, 0, 0)], (1, 0, 0), max_distance=3)
+        self.assertEqual(index[0], -1)
+
+    def test_cast_rays_miss(self):
+        # the median solid size is zero
+        solids = SolidArray.spheres([(0, 0, 0), (0, 0, 5), (5, 0, 0)], radii=(1, 0, 0))
+        # rays that leave the solid bounds without a hit terminate
+        index, distance = solids.cast_rays([(2, 2, 10), (0, 0, -100), (0, 0, 10)], [(0, 0, -1), (0, 0, 1), (1, 0, 0)])
+        np.testing.assert_array_equal(index, (-1, 0, -1))
+        np.testing.assert_allclose(distance, (np.inf, 99, np.inf))
+
+
+if __name__ == '__main__':
+    unittest.main()
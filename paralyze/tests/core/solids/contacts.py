@@ -0,0 +1,47 @@
+from unittest import TestCase
+from paralyze.core import AABB
+from paralyze.core.solids import SolidArray, create_capsule
+from paralyze.core.solids.contacts import contact_pairs, coordination_numbers, overlaps
+
+import unittest
+import numpy as np
+
+
+class ContactsTest(TestCase):
+
+    def test_contact_pairs(self):
+        centers = [(0, 0, 0), (2, 0, 0), (3.9, 0, 0), (10, 0, 0)]
+        first, second, gap = contact_pairs(centers, radii=1, tolerance=.05)
+
+        np.testing.assert_array_equal(first, (0, 1))
+        np.testing.assert_array_equal(second, (1, 2))
+        np.testing.assert_allclose(gap, (0, -.1), atol=1e-12)
+        np.testing.assert_array_equal(coordination_numbers(first, second, 4), (1, 2, 1, 0))
+
+        first, second, depth = overlaps(first, second, gap)
+        np.testing.assert_array_equal(first, (1, ))
+        np.testing.assert_allclose(depth, (.1, ))
+
+    def test_periodic(self):
+        np.random.seed(11)
+        centers = np.random.random((200, 3)) * 10
+        domain = AABB((0, 0, 0), (10, 10, 10))
+        first, second, gap = contact_pairs(centers, .7, domain=domain, periodicity=(True, False, True))
+
+        d = centers[np.newaxis] - centers[:, np.newaxis]
+        for axis in (0, 2):
+            d[..., axis] -= 10 * np.round(d[..., axis] / 10)
+        expected = np.argwhere(np.triu(np.linalg.norm(d, axis=2) <= 1.4, 1))
+        self.assertEqual(set(zip(first.tolist(), second.tolist())), set(map(tuple, expected.tolist())))
+
+    def test_solid_array(self):
+        solids = SolidArray.spheres([(0, 0, 0), (1.5, 0, 0)], radii=1)
+        first, second, gap = solids.contacts()
+        self.assertEqual(len(first), 1)
+
+        solids.append(create_capsule())
+        self.assertRaises(TypeError, solids.contacts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from unittest import TestCase
+from paralyze.core.solids import ids, IdAllocator, SolidArray, create_sphere
+
+import unittest
+import multiprocessing as mp
+import numpy as np
+
+
+def allocate_ids(n):
+    return ids.allocate(n)
+
+
+def current_namespace(_):
+    return int(ids.namespace_of(ids.next_id()))
+
+
+def has_worker_initargs(_):
+    try:
+        ids.worker_initargs()
+    except RuntimeError:
+        return False
+    return True
+
+
+class IdsTest(TestCase):
+
+    def test_allocator(self):
+        allocator = IdAllocator(namespace=3)
+        first = allocator.allocate(5)
+        second = allocator.next_id()
+
+        self.assertEqual(first.dtype, np.int64)
+        np.testing.assert_array_equal(np.diff(first), 1)
+        self.assertEqual(second, first[-1] + 1)
+        np.testing.assert_array_equal(ids.namespace_of(first), 3)
+
+    def test_solids(self):
+        sphere = create_sphere()
+        solids = SolidArray(3)
+        solids.append(sphere)
+
+        self.assertIsInstance(sphere.id, int)
+        self.assertEqual(len(np.unique(solids['id'])), 4)
+        self.assertEqual(solids[3].id, sphere.id)
+
+    def test_workers(self):
+        with mp.Pool(2, initializer=ids.init_worker, initargs=ids.worker_initargs()) as pool:
+            results = pool.map(allocate_ids, [100] * 4)
+        results.append(ids.allocate(100))
+        all_ids = np.concatenate(results)
+
+        self.assertEqual(len(np.unique(all_ids)), len(all_ids))
+
+    def test_worker_namespaces(self):
+        namespaces = set()
+        # restarted workers and later pools get fresh namespaces
+        for _ in range(2):
+            with mp.Pool(2, initializer=ids.init_worker, initargs=ids.worker_initargs(), maxtasksperchild=1) as pool:
+                namespaces.update(pool.map(current_namespace, range(4)))
+        self.assertEqual(len(namespaces), 8)
+        self.assertNotIn(0, namespaces)
+
+    def test_worker_initargs_in_workers(self):
+        # a spawned worker does not know the counter of the main process
+        with mp.get_context('spawn').Pool(1) as pool:
+            self.assertEqual(pool.map(has_worker_initargs, [0]), [False])
+        with mp.Pool(1, initializer=ids.init_worker, initargs=ids.worker_initargs()) as pool:
+            self.assertEqual(pool.map(has_worker_initargs, [0]), [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+from unittest import TestCase
+from paralyze.core.algebra import Quaternion
+from paralyze.core.solids import SolidArray
+from paralyze.core.solids.integration import accelerations, symplectic_euler, velocity_verlet
+
+import unittest
+import numpy as np
+
+
+class IntegrationTest(TestCase):
+
+    def test_free_fall(self):
+        solids = SolidArray.spheres(np.zeros((100, 3)), radii=1, dynamic=True, dtype=np.float64)
+        solids.update_inertia()
+        for _ in range(100):
+            velocity_verlet(solids, 0.01, gravity=(0, 0, -10))
+
+        np.testing.assert_allclose(solids['center'][:, 2], -5)
+        np.testing.assert_allclose(solids['linear_velocity'][:, 2], -10)
+        np.testing.assert_allclose(solids['aabb'][:, 5], -4)
+
+    def test_fixed(self):
+        solids = SolidArray.spheres(np.zeros((2, 3)), radii=1, dynamic=True, density=(0, 1))
+        solids.update_inertia()
+        symplectic_euler(solids, 0.1, gravity=(0, 0, -10))
+
+        np.testing.assert_array_equal(solids['linear_velocity'][:, 2], (0, -1))
+
+    def test_zero_inertia(self):
+        solids = SolidArray.spheres(np.zeros((2, 3)), radii=1, dynamic=True, dtype=np.float64)
+        self.assertTrue(np.all(solids['inertia'][:, 0::4] > 0))
+
+        solids['inertia'] = 0
+        solids['angular_velocity'] = (0, 0, 1)
+        symplectic_euler(solids, 0.1, gravity=(0, 0, -10))
+        self.assertTrue(np.all(np.isfinite(solids['quaternion'])))
+        np.testing.assert_allclose(solids['angular_velocity'], [(0, 0, 1)] * 2)
+
+        # non-diagonal tensors are solved, singular ones are skipped
+        solids['inertia'] = 0
+        solids['inertia'][0] = (2, 1, 0, 1, 2, 0, 0, 0, 2)
+        solids['torque'] = (0, 0, 1)
+        linear, angular = accelerations(solids)
+        np.testing.assert_allclose(angular, [(0, 0, .5), (0, 0, 0)])
+
+    def test_rotation(self):
+        solids = SolidArray(1, dynamic=True, dtype=np.float64)
+        solids['type'] = SolidArray.CylinderType
+        solids['length'] = 4
+        solids['angular_velocity'] = (0, 0, np.pi / 2)
+        solids.update()
+        for _ in range(100):
+            symplectic_euler(solids, 0.01)
+
+        # cylinder axis has been rotated from x to y axis
+        np.testing.assert_allclose(solids.axes()[0], (0, 1, 0), atol=1e-12)
+        np.testing.assert_allclose(solids['quaternion'][0], np.asarray(Quaternion(axis=(0, 0, 1), angle=np.pi / 2)), atol=1e-12)
+        np.testing.assert_allclose(solids['angular_velocity'][0], (0, 0, np.pi / 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
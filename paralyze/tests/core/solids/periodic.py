@@ -0,0 +1,47 @@
+from unittest import TestCase
+from paralyze.core import AABB
+from paralyze.core.solids import SolidArray
+from paralyze.core.solids.periodic import periodic_images
+
+import unittest
+import numpy as np
+
+
+class PeriodicImagesTest(TestCase):
+
+    def setUp(self):
+        self.domain = AABB((0, 0, 0), (10, 10, 10))
+        self.solids = SolidArray.spheres([(5, 5, 5), (.5, 5, 5), (9.5, 9.5, 5), (.5, .5, .5)], radii=1)
+
+    def test_images(self):
+        source, shift = periodic_images(self.solids['aabb'], self.domain, (True, True, True))
+
+        self.assertEqual(np.bincount(source, minlength=4).tolist(), [0, 1, 3, 7])
+        self.assertTrue(np.array_equal(shift[source == 1], [(10, 0, 0)]))
+        self.assertEqual(set(map(tuple, shift[source == 2].tolist())), {(-10, 0, 0), (0, -10, 0), (-10, -10, 0)})
+
+        source, shift = periodic_images(self.solids['aabb'], self.domain, (False, True, False))
+        self.assertEqual(source.tolist(), [2, 3])
+
+    def test_solid_array(self):
+        images = self.solids.periodic_images(self.domain, (True, True, True))
+        ids = self.solids['id']
+
+        self.assertEqual(len(images), 11)
+        self.assertTrue(images.shadows().all())
+        self.assertFalse(self.solids.shadows().any())
+        self.assertTrue(np.isin(images['shadow_of'], ids).all())
+        self.assertFalse(np.isin(images['id'], ids).any())
+        self.assertTrue(np.allclose(images['aabb'][:, :3], images['center'] - 1))
+
+        # images of images refer to the original solid
+        again = images.periodic_images(AABB((0, 0, 0), (20, 20, 20)), (True, True, True))
+        self.assertTrue(np.isin(again['shadow_of'], ids).all())
+
+    def test_too_big(self):
+        solids = SolidArray.spheres([(5, 5, 5)], radii=6)
+        self.assertRaises(ValueError, solids.periodic_images, self.domain, (True, False, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+from unittest import TestCase
+from paralyze.core.solids import SolidArray, SharedSolidArray
+
+import multiprocessing as mp
+import pickle
+import unittest
+import numpy as np
+
+
+def _scale_radii(handle):
+    with SharedSolidArray.attach(handle, readonly=False) as part:
+        part['radius'] *= 2
+        return len(part)
+
+
+def _total_volume(solids):
+    return float(solids.volumes().sum())
+
+
+class SharedSolidArrayTest(TestCase):
+
+    def setUp(self):
+        self.solids = SolidArray.spheres(np.random.random((100, 3)), radii=np.arange(100), dynamic=True)
+
+    def test_from_array(self):
+        with SharedSolidArray.from_array(self.solids) as shared:
+            self.assertEqual(len(shared), 100)
+            self.assertTrue(shared.dynamic)
+            for column in self.solids.columns:
+                np.testing.assert_array_equal(shared[column], self.solids[column])
+            self.assertEqual(shared[5].radius, 5)
+            self.assertRaises(ValueError, shared.resize, 101)
+
+    def test_attach(self):
+        with SharedSolidArray.from_array(self.solids) as shared:
+            with SharedSolidArray.attach(shared.handle) as attached:
+                np.testing.assert_array_equal(attached['center'], self.solids['center'])
+                with self.assertRaises(ValueError):
+                    attached['radius'][0] = 1
+
+            part = shared.handle.partition(3)[1]
+            with SharedSolidArray.attach(part, readonly=False) as attached:
+                attached['radius'] = -1
+                self.assertEqual(len(attached), 33)
+            np.testing.assert_array_equal(shared['radius'][33:66], -1)
+            np.testing.assert_array_equal(shared['radius'][:33], np.arange(33))
+
+            copy = pickle.loads(pickle.dumps(shared))
+            self.assertEqual(copy.name, shared.name)
+            copy.close()
+
+    def test_pool(self):
+        with SharedSolidArray.from_array(self.solids) as shared:
+            with mp.Pool(2) as pool:
+                self.assertEqual(pool.map(_scale_radii, shared.handle.partition(4)), [25] * 4)
+                volumes = pool.map(_total_volume, [shared])
+            np.testing.assert_array_equal(shared['radius'], 2 * np.arange(100))
+            self.assertAlmostEqual(volumes[0] / shared.volumes().sum(), 1, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+from unittest import TestCase
+from paralyze.core import AABB
+from paralyze.core.solids import SolidArray, Solids, SpatialHash, Storage, create_sphere
+
+import time
+import unittest
+import numpy as np
+
+
+class StorageTest(TestCase):
+
+    def setUp(self):
+        np.random.seed(7)
+        self.solids = [create_sphere(tuple(c), radius=.5) for c in np.random.random((500, 3)) * 20]
+        self.region = AABB((4, 4, 4), (9, 10, 11))
+
+    def test_add_remove(self):
+        storage = Storage(AABB((0, 0, 0), (10, 20, 20)), self.solids, cell_size=1.5)
+        expected = set(s for s in self.solids if s.center[0] < 10)
+
+        self.assertEqual(storage.solids, expected)
+        self.assertEqual(len(storage.index), len(expected))
+
+        solid = next(iter(expected))
+        storage.remove(solid)
+        self.assertEqual(len(storage), len(expected) - 1)
+        self.assertNotIn(solid.id, storage.index)
+
+    def test_extent(self):
+        storage = Storage(solids=self.solids[:100])
+        storage.add(self.solids[100:])
+        centers = np.array([s.center for s in self.solids])
+
+        self.assertTrue(np.allclose(storage.center_aabb.min, centers.min(axis=0)))
+        self.assertTrue(np.allclose(storage.center_aabb.max, centers.max(axis=0)))
+        self.assertTrue(np.allclose(storage.aabb.min, centers.min(axis=0) - .5))
+        self.assertTrue(np.allclose(storage.aabb.max, centers.max(axis=0) + .5))
+
+        lowest = self.solids[int(np.argmin(centers[:, 0]))]
+        storage.remove(lowest)
+        rest = np.array([s.center for s in storage])
+        self.assertAlmostEqual(storage.center_aabb.min[0], rest[:, 0].min(), places=5)
+
+    def test_attributes(self):
+        storage = Storage(solids=self.solids[:100])
+        radius = storage['radius']
+
+        self.assertEqual(radius.shape, (100, ))
+        self.assertIs(storage['radius'], radius)
+        self.assertTrue(np.allclose(storage['volume'], [s.volume for s in storage]))
+        self.assertTrue(np.allclose(storage['equivalent_mesh_size'], 1.0))
+        self.assertTrue(np.array_equal(storage.x, [s.center[0] for s in storage]))
+        self.assertEqual(storage['linear_velocity'].shape, (100, 3))
+        self.assertRaises(KeyError, storage.__getitem__, 'color')
+
+        storage.add(self.solids[100:])
+        self.assertEqual(len(storage['radius']), len(self.solids))
+        self.assertTrue(np.array_equal(storage['id'], [s.id for s in storage]))
+        storage.remove(self.solids[0])
+        self.assertEqual(len(storage.z), len(self.solids) - 1)
+
+    def test_set_algebra(self):
+        a = Storage(AABB((0, 0, 0), (12, 20, 20)), self.solids)
+        b = Storage(AABB((8, 0, 0), (20, 20, 20)), self.solids)
+        ids = np.array([s.id for s in self.solids])
+        x = np.array([s.center[0] for s in self.solids])
+
+        merged = a | b
+        self.assertEqual(len(merged), len(self.solids))
+        self.assertEqual(sorted(merged.ids), sorted(ids))
+
+        both = a & b
+        self.assertEqual(set(both.ids), set(ids[(x >= 8) & (x < 12)]))
+        self.assertEqual(set((a - b).ids), set(ids[x < 8]))
+
+        a.remove(b)
+        self.assertEqual(set(a.ids), set(ids[x < 8]))
+        a.remove(ids[:10])
+        self.assertFalse(np.isin(ids[:10], a.ids).any())
+        self.assertNotIn(self.solids[0], a)
+        self.assertIn(next(iter(a)), a)
+
+    def test_set_algebra_with_solids(self):
+        storage = Storage(solids=self.solids)
+        clipped = storage.clipped(self.region, strict=True)
+        rest = storage - clipped
+
+        self.assertEqual(len(rest), len(storage) - len(clipped))
+        self.assertFalse(np.isin(clipped['id'], rest.ids).any())
+        self.assertEqual(set((rest | clipped).ids), set(storage.ids))
+        self.assertEqual(set((storage & clipped).ids), set(storage.ids))
+        self.assertEqual(len(storage - Solids()), len(storage))
+
+    def test_query(self):
+        indexed = Storage(solids=self.solids, cell_size=1.5)
+        plain = Storage(solids=self.solids)
+
+        for mode in ('center', 'intersects', 'contained'):
+            self.assertEqual(indexed.query(self.region, mode), plain.query(self.region, mode))
+
+        centers = set(s for s in self.solids if self.region.contains(s.center))
+        self.assertEqual(indexed.query(self.region), centers)
+        self.assertTrue(centers < indexed.clipped(self.region))
+        self.assertTrue(indexed.clipped(self.region, strict=True) < centers)
+
+    def test_spatial_hash(self):
+        index = SpatialHash(cell_size=1.0)
+        index.insert([1, 2, 3], [(0.5, 0.5, 0.5), (-0.5, 0.5, 0.5), (5.5, 5.5, 5.5)], [(0.5, 0.5, 0.5)] * 3)
+        self.assertEqual(index.num_buckets, 3)
+        self.assertEqual(sorted(index.candidates((-1, 0, 0), (1, 1, 1))), [1, 2])
+        self.assertEqual(sorted(index.candidates((6, 6, 6), (9, 9, 9), index.reach)), [3])
+
+        # moved solids change their cell, removed solids are gone
+        index.insert([1], [(5.2, 5.2, 5.2)])
+        index.remove([2, 4])
+        self.assertEqual(len(index), 2)
+        self.assertNotIn(2, index)
+        self.assertEqual(sorted(index.candidates((5, 5, 5), (6, 6, 6))), [1, 3])
+        self.assertEqual(sorted(index.candidates(AABB.inf().min, AABB.inf().max)), [1, 3])
+
+    def test_query_timing(self):
+        np.random.seed(3)
+        array = SolidArray.spheres(np.random.random((200000, 3)) * 50, np.full(200000, .5))
+        indexed = Storage(solids=array, cell_size=1.0)
+        plain = Storage(solids=array)
+        region = AABB((20, 20, 20), (25, 25, 25))
+
+        def best_time(storage):
+            storage.query_rows(region, 'intersects')
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                storage.query_rows(region, 'intersects')
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        # the indexed query only visits the solids near the region
+        self.assertLess(best_time(indexed), best_time(plain))
+        np.testing.assert_array_equal(indexed.query_rows(region, 'intersects'), plain.query_rows(region, 'intersects'))
+
+    def test_split(self):
+        storage = Storage(solids=self.solids)
+        storage.build_index()
+        parts = storage.split(AABB((0, 0, 0), (20, 20, 20)).slices(0, 4))
+
+        self.assertEqual(sum(len(part) for part in parts), len(self.solids))
+        self.assertTrue(all(part.index is not None for part in parts))
+        for part in parts:
+            self.assertEqual(part.solids, storage.query(part.domain))
+
+        parts = storage.split([AABB.inf(), self.region])
+        self.assertEqual(parts[0].solids, storage.solids)
+        self.assertEqual(parts[1].solids, storage.query(self.region))
+
+    def test_split_modes(self):
+        storage = Storage(solids=self.solids)
+        domains = AABB((0, 0, 0), (20, 20, 20)).slices(0, 4)
+
+        # bounding boxes that cross a boundary are added to both neighbors
+        shadows = storage.split(domains, mode='intersects')
+        for part in shadows:
+            self.assertEqual(part.solids, storage.query(part.domain, 'intersects'))
+        self.assertGreater(sum(len(part) for part in shadows), len(storage))
+
+        strict = storage.split(domains, strict=True)
+        for part in strict:
+            self.assertEqual(part.solids, storage.clipped(part.domain, strict=True))
+
+        indices = storage.split_indices(domains)
+        for part, rows in zip(storage.split(domains), indices):
+            np.testing.assert_array_equal(storage.ids[rows], part.ids)
+        self.assertRaises(ValueError, storage.split_indices, domains, mode='contained')
+
+
+if __name__ == '__main__':
+    unittest.main()
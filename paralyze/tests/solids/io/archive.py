@@ -0,0 +1,95 @@
+from unittest import TestCase
+from paralyze.solids.io import SnapshotArchive
+
+import io
+import os
+import pickle
+import shutil
+import tarfile
+import tempfile
+import unittest
+import numpy as np
+
+
+class SnapshotArchiveTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def create(self, mode='w:gz', num_steps=5):
+        path = os.path.join(self.tmp, 'snapshots.tar' + ('.gz' if mode == 'w:gz' else ''))
+        with tarfile.open(path, mode) as tar:
+            directory = tarfile.TarInfo('steps')
+            directory.type = tarfile.DIRTYPE
+            tar.addfile(directory)
+            for t in range(num_steps):
+                data = '1,{:d},0,0,2\n'.format(t).encode('utf-8') * (t + 1)
+                info = tarfile.TarInfo('steps/{:04d}.csv'.format(t))
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return path
+
+    def test_random_access(self):
+        for mode in ('w', 'w:gz'):
+            path = self.create(mode)
+            with SnapshotArchive(path) as archive:
+                self.assertEqual(len(archive), 5)
+                self.assertEqual(archive.compressed, mode == 'w:gz')
+                self.assertEqual(archive.names[0], 'steps/0000.csv')
+                # backwards and forwards
+                for t in (4, 1, 3):
+                    solids = archive.load(archive.names[t])
+                    self.assertEqual(len(solids), t + 1)
+                    np.testing.assert_allclose(solids['center'][:, 0], t)
+                self.assertEqual(archive[-1], b'1,4,0,0,2\n' * 5)
+                self.assertIn('steps/0002.csv', archive)
+                self.assertNotIn('steps', archive)
+                self.assertRaises(KeyError, archive.read, 'steps/0005.csv')
+
+    def test_index(self):
+        path = self.create()
+        SnapshotArchive(path).close()
+        self.assertTrue(os.path.exists(path + '.index'))
+
+        archive = SnapshotArchive(path)
+        self.assertEqual(archive.member('steps/0001.csv'), SnapshotArchive(path, rebuild=True).member('steps/0001.csv'))
+
+        # a changed archive invalidates the index
+        path = self.create(num_steps=2)
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(len(SnapshotArchive(path)), 2)
+
+    def test_index_fallback(self):
+        path = self.create()
+        # the index location next to the archive is not writable
+        os.mkdir(path + '.index')
+        cache = os.path.join(self.tmp, 'cache')
+        os.environ['PARALYZE_CACHE_DIR'] = cache
+        try:
+            self.assertEqual(len(SnapshotArchive(path)), 5)
+            self.assertEqual(len(os.listdir(cache)), 1)
+            self.assertEqual(SnapshotArchive(path).names, SnapshotArchive(path, rebuild=True).names)
+        finally:
+            del os.environ['PARALYZE_CACHE_DIR']
+
+    def test_iter_load(self):
+        for mode in ('w', 'w:gz'):
+            archive = SnapshotArchive(self.create(mode))
+            names = archive.names[-3:]
+            for jobs in (1, 2):
+                results = dict(archive.iter_load(names, jobs=jobs, dtype='float64'))
+                self.assertEqual(sorted(results), names)
+                self.assertEqual([len(results[name]) for name in names], [3, 4, 5])
+                # solids loaded in different workers have distinct ids
+                all_ids = np.concatenate([solids['id'] for solids in results.values()])
+                self.assertEqual(len(np.unique(all_ids)), len(all_ids))
+
+        restored = pickle.loads(pickle.dumps(archive))
+        self.assertEqual(restored.read(names[0]), archive.read(names[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+from unittest import TestCase
+from paralyze.core import AABB
+from paralyze.core.solids import SolidArray
+from paralyze.solids.io import binary
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+
+class SolidFileTest(TestCase):
+
+    def setUp(self):
+        np.random.seed(11)
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'bed.psb')
+        self.solids = SolidArray.spheres(np.random.random((5000, 3)) * 10, np.random.random(5000) * .2 + .1,
+                                         dynamic=True, dtype='float64')
+        self.solids['linear_velocity'] = np.random.random((5000, 3))
+        binary.save(self.path, self.solids, solids_per_tile=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        with binary.SolidFile(self.path) as f:
+            self.assertEqual(len(f), len(self.solids))
+            self.assertGreater(f.num_tiles, 1)
+            solids = f.load()
+
+        self.assertTrue(solids.dynamic)
+        self.assertEqual(solids.dtype, np.float64)
+        order = np.argsort(solids['id'])
+        expected = np.argsort(self.solids['id'])
+        for column in self.solids.columns:
+            np.testing.assert_array_equal(solids[column][order], self.solids[column][expected])
+
+    def test_query(self):
+        region = AABB((2, 3, 4), (5, 5, 9))
+        aabbs = self.solids['aabb']
+        with binary.SolidFile(self.path) as f:
+            self.assertLess(len(f.tiles(region)), f.num_tiles)
+            for mode, expected in (
+                ('center', region.contains_point(self.solids['center'])),
+                ('contained', region.contains_other(aabbs)),
+                ('intersects', np.all(aabbs[:, 3:] > region.min, axis=1) & np.all(aabbs[:, :3] < region.max, axis=1))
+            ):
+                found = f.query(region, mode)
+                self.assertEqual(set(found['id'].tolist()), set(self.solids['id'][expected].tolist()))
+
+        self.assertEqual(len(binary.load(self.path, AABB((20, 20, 20), (30, 30, 30)))), 0)
+
+    def test_empty(self):
+        path = os.path.join(self.tmp, 'empty.psb')
+        binary.save(path, SolidArray())
+        self.assertEqual(len(binary.load(path)), 0)
+
+    def test_not_a_solids_file(self):
+        path = os.path.join(self.tmp, 'bed.csv')
+        with open(path, 'w') as f:
+            f.write('1,0,0,0,1\n')
+        self.assertRaises(IOError, binary.SolidFile, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+from unittest import TestCase
+from paralyze.core import AABB
+from paralyze.solids.io import csb
+
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import warnings
+import numpy as np
+
+
+DATA = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'data', 'uniform-8.csv')
+
+
+class CSBLoadTest(TestCase):
+
+    def setUp(self):
+        self.content = '# x, y, z, diameter\n1,0,0,0,2\n\n1,1,2,3,1\n1,5,5,5,4\n'
+
+    def test_load(self):
+        solids = csb.load(io.StringIO(self.content), scale=2.0, offset=(1, 0, 0))
+
+        self.assertEqual(len(solids), 3)
+        np.testing.assert_allclose(solids['center'][1], (3, 4, 6))
+        np.testing.assert_allclose(solids['radius'], (2, 1, 4))
+
+    def test_binary_and_dtype(self):
+        solids = csb.load(io.BytesIO(self.content.encode('utf-8')), dtype='float64', dynamic=True)
+
+        self.assertEqual(solids.dtype, np.float64)
+        self.assertTrue(solids.dynamic)
+
+    def test_filter(self):
+        f = io.StringIO(self.content)
+        solids = csb.load(f, domain=AABB((0, 0, 0), (4, 4, 4)), filter=lambda solid: solid.radius < 1)
+        np.testing.assert_allclose(solids['center'], [(1, 2, 3)])
+
+    def test_unsupported_types(self):
+        content = self.content + '2,1,1,1,1,5,0,0,0\n'
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            solids = csb.load(io.StringIO(content))
+        self.assertEqual(len(solids), 3)
+        self.assertEqual(len(caught), 1)
+
+    def test_iter_chunks(self):
+        chunks = list(csb.iter_chunks(io.StringIO(self.content), chunk_rows=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 1, 1])
+        chunks = csb.iter_chunks(io.BytesIO(self.content.replace('\n', '\r\n').encode()), chunk_rows=2,
+                                 domain=AABB((0, 0, 0), (4, 4, 4)))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 2)
+
+    def test_tar_member(self):
+        data = self.content.encode('utf-8')
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+            info = tarfile.TarInfo('bed.csv')
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        archive.seek(0)
+        with tarfile.open(fileobj=archive) as tar:
+            member = tar.extractfile('bed.csv')
+            self.assertEqual(sum(len(chunk) for chunk in csb.iter_chunks(member, chunk_rows=1)), 3)
+            self.assertFalse(member.closed)
+
+    def test_load_files(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            for i in range(3):
+                with open(os.path.join(tmp, 'snapshot-{:d}.csv'.format(i)), 'w') as f:
+                    f.write('1,{:d},0,0,2\n'.format(i) * (i + 1))
+            with tarfile.open(os.path.join(tmp, 'snapshots.tar.gz'), 'w:gz') as tar:
+                tar.add(os.path.join(tmp, 'snapshot-2.csv'), 'snapshot-2.csv')
+
+            solids = csb.load_files(os.path.join(tmp, '*.csv'), jobs=2)
+            np.testing.assert_allclose(solids['center'][:, 0], (0, 1, 1, 2, 2, 2))
+
+            # ids of solids loaded in different workers do not collide
+            for i in range(4):
+                with open(os.path.join(tmp, 'bed-{:d}.dat'.format(i)), 'w') as f:
+                    f.write('1,0,0,0,2\n' * 1000)
+            solids = csb.load_files(os.path.join(tmp, 'bed-*.dat'), jobs=2)
+            self.assertEqual(len(np.unique(solids['id'])), 4000)
+
+            results = dict(csb.iter_files([os.path.join(tmp, 'snapshots.tar.gz')], jobs=1))
+            self.assertEqual(list(results), [os.path.join(tmp, 'snapshots.tar.gz') + ':snapshot-2.csv'])
+            self.assertEqual(len(csb.load_files(os.path.join(tmp, '*.txt'))), 0)
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_save(self):
+        solids = csb.load(io.StringIO(self.content + '1,0.1,0.2,0.3,0.4\n'))
+        tmp = tempfile.mkdtemp()
+        try:
+            for filename in ('bed.csv', 'bed.csv.gz'):
+                path = os.path.join(tmp, filename)
+                csb.save(path, solids)
+                restored = csb.load(path)
+                for column in ('center', 'radius'):
+                    np.testing.assert_array_equal(restored[column], solids[column])
+
+            f = io.BytesIO()
+            csb.save(f, solids, precision=3, linesep='\n')
+            self.assertEqual(f.getvalue().decode('utf-8').splitlines()[-1], '1,0.1,0.2,0.3,0.4')
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_empty(self):
+        self.assertEqual(len(csb.load(io.StringIO('# nothing\n'))), 0)
+
+    @unittest.skipUnless(os.path.exists(DATA), 'sample data not available')
+    def test_sample_bed(self):
+        self.assertEqual(len(csb.load(DATA)), 50653)
+
+    @unittest.skipUnless(os.path.exists(DATA), 'sample data not available')
+    def test_save_sample_bed(self):
+        solids = csb.load(DATA)
+        f = io.BytesIO()
+        csb.save(f, solids, linesep='\n')
+
+        # the shortest float32 round-trip values are not longer than the original ones
+        self.assertLessEqual(len(f.getvalue()), os.path.getsize(DATA))
+        self.assertEqual(f.getvalue().decode('utf-8').splitlines()[0], '1,4.033,7.883,320.398,8')
+        f.seek(0)
+        restored = csb.load(f)
+        for column in ('center', 'radius'):
+            np.testing.assert_array_equal(restored[column], solids[column])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from unittest import TestCase
+from paralyze.core.solids import SolidArray
+from paralyze.solids.io import load_spheres, save_spheres
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+
+class NpyTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'bed.npy')
+        np.random.seed(1)
+        self.solids = SolidArray.spheres(np.random.random((100, 3)), np.random.random(100), dynamic=True)
+        self.solids['density'] = 2.5
+        self.solids['linear_velocity'] = np.random.random((100, 3))
+        self.solids['torque'] = np.random.random((100, 3))
+        self.solids.update_inertia()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        save_spheres(self.solids, self.path, dynamic=True)
+        solids = load_spheres(self.path)
+
+        self.assertTrue(solids.dynamic)
+        self.assertEqual(solids.dtype, np.float32)
+        for column in ('center', 'radius', 'aabb', 'density', 'linear_velocity', 'torque', 'inertia'):
+            np.testing.assert_array_equal(solids[column], self.solids[column])
+
+        static = load_spheres(self.path, dynamic=False, dtype='float64')
+        self.assertFalse(static.dynamic)
+        np.testing.assert_allclose(static['center'], self.solids['center'])
+
+    def test_dtype(self):
+        solids = SolidArray.spheres(np.random.random((10, 3)), 0.1, dtype='float64')
+        save_spheres(solids, self.path)
+        np.testing.assert_array_equal(load_spheres(self.path)['center'], solids['center'])
+
+        save_spheres(solids, self.path, dtype='float32')
+        self.assertEqual(load_spheres(self.path).dtype, np.float32)
+
+    def test_mmap(self):
+        save_spheres(self.solids, self.path)
+        solids = load_spheres(self.path, mmap_mode='r')
+
+        self.assertFalse(solids.dynamic)
+        self.assertIsInstance(solids['center'].base, np.memmap)
+        np.testing.assert_array_equal(solids['aabb'], self.solids['aabb'])
+        with self.assertRaises(ValueError):
+            solids['radius'] = 1
+
+    def test_legacy_file(self):
+        data = np.zeros(2, [('center', np.float32, 3), ('radius', np.float32, 1)])
+        data['center'] = [(0, 0, 0), (1, 1, 1)]
+        data['radius'] = [[1], [2]]
+        np.save(self.path, data)
+
+        solids = load_spheres(self.path)
+        np.testing.assert_allclose(solids['aabb'][1], (-1, -1, -1, 3, 3, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
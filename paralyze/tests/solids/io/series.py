@@ -0,0 +1,95 @@
+from unittest import TestCase
+from paralyze.core import AABB
+from paralyze.core.solids import SolidArray, create_capsule, create_sphere
+from paralyze.solids.io import SeriesWriter, SolidSeries
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import numpy as np
+
+
+class SeriesTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'case.pss')
+        self.domain = AABB((0, 0, 0), (1, 1, 2))
+        np.random.seed(2)
+        solids = SolidArray.spheres(np.random.random((500, 3)), np.random.random(500) * 0.01, dtype='float64')
+        self.steps = []
+        for t in range(7):
+            # particles settle and new ones are added
+            solids = solids.copy()
+            solids['center'] += np.random.normal(scale=1e-4, size=(500, 3))
+            self.steps.append(solids.take(slice(400 + 10 * t)))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, **kwargs):
+        with SeriesWriter(self.path, self.domain, resolution=1e-6, keyframe_interval=3, **kwargs) as writer:
+            for t, solids in enumerate(self.steps):
+                writer.append(solids, 'step-{:d}'.format(t))
+        return SolidSeries(self.path)
+
+    def test_round_trip(self):
+        for codec in ('zlib', 'lzma'):
+            series = self.write(codec=codec)
+            self.assertEqual(len(series), 7)
+            self.assertEqual(series.names[2], 'step-2')
+            # random access in any order, and sequential iteration
+            for t in (5, 1, 6, 2, 3):
+                solids = series.load(t)
+                self.assertEqual(solids.dtype, np.float64)
+                np.testing.assert_allclose(solids['center'], self.steps[t]['center'], atol=5e-7, rtol=0)
+                np.testing.assert_allclose(solids['radius'], self.steps[t]['radius'], atol=5e-7, rtol=0)
+                np.testing.assert_array_equal(solids['id'], self.steps[t]['id'])
+            for t, solids in enumerate(series):
+                self.assertEqual(len(solids), len(self.steps[t]))
+            self.assertEqual(len(series['step-4']), len(self.steps[4]))
+
+        self.assertIn('step-0', series)
+        self.assertRaises(KeyError, series.load, 'step-7')
+        self.assertRaises(IndexError, series.load, 7)
+
+    def test_compression(self):
+        self.write()
+        raw = sum(solids['center'].nbytes + solids['radius'].nbytes for solids in self.steps)
+        self.assertLess(os.path.getsize(self.path), raw / 3)
+
+    def test_reordered_rows(self):
+        self.write()
+        ordered = os.path.getsize(self.path)
+        np.random.seed(5)
+        self.steps = [solids.take(np.random.permutation(len(solids))) for solids in self.steps]
+        series = self.write()
+        # the spheres are matched by id, only the ids do not compress as well
+        self.assertLess(os.path.getsize(self.path), 1.5 * ordered)
+        for t in (1, 5):
+            solids = series.load(t)
+            np.testing.assert_array_equal(solids['id'], self.steps[t]['id'])
+            np.testing.assert_allclose(solids['center'], self.steps[t]['center'], atol=5e-7, rtol=0)
+
+    def test_non_spheres(self):
+        solids = [create_sphere((.5, .5, .5), .1), create_capsule(radius=.1, start=(.2, .2, .2), end=(.4, .2, .2))]
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with SeriesWriter(self.path, self.domain, 1e-6) as writer:
+                writer.append(solids)
+        self.assertEqual(len([w for w in caught if 'not supported' in str(w.message)]), 1)
+        self.assertEqual(SolidSeries(self.path).load(0)['id'].tolist(), [solids[0].id])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, SeriesWriter, self.path, self.domain, 1e-6, codec='bz2')
+        writer = SeriesWriter(self.path, self.domain, 1e-6)
+        writer.append(self.steps[0])
+        self.assertRaises(IOError, SolidSeries, self.path)
+        writer.close()
+        self.assertEqual(SolidSeries(self.path).names, ['0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,33 +2,12 @@ from codecs import open
 from os import path
 
 from setuptools import setup
-from setuptools.command.install import install
 
 from paralyze import __version__
 
-import paralyze.core.solids as solids
-
 here = path.abspath(path.dirname(__file__))
 
 
-class InstallCommand(install):
-    description = ''
-    user_options = install.user_options + [
-        ('solid_dtype=', 'float32', "default numpy dtype of solids' data")
-    ]
-
-    def initialize_options(self):
-        install.initialize_options(self)
-        self.solid_dtype = 'float32'
-
-    def finalize_options(self):
-        install.finalize_options(self)
-
-    def run(self):
-        solids.DEFAULT_DTYPE = self.solid_dtype
-        install.run(self)
-
-
 def readme():
     with open(path.join(here, 'README.rst'), encoding='utf-8') as f:
         return f.read()
@@ -40,10 +19,6 @@ setup(
     description='A scientific framework for parallel computational geometry',
     long_description=readme(),
 
-    cmdclass={
-        'install': InstallCommand
-    },
-
     classifiers=[
         'Development Status :: 3 - Alpha',
         'License :: OSI Approved :: BSD License',
@@ -67,6 +42,11 @@ setup(
 
     install_requires=['numpy', 'jinja2', 'scipy', 'pyevtk', 'matplotlib'],
 
+    # gzip seek points for paralyze.solids.io.SnapshotArchive
+    extras_require={
+        'archive': ['indexed_gzip']
+    },
+
     # additional data will be installed relative to sys.prefix
     # list of (install_folder, [list_of_files_to_be_installed])
     data_files=[('data', ['data/settings.json'])],